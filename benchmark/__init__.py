@@ -0,0 +1,12 @@
+"""
+Local stand-ins for the Monolith backends and a load generator that drives
+TelegramBot handlers directly, so scheduler and client changes can be
+measured without the GPU box or Telegram.
+
+    python -m benchmark.fake_backends                 # servers only
+    python -m benchmark.loadgen --rate 2 --duration 60
+    python -m benchmark.startup                       # import cost per process
+    python -m benchmark.glitch                        # log view glitch cost per frame
+    python -m benchmark.render                        # headless terminal render cost per frame
+    python -m benchmark.prompts                       # prompt generator throughput
+"""
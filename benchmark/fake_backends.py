@@ -0,0 +1,375 @@
+"""
+Fake ComfyUI, KoboldCpp and Coqui TTS servers with configurable latency and
+payload sizes. Only the endpoints the bot uses are implemented.
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import queue
+import random
+import select
+import struct
+import threading
+import time
+import uuid
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class BackendConfig:
+    def __init__(self, comfy_latency=2.0, comfy_jitter=0.2, image_bytes=1_500_000,
+                 audio_seconds=None, progress_steps=10, kobold_latency=1.0,
+                 kobold_words=120, tts_latency=0.5, tts_seconds=3):
+        self.comfy_latency = comfy_latency
+        self.comfy_jitter = comfy_jitter
+        self.image_bytes = image_bytes
+        # None: use the seconds requested by the workflow
+        self.audio_seconds = audio_seconds
+        self.progress_steps = progress_steps
+        self.kobold_latency = kobold_latency
+        self.kobold_words = kobold_words
+        self.tts_latency = tts_latency
+        self.tts_seconds = tts_seconds
+
+    def jittered(self, seconds):
+        return max(0.0, seconds * random.uniform(1 - self.comfy_jitter, 1 + self.comfy_jitter))
+
+
+def make_wav(seconds, rate=22050):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b'\x00\x00' * int(seconds * rate))
+    return buffer.getvalue()
+
+
+def make_flac(seconds):
+    """FLAC like ComfyUI's SaveAudio; falls back to WAV without pydub/ffmpeg."""
+    try:
+        from pydub import AudioSegment
+        out = io.BytesIO()
+        AudioSegment.silent(duration=int(seconds * 1000)).export(out, format='flac')
+        return out.getvalue()
+    except Exception:
+        return make_wav(seconds)
+
+
+def ws_frame(payload, opcode=0x1):
+    header = bytearray([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header.append(length)
+    elif length < 65536:
+        header.append(126)
+        header += struct.pack('>H', length)
+    else:
+        header.append(127)
+        header += struct.pack('>Q', length)
+    return bytes(header) + payload
+
+
+class FakeComfyUI:
+    """Executes prompts one at a time, like a single-GPU ComfyUI instance."""
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.pending = []
+        self.running = None
+        self.interrupted = False
+        self.history = {}
+        self.clients = {}
+        self.files = {}
+        self.work_ready = threading.Condition(self.lock)
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, prompt, client_id):
+        prompt_id = str(uuid.uuid4())
+        with self.lock:
+            self.pending.append((prompt_id, prompt, client_id))
+            self.work_ready.notify()
+        return prompt_id
+
+    def queue_state(self):
+        with self.lock:
+            running = [[0, self.running[0], self.running[1], {}, []]] if self.running else []
+            pending = [[i + 1, pid, p, {}, []] for i, (pid, p, _) in enumerate(self.pending)]
+        return {'queue_running': running, 'queue_pending': pending}
+
+    def interrupt(self):
+        with self.lock:
+            self.interrupted = self.running is not None
+
+    def register_client(self, client_id):
+        messages = queue.Queue()
+        with self.lock:
+            self.clients[client_id] = messages
+        return messages
+
+    def unregister_client(self, client_id):
+        with self.lock:
+            self.clients.pop(client_id, None)
+
+    def _send(self, client_id, message):
+        with self.lock:
+            messages = self.clients.get(client_id)
+        if messages is not None:
+            messages.put(json.dumps(message))
+
+    def _duration(self, prompt):
+        latency = self.config.comfy_latency
+        for node in prompt.values():
+            if node.get('class_type') == 'EmptyLatentAudio':
+                # Scale music renders with requested length, 20 s being the template default
+                latency *= max(0.15, float(node['inputs'].get('seconds', 20)) / 20)
+            elif node.get('class_type') == 'EmptyLatentImage':
+                pixels = node['inputs'].get('width', 512) * node['inputs'].get('height', 512)
+                latency *= pixels / (512 * 512)
+        return self.config.jittered(latency)
+
+    def _outputs(self, prompt):
+        outputs = {}
+        for node_id, node in prompt.items():
+            class_type = node.get('class_type')
+            if class_type == 'SaveImage':
+                name = f"telegram_{uuid.uuid4().hex[:8]}.png"
+                self.files[name] = os.urandom(self.config.image_bytes)
+                outputs[node_id] = {'images': [{'filename': name, 'subfolder': '', 'type': 'output'}]}
+            elif class_type == 'SaveAudio':
+                seconds = self.config.audio_seconds
+                if seconds is None:
+                    seconds = next((float(n['inputs'].get('seconds', 5)) for n in prompt.values()
+                                    if n.get('class_type') == 'EmptyLatentAudio'), 5)
+                name = f"audio_{uuid.uuid4().hex[:8]}.flac"
+                self.files[name] = make_flac(seconds)
+                outputs[node_id] = {'audio': [{'filename': name, 'subfolder': 'audio', 'type': 'output'}]}
+        return outputs
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while not self.pending:
+                    self.work_ready.wait()
+                prompt_id, prompt, client_id = self.pending.pop(0)
+                self.running = (prompt_id, prompt)
+                self.interrupted = False
+
+            duration = self._duration(prompt)
+            steps = max(1, self.config.progress_steps)
+            self._send(client_id, {'type': 'execution_start', 'data': {'prompt_id': prompt_id}})
+            for step in range(steps):
+                time.sleep(duration / steps)
+                if self.interrupted:
+                    break
+                self._send(client_id, {'type': 'progress',
+                                       'data': {'value': step + 1, 'max': steps, 'prompt_id': prompt_id}})
+
+            if self.interrupted:
+                with self.lock:
+                    self.history[prompt_id] = {'prompt': [0, prompt_id, prompt, {}, []],
+                                               'outputs': {}, 'status': {'completed': False}}
+                    self.running = None
+                self._send(client_id, {'type': 'execution_interrupted',
+                                       'data': {'prompt_id': prompt_id, 'node_id': '', 'node_type': ''}})
+                continue
+
+            outputs = self._outputs(prompt)
+            with self.lock:
+                self.history[prompt_id] = {'prompt': [0, prompt_id, prompt, {}, []],
+                                           'outputs': outputs, 'status': {'completed': True}}
+                self.running = None
+            self._send(client_id, {'type': 'executing', 'data': {'node': None, 'prompt_id': prompt_id}})
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body, content_type='application/json', status=200):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+
+def comfy_handler(comfy):
+    class ComfyHandler(JSONHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path == '/ws':
+                self.serve_websocket(query.get('clientId', [''])[0])
+            elif url.path.startswith('/history/'):
+                prompt_id = url.path.rsplit('/', 1)[1]
+                entry = comfy.history.get(prompt_id)
+                self.send_body({prompt_id: entry} if entry else {})
+            elif url.path == '/history':
+                self.send_body(comfy.history)
+            elif url.path == '/view':
+                # Each output is fetched once, so drop it to keep memory flat on long runs
+                data = comfy.files.pop(query.get('filename', [''])[0], None)
+                if data is None:
+                    self.send_body({'error': 'not found'}, status=404)
+                else:
+                    self.send_body(data, content_type='application/octet-stream')
+            elif url.path == '/queue':
+                self.send_body(comfy.queue_state())
+            else:
+                self.send_body({})
+
+        def do_POST(self):
+            if self.path == '/prompt':
+                payload = self.read_json()
+                prompt_id = comfy.submit(payload['prompt'], payload.get('client_id', ''))
+                self.send_body({'prompt_id': prompt_id, 'number': 0, 'node_errors': {}})
+            elif self.path == '/interrupt':
+                self.read_json()
+                comfy.interrupt()
+                self.send_body({})
+            else:
+                self.send_body({'error': 'not found'}, status=404)
+
+        def serve_websocket(self, client_id):
+            key = self.headers.get('Sec-WebSocket-Key', '')
+            accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+            self.send_response(101)
+            self.send_header('Upgrade', 'websocket')
+            self.send_header('Connection', 'Upgrade')
+            self.send_header('Sec-WebSocket-Accept', accept)
+            self.end_headers()
+            self.wfile.flush()
+            self.close_connection = True
+
+            messages = comfy.register_client(client_id)
+            messages.put(json.dumps({'type': 'status', 'data': {'sid': client_id}}))
+            try:
+                while True:
+                    try:
+                        message = messages.get(timeout=0.2)
+                        self.wfile.write(ws_frame(message.encode('utf-8')))
+                        self.wfile.flush()
+                    except queue.Empty:
+                        readable, _, _ = select.select([self.connection], [], [], 0)
+                        if readable:
+                            # The bot only ever sends a close frame; answer it so
+                            # websocket-client does not wait out its close timeout
+                            if self.connection.recv(4096):
+                                self.wfile.write(ws_frame(b'\x03\xe8', opcode=0x8))
+                                self.wfile.flush()
+                            break
+            except (BrokenPipeError, ConnectionResetError, OSError):
+                pass
+            finally:
+                comfy.unregister_client(client_id)
+
+    return ComfyHandler
+
+
+def kobold_handler(config):
+    class KoboldHandler(JSONHandler):
+        def do_POST(self):
+            if self.path != '/api/v1/generate':
+                self.send_body({'error': 'not found'}, status=404)
+                return
+            payload = self.read_json()
+            words = min(config.kobold_words, int(payload.get('max_length', config.kobold_words)))
+            time.sleep(config.jittered(config.kobold_latency))
+            text = ' '.join(random.choice(['bravo', 'lith', 'monolith', 'pi', '✨']) for _ in range(words))
+            self.send_body({'results': [{'text': text}]})
+
+    return KoboldHandler
+
+
+def tts_handler(config):
+    wav = make_wav(config.tts_seconds)
+
+    class TTSHandler(JSONHandler):
+        def do_GET(self):
+            if not self.path.startswith('/api/tts'):
+                self.send_body({'error': 'not found'}, status=404)
+                return
+            time.sleep(config.jittered(config.tts_latency))
+            self.send_body(wav, content_type='audio/wav')
+
+    return TTSHandler
+
+
+def start_server(handler, host, port):
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def start_backends(config, host='127.0.0.1', comfy_port=0, kobold_port=0, tts_port=0):
+    """Start all three servers in background threads; returns {name: server}."""
+    comfy = FakeComfyUI(config)
+    servers = {
+        'comfyui': start_server(comfy_handler(comfy), host, comfy_port),
+        'kobold': start_server(kobold_handler(config), host, kobold_port),
+        'tts': start_server(tts_handler(config), host, tts_port),
+    }
+    servers['comfyui'].comfy = comfy
+    return servers
+
+
+def add_arguments(parser):
+    parser.add_argument('--comfy-latency', type=float, default=2.0, help="seconds per 512x512 image")
+    parser.add_argument('--comfy-jitter', type=float, default=0.2, help="relative latency jitter")
+    parser.add_argument('--image-bytes', type=int, default=1_500_000)
+    parser.add_argument('--audio-seconds', type=float, default=None,
+                        help="length of returned audio (default: what the workflow asks for)")
+    parser.add_argument('--progress-steps', type=int, default=10)
+    parser.add_argument('--kobold-latency', type=float, default=1.0)
+    parser.add_argument('--kobold-words', type=int, default=120)
+    parser.add_argument('--tts-latency', type=float, default=0.5)
+    parser.add_argument('--tts-seconds', type=float, default=3)
+
+
+def config_from_args(args):
+    return BackendConfig(comfy_latency=args.comfy_latency, comfy_jitter=args.comfy_jitter,
+                         image_bytes=args.image_bytes, audio_seconds=args.audio_seconds,
+                         progress_steps=args.progress_steps, kobold_latency=args.kobold_latency,
+                         kobold_words=args.kobold_words, tts_latency=args.tts_latency,
+                         tts_seconds=args.tts_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake ComfyUI / KoboldCpp / Coqui TTS servers")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--comfy-port', type=int, default=7860)
+    parser.add_argument('--kobold-port', type=int, default=8051)
+    parser.add_argument('--tts-port', type=int, default=5002)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    servers = start_backends(config_from_args(args), args.host,
+                             args.comfy_port, args.kobold_port, args.tts_port)
+    for name, server in servers.items():
+        print(f"{name} listening on {args.host}:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Per-frame cost of the terminal glitch effect at different scrollback sizes,
+old per-character loop against glitch.GlitchEngine.
+
+    python -m benchmark.glitch
+    python -m benchmark.glitch --lines 4 100 1000 10000 --frames 200
+"""
+import argparse
+import random
+import string
+import time
+
+import glitch
+
+
+def legacy_glitch(text):
+    """The original RetroTerminal.glitch_print loop, minus the Tk calls."""
+    glitched_text = ""
+    colors = ["blue", "magenta", "cyan", "hot pink"]
+    for char in text:
+        if random.random() < 0.02:
+            glitched_text += random.choice("@#$%&*░▒▓█▄▀▐")
+        else:
+            glitched_text += char
+    color = random.choice(colors) if random.random() < 0.1 else "green"
+    return glitched_text, color
+
+
+def make_text(lines, width, rng):
+    alphabet = string.ascii_letters + string.digits + "     "
+    return "\n".join("".join(rng.choice(alphabet) for _ in range(width)) for _ in range(lines))
+
+
+def time_frames(render, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        render()
+    return (time.perf_counter() - start) / frames * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Glitch renderer cost per frame")
+    parser.add_argument('--lines', type=int, nargs='+', default=[4, 100, 1000, 10000])
+    parser.add_argument('--width', type=int, default=80, help="characters per line")
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=glitch.GLITCH_RATE)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print(f"{'lines':>7} {'chars':>9} {'legacy us':>11} {'engine us':>11} {'set_text us':>12} {'speedup':>8}")
+    for lines in args.lines:
+        text = make_text(lines, args.width, rng)
+        engine = glitch.GlitchEngine(rate=args.rate, rng=random.Random(2))
+
+        start = time.perf_counter()
+        engine.set_text(text)
+        set_text_us = (time.perf_counter() - start) * 1e6
+
+        # The legacy loop is quadratic-ish on big inputs, so cap its frame count
+        legacy_frames = max(1, min(args.frames, 2_000_000 // max(len(text), 1)))
+        legacy_us = time_frames(lambda: legacy_glitch(text), legacy_frames)
+        engine_us = time_frames(engine.render, args.frames)
+        print(f"{lines:>7} {len(text):>9} {legacy_us:>11.1f} {engine_us:>11.1f} "
+              f"{set_text_us:>12.1f} {legacy_us / engine_us:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""
+Open-loop load generator: starts the fake backends in a child process, points
+the bot at them and fires synthetic requests at a target rate.
+
+    python -m benchmark.loadgen --rate 1 --duration 60 --mix image=6,ask=3,music=1
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import select
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ipc_channel
+from benchmark import fake_backends
+from benchmark.telegram_driver import EventDriver
+from trace_report import percentile
+
+
+def serve_backends(config, conn):
+    servers = fake_backends.start_backends(config)
+    conn.send({name: server.server_address[1] for name, server in servers.items()})
+    conn.recv()  # block until the parent says stop
+    conn.send(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def configure_environment(ports):
+    """Must run before bot_telegram is imported; its modules read these at import."""
+    os.environ.update({
+        'COMFYUI_ENDPOINT': f"127.0.0.1:{ports['comfyui']}",
+        'MONOLITH_ENDPOINT': f"http://127.0.0.1:{ports['kobold']}",
+        'TTS_SERVER_URL': f"http://127.0.0.1:{ports['tts']}",
+        'COMFYUI_PROMPT': os.path.join(ROOT, 'JSON', 'normal_comfy.json'),
+        'COMFYUI_PROMPT_ENHANCE': os.path.join(ROOT, 'JSON', 'enhanced_prompt.json'),
+        'COMFYUI_MUSIC': os.path.join(ROOT, 'JSON', 'music.json'),
+        'COMFYUI_VOICE': os.path.join(ROOT, 'JSON', 'voice_clone.json'),
+        'KOBOLD_CONFIG_FILE': os.path.join(ROOT, 'JSON', 'Kobold_Config_INST.json'),
+        'TELEGRAM_API_ID': os.environ.get('TELEGRAM_API_ID') or '1',
+        'TELEGRAM_API_HASH': os.environ.get('TELEGRAM_API_HASH') or 'benchmark',
+        # Journal as in production, but never into the real bot's journal
+        'JOB_JOURNAL': os.path.join(tempfile.mkdtemp(prefix='bravolith-loadgen-'), 'jobs.db'),
+    })
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in EventDriver.kinds:
+            raise argparse.ArgumentTypeError(f"unknown request kind '{kind}'")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def drain(receiver):
+    while not receiver.closed:
+        select.select([receiver], [], [])
+        receiver.poll()
+
+
+async def one_request(driver, kind, user_id, scheduled, timeout, results):
+    prompt = f"benchmark request {user_id}"
+    try:
+        ok = await asyncio.wait_for(driver.run(kind, user_id, prompt), timeout)
+        outcome = 'ok' if ok else 'error'
+    except asyncio.TimeoutError:
+        outcome = 'timeout'
+    except Exception:
+        outcome = 'error'
+    # Latency counts from the scheduled arrival, so a stalled loop is not hidden
+    results.append((kind, outcome, time.perf_counter() - scheduled))
+
+
+async def run_load(args, mix):
+    import bot_telegram
+    import status_board
+
+    channel = ipc_channel.Channel()
+    threading.Thread(target=drain, args=(channel.receiver,), daemon=True).start()
+
+    board = status_board.StatusBoard(create=True)
+    try:
+        bot = bot_telegram.TelegramBot(channel.sender, status=board)
+        return await drive_load(bot, args, mix)
+    finally:
+        # Unlinks the /dev/shm segment
+        board.close()
+
+
+async def drive_load(bot, args, mix):
+    driver = EventDriver(bot, upload_latency=args.upload_latency,
+                         resolution=args.resolution, music_seconds=args.music_seconds)
+    processor = asyncio.create_task(bot.process_tasks())
+
+    kinds, weights = zip(*mix.items())
+    results = []
+    tasks = []
+    start = time.perf_counter()
+    scheduled = start
+    user_id = 1000
+    while scheduled - start < args.duration:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind = random.choices(kinds, weights)[0]
+        user_id += 1
+        tasks.append(asyncio.create_task(
+            one_request(driver, kind, user_id, scheduled, args.timeout, results)))
+        gap = random.expovariate(args.rate) if args.poisson else 1 / args.rate
+        scheduled += gap
+
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start
+    processor.cancel()
+    # Handlers of timed-out requests may still be running; stop them before the board goes away
+    for task in list(bot.running_tasks):
+        task.cancel()
+    await asyncio.gather(processor, *bot.running_tasks, return_exceptions=True)
+    return results, wall
+
+
+def summarize(results, wall):
+    groups = defaultdict(list)
+    for kind, outcome, latency in results:
+        groups[kind].append((outcome, latency))
+        groups['all'].append((outcome, latency))
+
+    report = {}
+    for kind, rows in groups.items():
+        ok = sorted(latency for outcome, latency in rows if outcome == 'ok')
+        report[kind] = {
+            'requests': len(rows),
+            'ok': len(ok),
+            'errors': sum(1 for outcome, _ in rows if outcome == 'error'),
+            'timeouts': sum(1 for outcome, _ in rows if outcome == 'timeout'),
+            'throughput_rps': len(ok) / wall if wall else 0.0,
+            'p50_s': percentile(ok, 50),
+            'p95_s': percentile(ok, 95),
+            'p99_s': percentile(ok, 99),
+        }
+    return report
+
+
+def print_report(report, wall, bot_rss_kb, backend_rss_kb):
+    print(f"{'kind':<8} {'reqs':>6} {'ok':>6} {'err':>5} {'t/o':>5} {'rps':>8} "
+          f"{'p50 s':>8} {'p95 s':>8} {'p99 s':>8}")
+    for kind in sorted(report, key=lambda k: (k == 'all', k)):
+        r = report[kind]
+        print(f"{kind:<8} {r['requests']:>6} {r['ok']:>6} {r['errors']:>5} {r['timeouts']:>5} "
+              f"{r['throughput_rps']:>8.3f} {r['p50_s']:>8.2f} {r['p95_s']:>8.2f} {r['p99_s']:>8.2f}")
+    print(f"\nwall time {wall:.1f} s, peak RSS bot {bot_rss_kb / 1024:.1f} MiB, "
+          f"backends {backend_rss_kb / 1024:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test TelegramBot against fake backends")
+    parser.add_argument('--rate', type=float, default=0.5, help="requests per second")
+    parser.add_argument('--duration', type=float, default=60, help="seconds of arrivals")
+    parser.add_argument('--mix', type=parse_mix, default='image=6,ask=3,music=1',
+                        help="weighted request kinds, e.g. image=6,ask=3,music=1,speak=1")
+    parser.add_argument('--poisson', action='store_true', help="exponential inter-arrival times")
+    parser.add_argument('--timeout', type=float, default=600, help="per-request timeout")
+    parser.add_argument('--upload-latency', type=float, default=0.0, help="simulated Telegram upload")
+    parser.add_argument('--resolution', default='square')
+    parser.add_argument('--music-seconds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--json', help="also write the report to this file")
+    fake_backends.add_arguments(parser)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    parent_conn, child_conn = multiprocessing.Pipe()
+    backends = multiprocessing.Process(target=serve_backends,
+                                       args=(fake_backends.config_from_args(args), child_conn),
+                                       daemon=True)
+    backends.start()
+    configure_environment(parent_conn.recv())
+
+    try:
+        results, wall = asyncio.run(run_load(args, args.mix))
+    finally:
+        parent_conn.send('stop')
+        backend_rss_kb = parent_conn.recv() if parent_conn.poll(5) else 0
+        backends.terminate()
+
+    bot_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    report = summarize(results, wall)
+    print_report(report, wall, bot_rss_kb, backend_rss_kb)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({'args': vars(args), 'wall_s': wall,
+                       'peak_rss_kb': {'bot': bot_rss_kb, 'backends': backend_rss_kb},
+                       'results': report}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
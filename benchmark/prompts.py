@@ -0,0 +1,131 @@
+"""
+Prompt generation throughput: the original string-rescanning template loop
+against the compiled templates, one prompt per call and in batches through
+generate_many. Then load time and draw rate of a large synthetic vocabulary
+file, parsed into memory and memory mapped through its index.
+
+    python -m benchmark.prompts
+    python -m benchmark.prompts --count 100000 --vocab-size 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import vocabulary
+import words
+import words_flux
+
+
+def legacy_select_word(all_words, category, subcategory=None):
+    """The original _select_word: flattens nested categories on every call."""
+    if subcategory and category in all_words and subcategory in all_words[category]:
+        return random.choice(all_words[category][subcategory])
+    elif category in all_words:
+        if isinstance(all_words[category], dict):
+            flattened = [word for subcat in all_words[category].values() for word in subcat]
+            return random.choice(flattened)
+        return random.choice(all_words[category])
+    return f"<unknown-{category}>"
+
+
+def legacy_fill(template, all_words, substitutions=None, weighted=()):
+    """The original `while '{' in result` loop."""
+    substitutions = substitutions or {}
+    result = template
+    while '{' in result:
+        start = result.find('{')
+        end = result.find('}', start)
+        if start == -1 or end == -1:
+            break
+        category, _, subcategory = result[start + 1:end].partition(':')
+        if category in substitutions:
+            replacement = substitutions[category]
+        else:
+            replacement = legacy_select_word(all_words, category, subcategory or None)
+        if category in weighted:
+            replacement = f"({replacement}:1.2)"
+        result = result[:start] + replacement + result[end + 1:]
+    return result
+
+
+def legacy_prompt(generator):
+    style = random.choice(list(generator.templates.keys()))
+    return legacy_fill(random.choice(generator.templates[style]), generator.words)
+
+
+def legacy_flux_prompt(generator):
+    template_type = random.choice(list(generator.templates.keys()))
+    substitutions = {
+        'quality': ", ".join(random.sample(generator.quality_tags, k=random.randint(2, 4))),
+        'style': ", ".join(random.sample([tag for tags in generator.style_tags.values() for tag in tags],
+                                         k=random.randint(2, 3))),
+        'composition': random.choice(generator.words['composition']),
+    }
+    return legacy_fill(random.choice(generator.templates[template_type]), generator.words,
+                       substitutions, words_flux.WEIGHTED)
+
+
+def rate(run, count):
+    start = time.perf_counter()
+    run(count)
+    return count / (time.perf_counter() - start)
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def benchmark_vocabulary(size, draws):
+    rng = random.Random(2)
+    directory = tempfile.mkdtemp(prefix='bravolith-vocab-')
+    path = os.path.join(directory, 'location.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        for index in range(size):
+            f.write(f"place {index:07d}\t{rng.choice((0.5, 1, 1, 2, 5))}\n")
+
+    def parse():
+        with open(path, encoding='utf-8') as f:
+            return vocabulary.Vocabulary(*vocabulary.parse_entries(f))
+
+    in_memory, parse_seconds = timed(parse)
+    _, index_seconds = timed(lambda: vocabulary.MappedVocabulary(path))
+    mapped, mapped_seconds = timed(lambda: vocabulary.MappedVocabulary(path))
+
+    print(f"\nvocabulary of {size} words ({os.path.getsize(path) / 2**20:.1f} MB)")
+    print(f"{'':>12} {'load ms':>10} {'draws/s':>10}")
+    for name, vocab, seconds in (('in memory', in_memory, parse_seconds),
+                                 ('build index', None, index_seconds),
+                                 ('mapped', mapped, mapped_seconds)):
+        draw_rate = rate(lambda n: [vocab.draw(rng.random) for _ in range(n)], draws) if vocab else 0
+        print(f"{name:>12} {seconds * 1000:>10.1f} {draw_rate:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt generator throughput")
+    parser.add_argument('--count', type=int, default=20000, help="prompts per measurement")
+    parser.add_argument('--vocab-size', type=int, default=100000, help="words in the synthetic vocabulary")
+    args = parser.parse_args()
+
+    random.seed(1)
+    generators = [
+        ('words', words.PromptGenerator(), legacy_prompt),
+        ('words_flux', words_flux.FluxPromptGenerator(), legacy_flux_prompt),
+    ]
+    print(f"{'generator':>11} {'legacy/s':>10} {'prompt/s':>10} {'many/s':>10} {'speedup':>8}")
+    for name, generator, legacy in generators:
+        legacy_rate = rate(lambda n: [legacy(generator) for _ in range(n)], args.count)
+        single_rate = rate(lambda n: [generator.generate_prompt() for _ in range(n)], args.count)
+        many_rate = rate(lambda n: generator.generate_many(n, seed=1), args.count)
+        print(f"{name:>11} {legacy_rate:>10.0f} {single_rate:>10.0f} {many_rate:>10.0f} "
+              f"{many_rate / legacy_rate:>7.1f}x")
+
+    if args.vocab_size:
+        benchmark_vocabulary(args.vocab_size, args.count)
+
+
+if __name__ == '__main__':
+    main()
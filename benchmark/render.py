@@ -0,0 +1,97 @@
+"""
+Per-frame cost of the terminal render path, drawn offscreen by
+retro_terminal.HeadlessTerminal, so it runs without a display.
+
+    python -m benchmark.render
+    python -m benchmark.render --frames 500 --png /tmp/frames
+
+Each scenario changes a different part of the screen every frame:
+- idle: nothing changes, so the cached frame is reused.
+- leds: the LEDs blink.
+- logs: a new log line goes through the wrap + glitch path.
+- video: a camera-sized frame is pasted into the video tile.
+- all: everything above at once.
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+
+# One camera tile that is never started, and a throwaway scrollback file;
+# both must be set before the imports read them
+os.environ['VIDEO_STREAMS'] = 'http://127.0.0.1:9/stream.mjpg'
+os.environ['SCROLLBACK_FILE'] = os.path.join(tempfile.mkdtemp(prefix='bravolith-render-'), 'scrollback.bin')
+
+import offscreen  # noqa: E402
+from PIL import Image  # noqa: E402
+from retro_terminal import HeadlessTerminal  # noqa: E402
+
+SCENARIOS = ['idle', 'leds', 'logs', 'video', 'all']
+
+
+def make_terminal(width, height, sink):
+    root = offscreen.HeadlessRoot(sink)
+    terminal = HeadlessTerminal(root, width, height)
+    # Show the tile as start_video_stream would, without connecting to the camera
+    photo = terminal.video_photos[0]
+    terminal.canvas.itemconfig(terminal.video_frames[0], image=photo)
+    return root, terminal, photo
+
+
+def make_frames(size, count, rng):
+    return [Image.new('RGB', size, tuple(rng.randrange(256) for _ in range(3))) for _ in range(count)]
+
+
+def run_scenario(name, args, rng):
+    sink = offscreen.PNGSink(args.png) if args.png else None
+    root, terminal, photo = make_terminal(args.width, args.height, sink)
+    frames = make_frames(photo.image.size, 8, rng)
+    alphabet = string.ascii_letters + string.digits + "     "
+    leds = ['telegram', 'monolith', 'cpu']
+    root.render_frame()  # warm the text caches
+    root.render_times.clear()
+
+    times = []
+    for index in range(args.frames):
+        if name in ('leds', 'all'):
+            led = leds[index % len(leds)]
+            controller = terminal.led_controller
+            controller.leds[led]['state'] = not controller.leds[led]['state']
+            terminal.update_led_activity()
+        if name in ('logs', 'all'):
+            terminal.log_buffer.append("".join(rng.choice(alphabet) for _ in range(args.line_length)))
+            terminal.process_log_buffer()
+        if name in ('video', 'all'):
+            photo.paste(frames[index % len(frames)])
+        start = time.perf_counter()
+        root.render_frame()
+        times.append(time.perf_counter() - start)
+    root.destroy()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless terminal render cost per frame")
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--line-length', type=int, default=120, help="characters per log line")
+    parser.add_argument('--png', help="also write frames to this directory, timing PNG encoding too")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print(f"{'scenario':>9} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'max fps':>8}")
+    for name in args.scenarios:
+        times = sorted(t * 1000 for t in run_scenario(name, args, rng))
+        mean = statistics.fmean(times)
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        print(f"{name:>9} {mean:>9.2f} {statistics.median(times):>8.2f} {p95:>8.2f} {times[-1]:>8.2f} "
+              f"{1000 / mean if mean else float('inf'):>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
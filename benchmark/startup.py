@@ -0,0 +1,86 @@
+"""
+Cold-start import cost of each Bravolith process entry point, measured with
+`python -X importtime` in a fresh interpreter.
+
+    python -m benchmark.startup
+    python -m benchmark.startup --repeat 5 --top 15 retro_terminal
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Parent supervisor, GUI child, bot child
+DEFAULT_MODULES = ['bravolith', 'retro_terminal', 'bot_telegram']
+
+
+def parse_importtime(stderr, module):
+    """Returns (total_us, {direct dependency: cumulative_us}) for `module`."""
+    # -X importtime prints children before their parent, so the depth-1 lines
+    # since the previous depth-0 line are the target's direct imports
+    pending = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 0:
+            if name == module:
+                return int(cumulative), pending
+            pending = {}
+        elif depth == 1:
+            pending[name] = int(cumulative)
+    return 0, {}
+
+
+def measure(module, repeat):
+    totals = []
+    walls = []
+    direct = defaultdict(list)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                              cwd=ROOT, capture_output=True, text=True)
+        walls.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'failed'
+            return None, error
+        total, deps = parse_importtime(proc.stderr, module)
+        totals.append(total)
+        for name, cumulative in deps.items():
+            direct[name].append(cumulative)
+    return {
+        'import_ms': statistics.median(totals) / 1000,
+        'process_ms': statistics.median(walls) * 1000,
+        'direct': {name: statistics.median(values) / 1000 for name, values in direct.items()},
+    }, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time per Bravolith entry module")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--repeat', type=int, default=3, help="runs per module, median reported")
+    parser.add_argument('--top', type=int, default=10, help="slowest direct imports to list")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        result, error = measure(module, args.repeat)
+        if error:
+            print(f"{module}: import failed ({error})\n")
+            continue
+        print(f"{module}: import {result['import_ms']:.1f} ms, "
+              f"interpreter start to exit {result['process_ms']:.1f} ms")
+        slowest = sorted(result['direct'].items(), key=lambda item: -item[1])[:args.top]
+        for name, ms in slowest:
+            print(f"    {name:<32} {ms:>8.1f} ms")
+        print()
+
+
+if __name__ == '__main__':
+    main()
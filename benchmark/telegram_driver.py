@@ -0,0 +1,101 @@
+"""
+Synthetic Telegram events that drive TelegramBot handlers directly, the same
+way telethon would: commands go through the bot's task queue and inline
+button presses call handle_callback.
+"""
+import asyncio
+import itertools
+import time
+
+message_ids = itertools.count(1)
+
+
+class FakeMessage:
+    def __init__(self, text):
+        self.id = next(message_ids)
+        self.text = text
+        self.is_reply = False
+
+    async def get_reply_message(self):
+        return None
+
+
+class FakeSender:
+    first_name = 'Bench'
+    username = 'bench'
+
+
+class FakeEvent:
+    def __init__(self, text, sender_id, upload_latency=0.0):
+        self.message = FakeMessage(text)
+        self.sender_id = sender_id
+        self.chat_id = sender_id  # a private chat, as the job journal records it
+        self.upload_latency = upload_latency
+        self.replies = []
+        self.replied = asyncio.Event()
+
+    async def reply(self, message=None, file=None, text=None, **kwargs):
+        if file is not None and self.upload_latency:
+            await asyncio.sleep(self.upload_latency)
+        self.replies.append((time.perf_counter(), message or text, file))
+        self.replied.set()
+
+    async def get_sender(self):
+        return FakeSender()
+
+    def sent_file(self):
+        return any(file is not None for _, _, file in self.replies)
+
+
+class FakeCallbackEvent:
+    def __init__(self, data):
+        self.data = data.encode()
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+    async def edit(self, *args, **kwargs):
+        pass
+
+
+class EventDriver:
+    """Runs one synthetic user request per call to `run`."""
+
+    kinds = ('image', 'ask', 'music', 'speak')
+
+    def __init__(self, bot, upload_latency=0.0, resolution='square', music_seconds=5):
+        self.bot = bot
+        self.upload_latency = upload_latency
+        self.resolution = resolution
+        self.music_seconds = music_seconds
+
+    async def dispatch(self, command, handler, event):
+        await self.bot.create_command_handler(command, handler)(event)
+
+    async def run(self, kind, user_id, text):
+        """Returns True when the request produced its result."""
+        if kind == 'ask':
+            event = FakeEvent(f"/ask {text}", user_id, self.upload_latency)
+            await self.dispatch('/ask', self.bot.handle_messages, event)
+            await event.replied.wait()
+            return not event.replies[0][1].startswith('Sorry')
+
+        if kind == 'image':
+            command, handler = '/image', self.bot.handle_image_generation
+            callbacks = [f"type_Normal_{user_id}", f"res_{self.resolution}_{user_id}"]
+        elif kind == 'music':
+            command, handler = '/music', self.bot.handle_music_handler
+            callbacks = [f"music_{self.music_seconds}_{user_id}"]
+        elif kind == 'speak':
+            command, handler = '/speak', self.bot.handle_speak_handler
+            callbacks = [f"voice_maleA_{user_id}"]
+        else:
+            raise ValueError(f"Unknown request kind: {kind}")
+
+        event = FakeEvent(f"{command} {text}", user_id, self.upload_latency)
+        await self.dispatch(command, handler, event)
+        # Wait for the inline keyboard before pressing buttons
+        await event.replied.wait()
+        for data in callbacks:
+            await self.bot.handle_callback(FakeCallbackEvent(data))
+        return event.sent_file()
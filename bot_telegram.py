@@ -6,7 +6,7 @@ import uuid
 import io
 import json
 import urllib
-import emoji
+import time
 
 from collections import deque
 from functools import partial
@@ -17,11 +17,22 @@ from telethon import TelegramClient, events, Button
 from telethon.tl import types
 from telethon.sessions import MemorySession
 
-from pydub import AudioSegment
 import requests
 
 import comfyui_generation
+import degrade
+import gpu_scheduler
+import image_pool
+import keep_warm
+import ipc_channel
+import job_journal
+import profiling
+import shared_frame
+import status_board
+import supervisor
+import telemetry
 import text_generation
+import tracing
 import words_flux
 
 from dotenv import load_dotenv
@@ -41,19 +52,58 @@ COMFYUI_PROMPT = os.getenv('COMFYUI_PROMPT')
 COMFYUI_MUSIC = os.getenv('COMFYUI_MUSIC')
 TTS_SERVER_URL = os.getenv('TTS_SERVER_URL')
 FREEMYIP_URL = os.getenv('FREEMYIP_ENDPOINT')
+BOT_ADMIN_IDS = {int(i) for i in os.getenv('BOT_ADMIN_IDS', '').split(',') if i.strip()}
+# Commands that ask the user for more before the backend is needed; see keep_warm.
+# /ask and private messages reach Kobold at once, where a warm-up would only queue ahead.
+WARM_ON_COMMAND = {'/image': 'image', '/music': 'music'}
 
 # Set up logging
 logging.basicConfig(filename=LOG_FILE_TELEGRAM, level=logging.WARNING,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
+class RecoveredEvent:
+    """Stands in for the NewMessage event of a command replayed from the job journal."""
+
+    def __init__(self, message):
+        # A telethon Message fetched with client.get_messages, so it is bound to the client
+        self.message = message
+        self.sender_id = message.sender_id
+        self.chat_id = message.chat_id
+
+    async def reply(self, *args, **kwargs):
+        return await self.message.reply(*args, **kwargs)
+
+    async def get_sender(self):
+        return await self.message.get_sender()
+
 class TelegramBot:
-    def __init__(self, log_queue, led_control_queue):
-        self.log_queue = log_queue
-        self.led_control_queue = led_control_queue
+    def __init__(self, channel, heartbeat_queue=None, status=None, frame=None, telemetry_buffer=None):
+        # ipc_channel.ChannelSender to the GUI process
+        self.channel = channel
+        # status_board.StatusBoard shared with the GUI; LEDs, job counts and backend health
+        self.status = status or status_board.StatusBoard(create=True)
+        # The GUI reads the board when woken, so LED pulses show without waiting for its stats tick
+        self.status.notify = self.channel.status_changed
+        # shared_frame.SharedFrame the GUI publishes webcam frames to; None when run standalone
+        self.shared_frame = frame
+        # telemetry.TelemetryBuffer sampled by the parent process, for /status
+        self.telemetry = telemetry_buffer
+        self.heartbeat_queue = heartbeat_queue
         self.client = TelegramClient(MemorySession(), TELEGRAM_API_ID, TELEGRAM_API_HASH)
         self.task_queue = asyncio.Queue()
         self.max_concurrent_tasks = 1
         self.running_tasks = set()
+        # One ComfyUI job at a time, grouped by the models each workflow loads
+        self.gpu = gpu_scheduler.GpuScheduler()
+        # Warm-ups for the Monolith's models, and cold/warm first-request latency
+        self.keep_warm = keep_warm.KeepWarm(
+            {'image': self.warm_image, 'music': self.warm_music, 'ask': self.warm_ask},
+            is_busy=self.is_busy, on_change=partial(self.channel.metrics, 'keepwarm'))
+        # Queued commands and ComfyUI jobs on disk, replayed after a restart
+        self.journal = job_journal.JobJournal() if job_journal.JOB_JOURNAL else None
+        # Quality steps down while work piles up, and back once the backlog clears
+        self.gpu_shedder = degrade.LoadShedder('gpu')
+        self.llm_shedder = degrade.LoadShedder('llm', latency=degrade.DEGRADE_LLM_LATENCY)
         self.prompt_generate = words_flux.FluxPromptGenerator()
 
         # Define preset resolutions
@@ -64,6 +114,11 @@ class TelegramBot:
             "hd": (1024, 768),
             "wide":(1536,512)
         }
+        # Random images rendered ahead of time while ComfyUI is idle
+        self.image_pool = None
+        if image_pool.PREGEN_ENABLED:
+            self.image_pool = image_pool.ImagePool(
+                presets=[name for name in image_pool.PREGEN_PRESETS if name in self.preset_resolutions])
 
         self.response_styles = {
             'enthusiastic': {
@@ -152,17 +207,39 @@ class TelegramBot:
         self.user_states = {}
 
     async def start(self):
+        # A restarted bot must not inherit the previous process's in-flight state
+        for kind in status_board.JOB_KINDS:
+            self.status.set_jobs(kind, 0)
+        self.status.set_led('telegram', False)
+        self.status.set_led('monolith', False)
+
+        asyncio.create_task(self.send_heartbeats())
         await self.client.start(bot_token=TELEGRAM_BOT_TOKEN)
         self.bot_id = (await self.client.get_me()).id
 
         # Register handlers
         self.register_handlers()
+        self.loop_watchdog = profiling.monitor_asyncio()
         
         # Start task processor
         asyncio.create_task(self.process_tasks())
+        if self.journal is not None:
+            asyncio.create_task(self.recover_jobs())
+        if self.image_pool is not None:
+            asyncio.create_task(self.image_pool.run(
+                self.render_random_image, self.is_busy, partial(self.channel.metrics, 'pregen')))
+        if self.keep_warm.enabled:
+            asyncio.create_task(self.keep_warm.run())
         
         await self.client.run_until_disconnected()
 
+    async def send_heartbeats(self):
+        while True:
+            supervisor.send_heartbeat(self.heartbeat_queue, 'bot')
+            if hasattr(self, 'loop_watchdog'):
+                self.channel.metrics('bot', self.loop_watchdog.stats())
+            await asyncio.sleep(supervisor.HEARTBEAT_INTERVAL)
+
     def register_handlers(self):
         handlers = [
             ('/getip', self.get_ip),
@@ -176,6 +253,7 @@ class TelegramBot:
             ('/webcam_off', self.handle_webcam_off),
             
         ]
+        self.command_handlers = dict(handlers)
         
         for command, handler in handlers:
             self.client.add_event_handler(
@@ -183,6 +261,20 @@ class TelegramBot:
                 events.NewMessage(pattern=command)
             )
         
+        # Profiling and snapshots must not wait behind queued generation jobs
+        self.client.add_event_handler(
+            self.handle_profile,
+            events.NewMessage(pattern='/profile')
+        )
+        self.client.add_event_handler(
+            self.handle_snapshot,
+            events.NewMessage(pattern='/snapshot')
+        )
+        self.client.add_event_handler(
+            self.handle_status,
+            events.NewMessage(pattern='/status')
+        )
+
         # Add handler for resolution selection callbacks
         self.client.add_event_handler(
             self.handle_callback,
@@ -198,8 +290,18 @@ class TelegramBot:
     def create_command_handler(self, command, handler):
         async def wrapper(event):
             #await self.acknowledge_command(event)
-            await self.task_queue.put((event, handler))
+            self.keep_warm.activity(WARM_ON_COMMAND.get(command))
+            await self.enqueue_command(command, event, handler)
         return wrapper
+
+    async def enqueue_command(self, command, event, handler):
+        trace = tracing.start_trace(command)
+        job_id = None
+        if self.journal is not None:
+            job_id = self.journal.add({'type': 'command', 'command': command,
+                                       'chat_id': event.chat_id, 'message_id': event.message.id})
+        await self.task_queue.put((event, handler, trace, job_id))
+        self.status.set_jobs('queued', self.task_queue.qsize())
     """
     async def acknowledge_command(self, event):
         command = event.message.text.split()[0] if event.message and event.message.text else "Unknown command"
@@ -208,19 +310,26 @@ class TelegramBot:
     async def process_tasks(self):
         while True:
             if len(self.running_tasks) < self.max_concurrent_tasks:
-                event, handler = await self.task_queue.get()
-                task = asyncio.create_task(self.run_handler(event, handler))
+                event, handler, trace, job_id = await self.task_queue.get()
+                self.status.set_jobs('queued', self.task_queue.qsize())
+                task = asyncio.create_task(self.run_handler(event, handler, trace, job_id))
                 self.running_tasks.add(task)
                 task.add_done_callback(self.running_tasks.discard)
             else:
                 await asyncio.sleep(0.1)
 
-    async def run_handler(self, event, handler):
+    async def run_handler(self, event, handler, trace=None, job_id=None):
+        if job_id is not None:
+            # Started: from here on the work it does is journaled on its own, never run it twice
+            self.journal.finish(job_id)
+        trace = trace or tracing.start_trace(handler.__name__)
+        tracing.record_span('task_queue.wait', trace.started, time.time() - trace.started, trace=trace)
         try:
-            await handler(event)
+            with tracing.use_trace(trace), tracing.span(handler.__name__):
+                await handler(event)
         except Exception as e:
             error_message = f"Error in handler: {str(e)}\n"
-            self.log_queue.put(error_message)
+            self.channel.log(error_message, logging.ERROR)
             await event.reply(f"An error occurred while processing your request: {str(e)}")
             logging.error(error_message, exc_info=True)
 
@@ -228,7 +337,8 @@ class TelegramBot:
 
     async def handle_private_message(self, event):
         if not event.message.text.startswith('/'):
-            await self.handle_messages(event)
+            with tracing.use_trace(tracing.start_trace('private')), tracing.span('handle_private_message'):
+                await self.handle_messages(event)
 
     async def get_ip_handler(self, event):
         await self.get_ip(event)
@@ -255,7 +365,8 @@ class TelegramBot:
         prompt = message[1] if len(message) > 1 else ''
         self.user_states[user_id] = {
             'prompt': prompt,
-            'original_message': event
+            'original_message': event,
+            'trace': tracing.current_trace()
         }
         
         await event.reply(
@@ -305,7 +416,8 @@ class TelegramBot:
         prompt = message[1] if len(message) > 1 else ''
         self.user_states[user_id] = {
             'prompt': prompt,
-            'original_message': event
+            'original_message': event,
+            'trace': tracing.current_trace()
         }
         
         await event.reply(
@@ -343,7 +455,8 @@ class TelegramBot:
         prompt = message[1] if len(message) > 1 else ''
         self.user_states[user_id] = {
             'prompt': prompt,
-            'original_message': event
+            'original_message': event,
+            'trace': tracing.current_trace()
         }
         
         await event.reply(
@@ -370,7 +483,13 @@ class TelegramBot:
         if user_id not in self.user_states:
             await event.answer("Session expired. Please try again.")
             return
-        
+
+        # Continue the trace started by the originating command
+        trace = self.user_states[user_id].get('trace') or tracing.start_trace(f"callback_{callback_type}")
+        with tracing.use_trace(trace), tracing.span(f"handle_callback.{callback_type}"):
+            await self.dispatch_callback(event, user_id, callback_type)
+
+    async def dispatch_callback(self, event, user_id, callback_type):
         if callback_type == 'type':
             # Handle generation type selection
             generation_type = event.data.decode().split('_')[1]
@@ -395,36 +514,35 @@ class TelegramBot:
             width, height = self.preset_resolutions[resolution_type]
             original_event = self.user_states[user_id]['original_message']
             generation_type = self.user_states[user_id]['generation_type']
+            u_prompt = self.user_states[user_id]['prompt']
+            pooled = None
             if generation_type == 'Random':
-                u_prompt = self.user_states[user_id]['prompt']
-                r_prompt = self.prompt_generate.generate_prompt()
-                prompt = f"{u_prompt} {r_prompt}"
+                if not u_prompt and self.image_pool is not None:
+                    # Nothing user-specific to render, so a pre-rendered image will do
+                    pooled = self.image_pool.take(resolution_type)
+                    self.channel.metrics('pregen', self.image_pool.metrics())
+                r_prompt = pooled[1] if pooled else self.prompt_generate.generate_prompt()
+                prompt = f"{u_prompt} {r_prompt}".strip()
             else:
-                prompt = self.user_states[user_id]['prompt']
+                prompt = u_prompt
             
             # Clean up user state
             del self.user_states[user_id]
 
             await event.answer()
-            if generation_type == 'Random':
-                response = await self.choose_response_style(
-                    context_type='general',
-                    user_input=prompt,
-                    user_id=user_id
-                )
-            
-                # Use response in your existing handler logic
-                await original_event.reply(response)
-            else:   
-                response = await self.choose_response_style(
-                    context_type='image',
-                    user_input=prompt,
-                    user_id=user_id
-                )
-            
-                # Use response in your existing handler logic
-                await original_event.reply(response)
-                await self.process_image_prompt(generation_type, original_event, width, height, prompt)
+            response = await self.choose_response_style(
+                context_type='general' if generation_type == 'Random' else 'image',
+                user_input=prompt,
+                user_id=user_id
+            )
+
+            # Use response in your existing handler logic
+            await original_event.reply(response)
+            if pooled is not None:
+                await self.send_pooled_image(original_event, *pooled)
+            else:
+                with tracing.span('process_image_prompt'):
+                    await self.process_image_prompt(generation_type, original_event, width, height, prompt)
 
         elif callback_type == 'voice':
             # Handle generation type selection
@@ -505,11 +623,11 @@ class TelegramBot:
         return random.choice(responses)
     
     async def get_ip(self, event):
-        self.led_control_queue.put('telegram:' + str(True))
-        ip_address, register = self.get_external_ip()
-        self.log_queue.put(f"Ip Address Registration: {register}\n")
+        self.status.set_led('telegram', True)
+        ip_address, register = await asyncio.to_thread(self.get_external_ip)
+        self.channel.log(f"Ip Address Registration: {register}\n")
         await event.reply(f"The current external IP address is: {ip_address}")
-        self.led_control_queue.put('telegram:' + str(False))
+        self.status.set_led('telegram', False)
 
     def get_external_ip(self):
         try:
@@ -524,7 +642,7 @@ class TelegramBot:
             return f"Error: {str(e)}"
 
     async def check_services(self,event):
-        self.led_control_queue.put('telegram:'+ str(True))
+        self.status.set_led('telegram', True)
         services = {
             "Alpha_Camera": ("192.168.86.35",8000),
             "Webserver_Bravo": ("192.168.0.16", 80),
@@ -534,20 +652,34 @@ class TelegramBot:
             "Coqui_TTS_Monolith" : ("192.168.0.6",5002)
         }
 
+        # Services whose result also updates backend health on the status board
+        board_backends = {
+            "LLM_Monolith": 'kobold',
+            "ComfyUI_Monolith": 'comfyui',
+            "Coqui_TTS_Monolith": 'tts'
+        }
+
         def get_service_status():
             results = []
             for service, (ip, port) in services.items():
                 internal_url = f"http://{ip}:{port}"
-                internal_status = "✅" if self.check_service(internal_url) else "❌"
+                started = time.perf_counter()
+                is_up = self.check_service(internal_url)
+                if service in board_backends:
+                    self.record_backend(board_backends[service], is_up, started)
+                internal_status = "✅" if is_up else "❌"
 
                 results.append(f"{service} @ {internal_url} is {internal_status}")
             
             return f"Service Status: \n" + "\n".join(results)
 
-        message = get_service_status()
-        self.log_queue.put(f"{message}\n")
+        message = await asyncio.to_thread(get_service_status)
+        self.channel.log(f"{message}\n")
         await event.reply(message)
-        self.led_control_queue.put('telegram:'+ str(False))
+        self.status.set_led('telegram', False)
+
+    def record_backend(self, name, is_up, started):
+        self.status.set_backend(name, is_up, (time.perf_counter() - started) * 1000)
 
     def check_service(self,url):
         try:
@@ -556,6 +688,38 @@ class TelegramBot:
         except requests.RequestException:
             return False
 
+    async def handle_profile(self, event):
+        """/profile [bot|gui] [seconds] - sample stacks and write a folded flamegraph file"""
+        if event.sender_id not in BOT_ADMIN_IDS:
+            await event.reply("This command is for admins only.")
+            return
+
+        target = 'bot'
+        seconds = profiling.PROFILE_SECONDS
+        for arg in event.message.text.split()[1:]:
+            if arg.isdigit():
+                seconds = int(arg)
+            elif arg in ('bot', 'gui'):
+                target = arg
+        if not 1 <= seconds <= 65535:
+            # ipc_channel.Profile carries the duration as an unsigned 16-bit value
+            await event.reply("Profile duration must be between 1 and 65535 seconds.")
+            return
+
+        if target == 'gui':
+            self.channel.send(ipc_channel.Profile(seconds))
+            await event.reply(f"Toggled GUI profiler ({seconds}s), output goes to {profiling.PROFILE_DIR}")
+            return
+
+        path = profiling.toggle_profiler(seconds)
+        lag = self.loop_watchdog.stats()
+        status = f"Profiling bot for {seconds}s -> {path}" if path else "Bot profiler stopped early"
+        await event.reply(
+            f"{status}\n"
+            f"Loop lag avg {lag['avg_lag_ms']:.1f} ms, max {lag['max_lag_ms']:.0f} ms, "
+            f"{lag['stalls']} stalls over {profiling.LOOP_LAG_THRESHOLD * 1000:.0f} ms"
+        )
+
     #------------------------------------------------------------------------------------------
     #helpers
 
@@ -567,35 +731,121 @@ class TelegramBot:
         """
         String indicating the input format ('flac', 'ogg', or 'wav')
         """
+        # pydub probes for ffmpeg on import, so only load it for audio replies
+        from pydub import AudioSegment
+
         try:
-            if input_format == 'ogg':
-                audio = AudioSegment.from_ogg(io.BytesIO(audio_data))
-            else:
-                audio = AudioSegment.from_file(io.BytesIO(audio_data), format=input_format)
-            
-            mp3_data = io.BytesIO()
-            audio.export(mp3_data, format="mp3")
-            mp3_data.seek(0)
+            with tracing.span('audio.convert', input_format=input_format):
+                if input_format == 'ogg':
+                    audio = AudioSegment.from_ogg(io.BytesIO(audio_data))
+                else:
+                    audio = AudioSegment.from_file(io.BytesIO(audio_data), format=input_format)
+
+                mp3_data = io.BytesIO()
+                audio.export(mp3_data, format="mp3")
+                mp3_data.seek(0)
             return mp3_data
         except Exception as e:
             raise ValueError(f"Error converting {input_format} to MP3: {str(e)}")
     
     async def handle_webcam_on(self, event):
-        self.led_control_queue.put('webcam:' + str(True))
-        self.log_queue.put("Webcam Toggled: ON\n")
+        self.status.set_led('webcam', True)
+        self.channel.log("Webcam Toggled: ON\n")
         await event.reply(f"ok : ON")
         
     async def handle_webcam_off(self, event):
-        self.led_control_queue.put('webcam:' + str(False))
-        self.log_queue.put("Webcam Toggled: OFF\n")
+        self.status.set_led('webcam', False)
+        self.channel.log("Webcam Toggled: OFF\n")
         await event.reply(f"ok : OFF")
+
+    async def handle_snapshot(self, event):
+        """/snapshot - send the latest frame the terminal decoded from the webcam"""
+        frame = self.shared_frame.read() if self.shared_frame is not None else None
+        if frame is None or time.time() - frame.timestamp > shared_frame.SNAPSHOT_MAX_AGE:
+            await event.reply("No recent webcam frame. Turn the camera on with /webcam_on first.")
+            return
+
+        with tracing.span('snapshot.encode', width=frame.width, height=frame.height):
+            image_file = await asyncio.to_thread(shared_frame.encode_jpeg, frame)
+        age = time.time() - frame.timestamp
+        self.channel.log(f"Snapshot #{frame.sequence} sent ({age:.1f}s old)\n")
+        with tracing.span('telegram.upload', bytes=image_file.getbuffer().nbytes):
+            await event.reply(file=image_file)
+
+    async def handle_status(self, event):
+        """/status - Pi health (min/avg/max) over the last minute, 5 minutes and hour"""
+        if self.telemetry is None:
+            await event.reply("Telemetry is only available when running under bravolith.py.")
+            return
+        samples = self.telemetry.samples()
+        if not samples:
+            await event.reply("No telemetry samples yet.")
+            return
+
+        rows = [
+            ('CPU %', 'cpu', 1),
+            ('Temp C', 'temperature', 1),
+            ('Memory %', 'memory', 1),
+            ('Swap %', 'swap', 1),
+            ('Disk rd KB/s', 'disk_read', 1 / 1024),
+            ('Disk wr KB/s', 'disk_write', 1 / 1024),
+            ('Net rx KB/s', 'net_rx', 1 / 1024),
+            ('Net tx KB/s', 'net_tx', 1 / 1024),
+        ]
+        latest = samples[-1]
+        lines = [f"{'':<13} {'min':>7} {'avg':>7} {'max':>7}"]
+        for label, seconds in (('1 min', 60), ('5 min', 300), ('1 hour', 3600)):
+            window = [sample for sample in samples if sample.time >= latest.time - seconds]
+            lines.append(f"-- last {label} ({len(window)} samples)")
+            for name, field, scale in rows:
+                stats = telemetry.summarize(window, field)
+                if stats is not None:
+                    low, average, high = (value * scale for value in stats)
+                    lines.append(f"{name:<13} {low:7.1f} {average:7.1f} {high:7.1f}")
+
+        cores = " ".join(f"{core:.0f}" for core in latest.cores)
+        throttled_now, throttled_since_boot = telemetry.describe_throttled(latest.throttled)
+        lines.append(f"Cores now: {cores} %, {latest.memory_available:.0f} MB available")
+        lines.append(f"Throttling now: {', '.join(throttled_now) or 'none'}")
+        lines.append(f"Since boot: {', '.join(throttled_since_boot) or 'none'}")
+        if self.image_pool is not None:
+            pool = self.image_pool.metrics()
+            ready = ", ".join(f"{name} {count}" for name, count in pool['ready'].items())
+            lines.append(f"Random pool: {ready}; hit rate {pool['hit_rate']:.0%} "
+                         f"of {pool['hits'] + pool['misses']}, {pool['disk_mb']} MB")
+        gpu = self.gpu.metrics()
+        lines.append(f"GPU ({gpu['policy']}): {gpu['jobs']} jobs, {gpu['swaps']} model swaps, "
+                     f"{gpu['avoided_swaps']} avoided (~{gpu['seconds_saved']:.0f}s saved), "
+                     f"{gpu['waiting']} waiting (~{gpu['queued_seconds']:.0f}s)"
+                     + (f", {gpu['background_waiting']} background" if gpu['background_waiting'] else ""))
+        for shedder in (self.gpu_shedder, self.llm_shedder):
+            shed = shedder.metrics()
+            lines.append(f"{shedder.name.upper()} quality: level {shed['level']}/{shed['max_level']}, "
+                         f"{shed['degraded']} degraded of {shed['degraded'] + shed['full']}")
+        warm = self.keep_warm.metrics()
+        for target, classes in warm['latency'].items():
+            latencies = ", ".join(f"{name} {classes[name]['mean_s']:.1f}s ({classes[name]['count']})"
+                                  for name in keep_warm.LATENCY_CLASSES if name in classes)
+            lines.append(f"{target} latency: {latencies}")
+        if self.keep_warm.enabled:
+            lines.append(f"Warm-ups: {warm['warmups']} ({warm['warmup_failures']} failed, "
+                         f"{warm['warmup_seconds']:.0f}s)")
+        await event.reply("```\n" + "\n".join(lines) + "\n```")
         
 
     #------------------------------------------------------------------------------------------
     #Text Generation - Koboldcpp
 
+    def build_ask_prompt(self, user_message):
+        prompt = self.load_json(KOBOLD_CONFIG_FILE)
+        prompt["max_length"] = 320
+        prompt["temperature"] = 0.75
+        prompt["memory"] = "[You are Roleplaying as Bravolith, A Female Artificial Intelligence, You are running on limited hardware, A Raspberry 5 8GB, use concise messages unless specified and use Emoji when appropriate]\n\n"
+        prompt["prompt"] = f"<start_of_turn>user\n{user_message}<end_of_turn>\n<start_of_turn>model\n"
+        return prompt
+
     async def handle_messages(self, event):
-        self.led_control_queue.put('telegram:' + str(True))
+        self.status.set_led('telegram', True)
         user_message = event.message.text
         if user_message.startswith('/ask'):
             user_message = user_message[5:].strip()
@@ -605,29 +855,268 @@ class TelegramBot:
             if replied.text:
                 user_message += " " + replied.text
         
-        self.log_queue.put(f"User Message: {user_message}\n")
-
-        prompt = self.load_json(KOBOLD_CONFIG_FILE)
-        prompt["max_length"] = 320
-        prompt["temperature"] = 0.75
-        prompt["memory"] = "[You are Roleplaying as Bravolith, A Female Artificial Intelligence, You are running on limited hardware, A Raspberry 5 8GB, use concise messages unless specified and use Emoji when appropriate]\n\n"
-        prompt["prompt"] = f"<start_of_turn>user\n{user_message}<end_of_turn>\n<start_of_turn>model\n"
-
-        self.led_control_queue.put('monolith:' + str(True))
-        response_texts = text_generation.process_message(prompt)
-        self.led_control_queue.put('monolith:' + str(False))
+        self.channel.log(f"User Message: {user_message}\n")
+
+        prompt = self.build_ask_prompt(user_message)
+        level = self.llm_shedder.update(self.task_queue.qsize())
+        degraded = self.shed_load(self.llm_shedder, degrade.degrade_max_length(prompt, level))
+
+        self.status.set_led('monolith', True)
+        started = time.perf_counter()
+        with self.status.job('ask'):
+            response_texts = await asyncio.to_thread(text_generation.process_message, prompt)
+        # process_message reports every failure as a reply starting with "Sorry";
+        # an empty reply comes back as no segments at all
+        self.record_backend('kobold', bool(response_texts) and not response_texts[0].startswith('Sorry'), started)
+        self.keep_warm.record('ask', time.perf_counter() - started)
+        self.llm_shedder.observe(time.perf_counter() - started)
+        self.status.set_led('monolith', False)
 
         for text_segment in response_texts:
-            self.log_queue.put(f"Bravo Response: {text_segment}\n")
+            self.channel.log(f"Bravo Response: {text_segment}\n")
             await event.reply(text_segment)
+        if degraded:
+            await event.reply(degraded)
 
-        self.led_control_queue.put('telegram:' + str(False))
+        self.status.set_led('telegram', False)
 
     #------------------------------------------------------------------------------------------
     #Image Generation - ComfyUI
 
+    def build_image_workflow(self, i_type, user_message, width, height):
+        prompt = {}
+        if i_type == 'Normal':
+            prompt = self.load_json(COMFYUI_PROMPT)
+        elif i_type == 'Random':
+            prompt = self.load_json(COMFYUI_PROMPT)
+        elif i_type == 'Enhanced':
+            prompt = self.load_json(COMFYUI_PROMPT_ENHANCE)
+
+        # Update the prompt with resolution
+        prompt["102"]["inputs"]["text"] = user_message
+        prompt["100"]["inputs"]["seed"] = random.randint(1, 4294967294)
+        prompt["80"]["inputs"]["width"] = width
+        prompt["80"]["inputs"]["height"] = height
+        #prompt["80"]["inputs"]["batch_size"] = 2
+        return prompt
+
+    def journal_comfyui(self, event, kind, toggle_flag, workflow, client_id, notice=None):
+        """
+        Journals a ComfyUI job for a user `event`, with the `notice` to repeat
+        if it has to be delivered after a restart. Returns the job id for
+        run_comfyui, or None without a journal. The caller calls finish_job
+        once the result (or the error) has been sent; until then a restart
+        collects the output from ComfyUI and delivers it again.
+        """
+        if self.journal is None:
+            return None
+        return self.journal.add({
+            'type': 'comfyui', 'kind': kind, 'toggle_flag': toggle_flag, 'workflow': workflow,
+            'client_id': client_id, 'chat_id': event.chat_id, 'reply_to': event.message.id,
+            'user': event.sender_id, 'notice': notice})
+
+    def finish_job(self, job_id, error=None):
+        if job_id is not None:
+            self.journal.finish(job_id, error)
+
+    async def run_comfyui(self, kind, toggle_flag, workflow, client_id, on_progress=None, job_id=None, user=None):
+        """
+        Runs a workflow through comfyui_generation.do_stuff in a worker thread
+        once the GPU scheduler hands this job the slot. job_id is a journaled
+        job (see journal_comfyui), recorded as submitted once ComfyUI has it.
+        """
+        on_queued = partial(self.journal.submitted, job_id) if job_id is not None else None
+        if kind == 'pregen':
+            on_queued = self.image_pool.on_queued
+        elif self.image_pool is not None:
+            # User jobs take priority over a speculative Random render
+            await self.image_pool.yield_gpu()
+        models = gpu_scheduler.workflow_models(workflow)
+        queued = time.time()
+        requested = time.perf_counter()
+        cost = gpu_scheduler.workflow_cost(workflow)
+        async with self.gpu.slot(models, kind, cost, user) as waiter:
+            tracing.record_span('gpu.wait', queued, time.time() - queued, kind=kind,
+                                models=gpu_scheduler.describe(models), estimate=round(waiter.estimate, 1))
+            started = time.perf_counter()
+            if kind == 'pregen' and not self.image_pool.start_submit(client_id):
+                # A user job asked for the GPU while this one waited for the slot
+                result = None, comfyui_generation.INTERRUPTED
+            else:
+                with tracing.span('comfyui.do_stuff', kind=kind, cold=waiter.cold):
+                    result = await asyncio.to_thread(
+                        comfyui_generation.do_stuff, toggle_flag, workflow, client_id, on_progress, on_queued)
+            waiter.succeeded = result[0] is not None
+            # An interrupt is something the bot asked for, not a sign ComfyUI is unwell
+            if result[1] != comfyui_generation.INTERRUPTED:
+                self.record_backend('comfyui', waiter.succeeded, started)
+        if kind == 'pregen':
+            self.keep_warm.touch('image')
+        elif kind != 'warmup':
+            latency = time.perf_counter() - requested
+            self.keep_warm.record(kind, latency, swapped=waiter.cold)
+            self.gpu_shedder.observe(latency)
+        self.channel.metrics('gpu', self.gpu.metrics())
+        return result
+
+    async def recover_jobs(self):
+        """Replays the journal after a restart: see job_journal."""
+        self.recovery_tasks = set()
+        for job in self.journal.pending():
+            if time.time() - job.created > job_journal.JOB_RESUME_MAX_AGE:
+                self.journal.finish(job.job_id, 'expired before the bot came back')
+                continue
+            params = job.params
+            try:
+                if params['type'] == 'command':
+                    message = await self.client.get_messages(params['chat_id'], ids=params['message_id'])
+                    # Handed on to the new entry enqueue_command makes
+                    self.journal.finish(job.job_id)
+                    if message is None or params['command'] not in self.command_handlers:
+                        continue
+                    event = RecoveredEvent(message)
+                    self.channel.log(f"Resuming queued {params['command']} after restart\n")
+                    await self.enqueue_command(params['command'], event, self.command_handlers[params['command']])
+                else:
+                    task = asyncio.create_task(self.resume_comfyui(job), name=f"resume-{job.job_id}")
+                    self.recovery_tasks.add(task)
+                    task.add_done_callback(self.recovery_done)
+            except Exception as e:
+                logging.error(f"Could not resume job {job.job_id}: {e}", exc_info=True)
+                self.journal.finish(job.job_id, e)
+
+    def recovery_done(self, task):
+        self.recovery_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Recovered job {task.get_name()} failed", exc_info=task.exception())
+            self.channel.log(f"Recovered job failed: {task.exception()}\n", logging.ERROR)
+
+    async def resume_comfyui(self, job):
+        """Collects (or reruns) a ComfyUI job journaled by an earlier process and delivers it."""
+        params = job.params
+        kind, toggle_flag, workflow = params['kind'], params['toggle_flag'], params['workflow']
+        files, error = None, comfyui_generation.PROMPT_LOST
+        with tracing.use_trace(tracing.start_trace(f"resume_{kind}")), self.status.job(kind):
+            if job.prompt_id is not None:
+                self.channel.log(f"Re-attaching to {kind} prompt {job.prompt_id} after restart\n")
+                models = gpu_scheduler.workflow_models(workflow)
+                cost = gpu_scheduler.workflow_cost(workflow)
+                # Still rendering on the GPU, so it holds the slot like any other job
+                async with self.gpu.slot(models, kind, cost, params['user']):
+                    with tracing.span('comfyui.resume', kind=kind, prompt_id=job.prompt_id):
+                        files, error = await asyncio.to_thread(comfyui_generation.resume, toggle_flag, job.prompt_id)
+            if error == comfyui_generation.PROMPT_LOST:
+                # Never reached ComfyUI, or ComfyUI restarted too: run it again
+                self.channel.log(f"Running queued {kind} job again after restart\n")
+                files, error = await self.run_comfyui(kind, toggle_flag, workflow, params['client_id'],
+                                                      job_id=job.job_id, user=params['user'])
+        try:
+            await self.deliver_recovered(params, files, error)
+        except Exception as e:
+            self.journal.finish(job.job_id, e)
+            raise
+        self.journal.finish(job.job_id)
+
+    async def deliver_recovered(self, params, files, error):
+        reply = partial(self.client.send_message, params['chat_id'], reply_to=params['reply_to'])
+        kind = params['kind']
+        if files is None:
+            await reply(f"Sorry, the {kind} I was making before a restart failed:\n{error}")
+            return
+        for i, data in enumerate(files, 1):
+            if params['toggle_flag'] == 'images':
+                image_file = io.BytesIO(data)
+                image_file.name = f'generated_image_{i}.png'
+                await reply(file=image_file)
+                continue
+            mp3_data = self.convert_audio_to_mp3(data, "flac")
+            if mp3_data is None:
+                await reply('Error converting audio to MP3')
+                continue
+            audio_file = io.BytesIO(mp3_data.getvalue())
+            audio_file.name = f'bravolith_{kind}_{i}.mp3'
+            await reply(file=audio_file, attributes=[
+                types.DocumentAttributeAudio(duration=0, title=f"Bravolith {kind}", performer="Bravolith")
+            ])
+        if params.get('notice'):
+            await reply(params['notice'])
+
+    def shed_load(self, shedder, changes):
+        shedder.count(bool(changes))
+        self.channel.metrics('degrade', {'gpu': self.gpu_shedder.metrics(), 'llm': self.llm_shedder.metrics()})
+        notice = degrade.notice(changes)
+        if notice:
+            self.channel.log(f"{notice}\n")
+        return notice
+
+    def shed_gpu_load(self, workflow):
+        """Steps a user workflow down to the current GPU load; returns the notice for the user or None."""
+        level = self.gpu_shedder.update(len(self.gpu.user_waiting()))
+        return self.shed_load(self.gpu_shedder, degrade.degrade_workflow(workflow, level))
+
+    async def warm_comfyui(self, toggle_flag, workflow):
+        workflow = keep_warm.warmup_workflow(workflow)
+        files, error = await self.run_comfyui('warmup', toggle_flag, workflow, str(uuid.uuid4()))
+        if files is None:
+            raise RuntimeError(error)
+
+    async def warm_image(self):
+        # Same loaders as a real /image, one step at the smallest preset
+        workflow = self.build_image_workflow('Normal', 'warm-up', 256, 256)
+        workflow["100"]["inputs"]["steps"] = '1'
+        await self.warm_comfyui('images', workflow)
+
+    async def warm_music(self):
+        workflow = self.load_json(COMFYUI_MUSIC)
+        workflow["11"]["inputs"]["seconds"] = 1
+        workflow["3"]["inputs"]["steps"] = 1
+        workflow["6"]["inputs"]["text"] = 'warm-up'
+        await self.warm_comfyui('audio', workflow)
+
+    async def warm_ask(self):
+        # Same memory prefix as /ask, so Kobold can reuse the processed context
+        prompt = self.build_ask_prompt('Hi')
+        prompt["max_length"] = 1
+        response_texts = await asyncio.to_thread(text_generation.process_message, prompt)
+        # An empty reply still means the model answered
+        if response_texts and response_texts[0].startswith('Sorry'):
+            raise RuntimeError(response_texts[0])
+
+    def is_busy(self):
+        """True while any user job is queued or running; pre-generation waits for quiet."""
+        if self.running_tasks or not self.task_queue.empty() or self.gpu.user_waiting():
+            return True
+        return any(self.status.snapshot().jobs.values())
+
+    async def render_random_image(self, preset, client_id):
+        """One speculative Random image for the pool: (image bytes or None, prompt)."""
+        width, height = self.preset_resolutions[preset]
+        text = self.prompt_generate.generate_prompt()
+        workflow = self.build_image_workflow('Random', text, width, height)
+        self.channel.log(f"Pre-generating Random {preset} image\n")
+        with tracing.use_trace(tracing.start_trace('pregen')):
+            images_data, error = await self.run_comfyui('pregen', 'images', workflow, client_id)
+        if images_data is None:
+            if error != comfyui_generation.INTERRUPTED:
+                logging.warning(f"Pre-generation of a {preset} image failed: {error}")
+            return None, text
+        return images_data[0], text
+
+    async def send_pooled_image(self, event, image_data, prompt):
+        self.status.set_led('telegram', True)
+        self.channel.log(f"Serving pre-generated Random Image of: {prompt}\n")
+        image_file = io.BytesIO(image_data)
+        image_file.name = 'generated_image_1.png'
+        try:
+            with tracing.span('telegram.upload', bytes=len(image_data), pregen=True):
+                await event.reply(file=image_file)
+        except Exception as e:
+            self.channel.log(f"Error sending image: {str(e)}\n")
+            await event.reply(f"Error sending image: {str(e)}")
+        self.status.set_led('telegram', False)
+
     async def process_image_prompt(self, i_type, event, width=512, height=512, user_message='', its=1):
-        self.led_control_queue.put('telegram:' + str(True))
+        self.status.set_led('telegram', True)
         client_id = str(uuid.uuid4())
         
         if not user_message:
@@ -639,29 +1128,21 @@ class TelegramBot:
         
         if not user_message:
             await event.reply('Please provide some text.')
-            self.led_control_queue.put('telegram:' + str(False))
+            self.status.set_led('telegram', False)
             return
             
-        prompt = {}
-        if i_type == 'Normal':
-            prompt = self.load_json(COMFYUI_PROMPT)
-        elif i_type == 'Random':
-            prompt = self.load_json(COMFYUI_PROMPT)
-        elif i_type == 'Enhanced':
-            prompt = self.load_json(COMFYUI_PROMPT_ENHANCE)
-            
-        # Update the prompt with resolution
-        prompt["102"]["inputs"]["text"] = user_message
-        prompt["100"]["inputs"]["seed"] = random.randint(1, 4294967294)
-        prompt["80"]["inputs"]["width"] = width
-        prompt["80"]["inputs"]["height"] = height
-        #prompt["80"]["inputs"]["batch_size"] = 2
+        prompt = self.build_image_workflow(i_type, user_message, width, height)
+        degraded = self.shed_gpu_load(prompt)
         
-        self.log_queue.put(f"Generating {i_type} Image of: {user_message} at {width}x{height}\n")
-        self.led_control_queue.put('monolith:' + str(True))
+        self.channel.log(f"Generating {i_type} Image of: {user_message} at {width}x{height}\n")
+        self.status.set_led('monolith', True)
         
-        images_data, error = comfyui_generation.do_stuff('images', prompt, client_id)
-        self.led_control_queue.put('monolith:' + str(False))
+        job_id = self.journal_comfyui(event, 'image', 'images', prompt, client_id, degraded)
+        with self.status.job('image'):
+            images_data, error = await self.run_comfyui(
+                'image', 'images', prompt, client_id, partial(self.channel.progress, client_id, 'image'),
+                job_id=job_id, user=event.sender_id)
+        self.status.set_led('monolith', False)
         
         if images_data is not None:
             # Send each image in the batch
@@ -674,24 +1155,28 @@ class TelegramBot:
                     await asyncio.sleep(0.5)
                 
                 try:
-                    await event.reply(
-                        file=image_file
-                        #caption=f"Image {i} of {len(images_data)}" if len(images_data) > 1 else None
-                    )
+                    with tracing.span('telegram.upload', bytes=len(img_data)):
+                        await event.reply(
+                                file=image_file
+                            #caption=f"Image {i} of {len(images_data)}" if len(images_data) > 1 else None
+                        )
                 except Exception as e:
-                    self.log_queue.put(f"Error sending image {i}: {str(e)}\n")
+                    self.channel.log(f"Error sending image {i}: {str(e)}\n")
                     await event.reply(f"Error sending image {i}: {str(e)}")
+            if degraded:
+                await event.reply(degraded)
         else:
-            self.log_queue.put(f"Sorry, there was an error generating the images:\n{error}\n")
+            self.channel.log(f"Sorry, there was an error generating the images:\n{error}\n")
             await event.reply(f"Sorry, there was an error generating the images:\n{error}")
+        self.finish_job(job_id)
             
-        self.led_control_queue.put('telegram:' + str(False))
+        self.status.set_led('telegram', False)
 
     #------------------------------------------------------------------------------------------
     # voice
 
     async def handle_speak(self, event,v_type, user_message=''):
-        self.led_control_queue.put('telegram:' + str(True))
+        self.status.set_led('telegram', True)
 
         # TTS settings
         womanA = 'p339'
@@ -710,7 +1195,7 @@ class TelegramBot:
         
         if not user_message:
             await event.reply('Please provide some text.')
-            self.led_control_queue.put('telegram:' + str(False))
+            self.status.set_led('telegram', False)
             return
 
         if v_type == 'maleA':
@@ -722,16 +1207,23 @@ class TelegramBot:
         elif v_type == 'womanB':
             SPEAKER_ID = 'p335'
 
-        self.log_queue.put(f"User Message: {user_message}\n")
+        self.channel.log(f"User Message: {user_message}\n")
         encoded_text = urllib.parse.quote(user_message)
         full_url = f'{TTS_SERVER_URL}/api/tts?text={encoded_text}&speaker_id={SPEAKER_ID}&style_wav=&language_id={LANGUAGE_ID}'
 
         # Send a request to the Coqui TTS server
         try:
-            self.led_control_queue.put('monolith:' + str(True))
-            response = requests.get(full_url, timeout=30)
-            response.raise_for_status()
-            self.led_control_queue.put('monolith:' + str(False))
+            self.status.set_led('monolith', True)
+            started = time.perf_counter()
+            with tracing.span('tts.request'), self.status.job('speak'):
+                try:
+                    response = await asyncio.to_thread(requests.get, full_url, timeout=30)
+                    response.raise_for_status()
+                except requests.RequestException:
+                    self.record_backend('tts', False, started)
+                    raise
+            self.record_backend('tts', True, started)
+            self.status.set_led('monolith', False)
             
             # The response should contain the audio file in WAV format
             wav_content = response.content
@@ -751,17 +1243,17 @@ class TelegramBot:
                     )
                 ])
             else:
-                self.log_queue.put(f'Error converting audio to MP3\n')
+                self.channel.log(f'Error converting audio to MP3\n')
                 await event.reply('Error converting audio to MP3')
 
         except requests.RequestException as e:
-            self.log_queue.put(f'Error communicating with TTS server: {str(e)}\n')
+            self.channel.log(f'Error communicating with TTS server: {str(e)}\n')
             await event.reply(f'Error communicating with TTS server: {str(e)}')
 
-        self.led_control_queue.put('telegram:' + str(False))
+        self.status.set_led('telegram', False)
 
     async def handle_voice(self, event):
-        self.led_control_queue.put('telegram:'+ str(True))
+        self.status.set_led('telegram', True)
         client_id = str(uuid.uuid4())
 
         user_message = event.message.text.split(None, 1)[1] if len(event.message.text.split()) > 1 else ''
@@ -773,18 +1265,22 @@ class TelegramBot:
 
         if not user_message:
             await event.reply('Please provide some text.')
-            self.led_control_queue.put('telegram:' + str(False))
+            self.status.set_led('telegram', False)
             return
 
         prompt = self.load_json(COMFYUI_VOICE)
         prompt["95"]["inputs"]["text"] = user_message
         prompt["95"]["inputs"]["speaker"] = "Pigston_Banker_ill.ogg" 
 
-        self.log_queue.put(f"Generate Voice Saying: {user_message}\n")
+        self.channel.log(f"Generate Voice Saying: {user_message}\n")
               
-        self.led_control_queue.put('monolith:'+ str(True))
-        raw_flac,error = comfyui_generation.do_stuff('audio',prompt,client_id)
-        self.led_control_queue.put('monolith:'+ str(False))
+        self.status.set_led('monolith', True)
+        job_id = self.journal_comfyui(event, 'voice', 'audio', prompt, client_id)
+        with self.status.job('voice'):
+            raw_flac,error = await self.run_comfyui(
+                'voice', 'audio', prompt, client_id, partial(self.channel.progress, client_id, 'voice'),
+                job_id=job_id, user=event.sender_id)
+        self.status.set_led('monolith', False)
         if raw_flac is not None:
             mp3_data = self.convert_audio_to_mp3(raw_flac,"flac")
             if mp3_data is not None:
@@ -801,20 +1297,21 @@ class TelegramBot:
                     )
                 ])
             else:
-                self.log_queue.put(f'Error converting audio to MP3\n')
+                self.channel.log(f'Error converting audio to MP3\n')
                 await event.reply('Error converting audio to MP3')
         else:
             c_error = f"ComfyUI error:\n{error}"
-            self.log_queue.put(f"{c_error}\n")
+            self.channel.log(f"{c_error}\n")
             await event.reply(text=f"{c_error}")
+        self.finish_job(job_id)
 
-        self.led_control_queue.put('telegram:'+ str(False))
+        self.status.set_led('telegram', False)
 
     #------------------------------------------------------------------------------------------
     # music
 
     async def handle_music(self, event, file_length=20, user_message=''):
-        self.led_control_queue.put('telegram:' + str(True))
+        self.status.set_led('telegram', True)
         client_id = str(uuid.uuid4())
         
         if not user_message:
@@ -826,7 +1323,7 @@ class TelegramBot:
         
         if not user_message:
             await event.reply('Please provide some text.')
-            self.led_control_queue.put('telegram:' + str(False))
+            self.status.set_led('telegram', False)
             return
         
         # Load prompt template
@@ -836,13 +1333,18 @@ class TelegramBot:
         # Update prompt with user message and random seed
         prompt["6"]["inputs"]["text"] = user_message
         prompt["3"]["inputs"]["seed"] = random.randint(1, 4294967294)
+        degraded = self.shed_gpu_load(prompt)
 
         # Log and start generation
-        self.log_queue.put(f"Generating Music File about: {user_message}\n")
-        self.led_control_queue.put('monolith:' + str(True))
+        self.channel.log(f"Generating Music File about: {user_message}\n")
+        self.status.set_led('monolith', True)
         
-        audio_files, error = comfyui_generation.do_stuff('audio', prompt, client_id)
-        self.led_control_queue.put('monolith:' + str(False))
+        job_id = self.journal_comfyui(event, 'music', 'audio', prompt, client_id, degraded)
+        with self.status.job('music'):
+            audio_files, error = await self.run_comfyui(
+                'music', 'audio', prompt, client_id, partial(self.channel.progress, client_id, 'music'),
+                job_id=job_id, user=event.sender_id)
+        self.status.set_led('monolith', False)
 
         if audio_files is not None:
             try:
@@ -881,28 +1383,37 @@ class TelegramBot:
                         )
                         
                         # Log success
-                        self.log_queue.put(f"Successfully sent audio file {i}\n")
+                        self.channel.log(f"Successfully sent audio file {i}\n")
                         
                     except Exception as e:
                         error_msg = f"Error processing audio file {i}: {str(e)}"
-                        self.log_queue.put(f"{error_msg}\n")
+                        self.channel.log(f"{error_msg}\n")
                         await event.reply(error_msg)
+                if degraded:
+                    await event.reply(degraded)
                         
             except Exception as e:
                 error_msg = f"Error getting user info: {str(e)}"
-                self.log_queue.put(f"{error_msg}\n")
+                self.channel.log(f"{error_msg}\n")
                 await event.reply(error_msg)
         else:
             error_msg = f"ComfyUI error:\n{error}"
-            self.log_queue.put(f"{error_msg}\n")
+            self.channel.log(f"{error_msg}\n")
             await event.reply(error_msg)
+        self.finish_job(job_id)
 
-        self.led_control_queue.put('telegram:' + str(False))
+        self.status.set_led('telegram', False)
 
-def start_bot(log_queue, led_control_queue):
-    bot = TelegramBot(log_queue, led_control_queue)
+def start_bot(channel, heartbeat_queue=None, status=None, frame=None, telemetry_buffer=None):
+    profiling.install_signal_handler()
+    bot = TelegramBot(channel, heartbeat_queue, status, frame, telemetry_buffer)
     asyncio.run(bot.start())
 
 # If this script is run directly, start the bot
 if __name__ == '__main__':
-    start_bot(None, None)
\ No newline at end of file
+    # No GUI to read the channel or the board, but the board still lives in /dev/shm
+    board = status_board.StatusBoard(create=True)
+    try:
+        start_bot(ipc_channel.NullSender(), status=board)
+    finally:
+        board.close()
\ No newline at end of file
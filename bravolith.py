@@ -1,8 +1,10 @@
 import multiprocessing
-import tkinter as tk
-from retro_terminal import RetroTerminal
-from bot_telegram import start_bot
-import time
+import ipc_channel
+import profiling
+import shared_frame
+import status_board
+import supervisor
+import telemetry
 import os
 import logging
 from dotenv import load_dotenv
@@ -10,71 +12,74 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 LOG_FILE_BRAVO = os.getenv('LOG_FILE')
+# 'png:DIRECTORY' or 'fb:/dev/fbN' renders the terminal offscreen instead of opening a Tk window
+RENDER_OUTPUT = os.getenv('RENDER_OUTPUT')
 logging.basicConfig(filename=LOG_FILE_BRAVO, level=logging.ERROR,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Shared queues for communication between processes
-log_queue = multiprocessing.Queue()
-led_control_queue = multiprocessing.Queue()
+# Bot -> GUI events (LEDs, logs, progress) and child -> supervisor heartbeats
+channel = ipc_channel.Channel()
+heartbeat_queue = multiprocessing.Queue()
 
-def run_gui(log_queue, led_control_queue):
-    root = tk.Tk()
-    terminal = RetroTerminal(root, 800, 600, log_queue=log_queue, led_control_queue=led_control_queue)
+def run_gui(channel_receiver, heartbeat_queue=None, status=None, frame=None, telemetry_buffer=None):
+    # Imported here so neither the parent nor the bot process loads Tk, OpenCV, PIL or gpiod
+    import tkinter as tk
+    import offscreen
+    from retro_terminal import HeadlessTerminal, RetroTerminal
+
+    if RENDER_OUTPUT:
+        root = offscreen.HeadlessRoot(offscreen.open_sink(RENDER_OUTPUT))
+        terminal_class = HeadlessTerminal
+    else:
+        root = tk.Tk()
+        terminal_class = RetroTerminal
+    profiling.install_signal_handler()
+    # The terminal is event driven now, so a slower beat keeps idle wakeups down
+    watchdog = profiling.monitor_tk(root, interval=0.5)
+    terminal = terminal_class(root, 800, 600, channel=channel_receiver, status=status, shared_frame=frame,
+                              telemetry=telemetry_buffer)
+
+    def heartbeat():
+        supervisor.send_heartbeat(heartbeat_queue, 'gui')
+        root.after(int(supervisor.HEARTBEAT_INTERVAL * 1000), heartbeat)
+
+    heartbeat()
     root.mainloop()
 
+def run_bot(channel_sender, heartbeat_queue=None, status=None, frame=None, telemetry_buffer=None):
+    # Imported here so neither the parent nor the GUI process loads telethon or requests
+    from bot_telegram import start_bot
+
+    start_bot(channel_sender, heartbeat_queue, status, frame, telemetry_buffer)
+
 def main():
-    max_restarts = 3
-    restart_count = 0
-    
-    while restart_count < max_restarts:
-        try:
-            logging.error("Starting Bravolith application")
-            
-            # Start GUI process
-            gui_process = multiprocessing.Process(target=run_gui, args=(log_queue, led_control_queue))
-            gui_process.start()
+    logging.error("Starting Bravolith application")
+    # Owned by the parent so it outlives child restarts
+    status = status_board.StatusBoard(create=True)
+    frame = shared_frame.SharedFrame(create=True)
+    telemetry_buffer = telemetry.TelemetryBuffer(create=True)
+    # Sampled here so readings continue while either child restarts
+    sampler = telemetry.TelemetrySampler(telemetry_buffer)
+    # Wakes the GUI once per sample instead of it polling on a timer
+    telemetry_buffer.notify = channel.sender.status_changed
+    sampler.start()
+    bravo_supervisor = supervisor.Supervisor(heartbeat_queue, channel.sender)
+    bravo_supervisor.add('gui', run_gui, (channel.receiver, heartbeat_queue, status, frame, telemetry_buffer),
+                         supervisor.HEARTBEAT_TIMEOUT_GUI, exit_on_clean_exit=True)
+    bravo_supervisor.add('bot', run_bot, (channel.sender, heartbeat_queue, status, frame, telemetry_buffer),
+                         supervisor.HEARTBEAT_TIMEOUT_BOT)
 
-            # Start bot process
-            bot_process = multiprocessing.Process(target=start_bot, args=(log_queue, led_control_queue))
-            bot_process.start()
+    try:
+        bravo_supervisor.run()
+    except KeyboardInterrupt:
+        logging.error("KeyboardInterrupt detected. Shutting down...")
+    finally:
+        sampler.stop()
+        status.close()
+        frame.close()
+        telemetry_buffer.close()
 
-            # Wait for processes to finish
-            gui_process.join()
-            bot_process.join()
-            
-            # If we reach here, both processes have ended normally
-            logging.error("Bravolith application ended normally")
-            break
-            
-        except KeyboardInterrupt:
-            logging.error("KeyboardInterrupt detected. Shutting down...")
-            break
-        except Exception as e:
-            logging.error(f"An error occurred: {e}", exc_info=True)
-            restart_count += 1
-            logging.error(f"Restarting application (attempt {restart_count}/{max_restarts})...")
-        finally:
-            # Terminate processes if they're still running
-            for process in [gui_process, bot_process]:
-                if process.is_alive():
-                    process.terminate()
-                    process.join(timeout=5)
-                    if process.is_alive():
-                        process.kill()
-            
-            # Clear the queues
-            for queue in [log_queue, led_control_queue]:
-                while not queue.empty():
-                    try:
-                        queue.get_nowait()
-                    except queue.Empty:
-                        pass
-            
-            if restart_count < max_restarts:
-                time.sleep(5)
-    
-    if restart_count == max_restarts:
-        logging.error("Max restart attempts reached. Exiting.")
+    logging.error("Bravolith application ended")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -3,12 +3,17 @@ import urllib.request
 import urllib.parse
 import json, os, logging
 import threading
+import time
+
+import tracing
 
 from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
 COMFYUI_ENDPOINT = os.getenv('COMFYUI_ENDPOINT')
+PROMPT_LOST = "ComfyUI no longer knows this prompt"
+INTERRUPTED = "ComfyUI interrupted this prompt"
 LOG_FILE_TELEGRAM = os.getenv('LOG_FILE_TELEGRAM')
 # Set up logging
 logging.basicConfig(filename=LOG_FILE_TELEGRAM, level=logging.INFO,
@@ -24,56 +29,110 @@ class WebSocketManager:
         ws.connect(f"ws://{self.endpoint}/ws?clientId={client_id}")
         return ws
 
-    def send_prompt(self,toggle_flag, ws, prompt, client_id):
+    def send_prompt(self,toggle_flag, ws, prompt, client_id, on_progress=None, on_queued=None):
         with self.lock:
-            return send_prompt(toggle_flag, ws, prompt, client_id)
+            return send_prompt(toggle_flag, ws, prompt, client_id, on_progress, on_queued)
 
 ws_manager = WebSocketManager(COMFYUI_ENDPOINT)
 
-def do_stuff(toggle_flag, prompt, client_id):
+def do_stuff(toggle_flag, prompt, client_id, on_progress=None, on_queued=None):
+    """
+    on_progress(value, maximum) is called for each sampler progress event,
+    on_queued(prompt_id) once ComfyUI has accepted the prompt. A prompt
+    interrupted before it finished returns (None, INTERRUPTED).
+    """
     try:
-        ws = ws_manager.create_connection(client_id)
-        files = ws_manager.send_prompt(toggle_flag, ws, prompt, client_id)
+        with tracing.span('comfyui.connect'):
+            ws = ws_manager.create_connection(client_id)
+        files = ws_manager.send_prompt(toggle_flag, ws, prompt, client_id, on_progress, on_queued)
         ws.close()
-        
-        # Create a list to store all file data
-        all_files = []
-        
-        for node_id in files:
-            if files[node_id]:
-                # Append all files from this node
-                all_files.extend(files[node_id])
-        
-        if all_files:
-            return all_files, None
-        else:
-            logging.error("Empty results from API.")
-            return None, "Sorry, I couldn't process your message.(sent bad json)"
+        if files is None:
+            return None, INTERRUPTED
+        return flatten_outputs(files)
             
     except Exception as e:
         logging.error(f"Error in do_stuff: {str(e)}")
         return None, str(e)
 
-def send_prompt(toggle_flag, ws, prompt, client_id):
-    prompt_id = queue_prompt(prompt, client_id)['prompt_id']
-    output_files = {}
+def flatten_outputs(files):
+    # Create a list to store all file data
+    all_files = []
+    
+    for node_id in files:
+        if files[node_id]:
+            # Append all files from this node
+            all_files.extend(files[node_id])
+    
+    if all_files:
+        return all_files, None
+    else:
+        logging.error("Empty results from API.")
+        return None, "Sorry, I couldn't process your message.(sent bad json)"
+
+def resume(toggle_flag, prompt_id, poll_interval=2.0):
+    """
+    Collects the outputs of a prompt queued by an earlier bot process,
+    waiting while ComfyUI still has it queued or running. Returns
+    (files, error) like do_stuff; error is PROMPT_LOST if ComfyUI has
+    neither a history entry nor a queue entry for it (e.g. it restarted).
+    """
+    try:
+        while True:
+            history = get_history(prompt_id).get(prompt_id)
+            if history is not None:
+                return flatten_outputs(collect_outputs(toggle_flag, history))
+            queue = get_queue()
+            queued = {entry[1] for entry in queue.get('queue_running', []) + queue.get('queue_pending', [])}
+            if prompt_id not in queued:
+                # It may have finished between the two requests
+                history = get_history(prompt_id).get(prompt_id)
+                if history is not None:
+                    return flatten_outputs(collect_outputs(toggle_flag, history))
+                return None, PROMPT_LOST
+            time.sleep(poll_interval)
+    except Exception as e:
+        logging.error(f"Error resuming prompt {prompt_id}: {str(e)}")
+        return None, str(e)
 
-    while True:
-        out = ws.recv()
-        if isinstance(out, str):
-            message = json.loads(out)
-            if message['type'] == 'executing' and message['data']['node'] is None and message['data']['prompt_id'] == prompt_id:
-                break
-        else:
-            continue
+def send_prompt(toggle_flag, ws, prompt, client_id, on_progress=None, on_queued=None):
+    with tracing.span('comfyui.queue_prompt'):
+        prompt_id = queue_prompt(prompt, client_id)['prompt_id']
+    if on_queued is not None:
+        on_queued(prompt_id)
 
-    history = get_history(prompt_id)[prompt_id]
+    with tracing.span('comfyui.ws_wait', prompt_id=prompt_id):
+        while True:
+            out = ws.recv()
+            if isinstance(out, str):
+                message = json.loads(out)
+                if message['type'] == 'executing' and message['data']['node'] is None and message['data']['prompt_id'] == prompt_id:
+                    break
+                if message['type'] == 'execution_interrupted' and message['data'].get('prompt_id') == prompt_id:
+                    # e.g. a speculative render making way for a user job; not a backend failure
+                    logging.info(f"ComfyUI prompt {prompt_id} was interrupted")
+                    return None
+                if message['type'] == 'execution_error' and message['data'].get('prompt_id') == prompt_id:
+                    logging.warning(f"ComfyUI prompt {prompt_id} ended with {message['type']}")
+                    break
+                if message['type'] == 'progress' and on_progress is not None:
+                    on_progress(message['data']['value'], message['data']['max'])
+            else:
+                continue
+
+    with tracing.span('comfyui.get_history'):
+        history = get_history(prompt_id)[prompt_id]
+    return collect_outputs(toggle_flag, history)
+
+def collect_outputs(toggle_flag, history):
+    output_files = {}
     for node_id in history['outputs']:
         node_output = history['outputs'][node_id]
         output = []
         if toggle_flag in node_output:
             for file in node_output[toggle_flag]:
-                file_data = get_file(file['filename'], file['subfolder'], file['type'])
+                with tracing.span('comfyui.get_file') as attrs:
+                    file_data = get_file(file['filename'], file['subfolder'], file['type'])
+                    attrs['bytes'] = len(file_data)
                 output.append(file_data)
                 
         output_files[node_id] = output
@@ -92,6 +151,16 @@ def get_file(filename, subfolder, folder_type):
     with urllib.request.urlopen("http://{}/view?{}".format(COMFYUI_ENDPOINT, url_values)) as response:
         return response.read()
 
+def get_queue():
+    with urllib.request.urlopen("http://{}/queue".format(COMFYUI_ENDPOINT), timeout=5) as response:
+        return json.loads(response.read())
+
+def interrupt():
+    """Stops whatever prompt ComfyUI is executing right now."""
+    req = urllib.request.Request("http://{}/interrupt".format(COMFYUI_ENDPOINT), data=b'', method='POST')
+    with urllib.request.urlopen(req, timeout=5) as response:
+        response.read()
+
 def get_history(prompt_id):
     with urllib.request.urlopen("http://{}/history/{}".format(COMFYUI_ENDPOINT, prompt_id)) as response:
         return json.loads(response.read())
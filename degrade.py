@@ -0,0 +1,155 @@
+"""
+Graceful degradation under load.
+
+A LoadShedder turns backend pressure into a level from 0 (full quality) to
+DEGRADE_MAX_LEVEL. The level rises by one for every DEGRADE_QUEUE_DEPTH
+jobs waiting, or for every `latency` seconds the recent requests took
+(wait plus run) while a backlog exists. It falls back one level per
+DEGRADE_RECOVER_SECONDS while work is still queued, and straight to full
+quality once the backlog clears.
+
+At the top level a job runs at the configured floors, interpolated in
+between:
+  sampler steps    x DEGRADE_MIN_STEPS
+  width and height x DEGRADE_MIN_SCALE, kept to multiples of 64
+  audio seconds    x DEGRADE_MIN_AUDIO, never below DEGRADE_MIN_AUDIO_SECONDS
+  LLM max_length   x DEGRADE_MIN_LENGTH
+Every change is described so the user can be told what they got.
+"""
+import os
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DEGRADE_ENABLED = os.getenv('DEGRADE_ENABLED', 'true').lower() == 'true'
+DEGRADE_MAX_LEVEL = int(os.getenv('DEGRADE_MAX_LEVEL', 3))
+DEGRADE_QUEUE_DEPTH = int(os.getenv('DEGRADE_QUEUE_DEPTH', 2))  # waiting jobs per level
+DEGRADE_GPU_LATENCY = float(os.getenv('DEGRADE_GPU_LATENCY', 180))  # seconds of recent latency per level
+DEGRADE_LLM_LATENCY = float(os.getenv('DEGRADE_LLM_LATENCY', 45))
+DEGRADE_RECOVER_SECONDS = float(os.getenv('DEGRADE_RECOVER_SECONDS', 60))
+DEGRADE_MIN_STEPS = float(os.getenv('DEGRADE_MIN_STEPS', 0.5))
+DEGRADE_MIN_SCALE = float(os.getenv('DEGRADE_MIN_SCALE', 0.75))
+DEGRADE_MIN_AUDIO = float(os.getenv('DEGRADE_MIN_AUDIO', 0.25))
+DEGRADE_MIN_AUDIO_SECONDS = float(os.getenv('DEGRADE_MIN_AUDIO_SECONDS', 10))
+DEGRADE_MIN_LENGTH = float(os.getenv('DEGRADE_MIN_LENGTH', 0.4))
+LATENCY_SMOOTHING = 0.3
+MIN_SIDE = 256
+
+
+def factor(level, floor, max_level=DEGRADE_MAX_LEVEL):
+    """1.0 at level 0 down to `floor` at max_level."""
+    if level <= 0 or max_level <= 0:
+        return 1.0
+    return 1.0 - (1.0 - floor) * min(level, max_level) / max_level
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class LoadShedder:
+    def __init__(self, name, latency=DEGRADE_GPU_LATENCY, queue_depth=DEGRADE_QUEUE_DEPTH,
+                 max_level=DEGRADE_MAX_LEVEL, recover_seconds=DEGRADE_RECOVER_SECONDS, enabled=DEGRADE_ENABLED):
+        self.name = name
+        self.latency = latency
+        self.queue_depth = queue_depth
+        self.max_level = max_level
+        self.recover_seconds = recover_seconds
+        self.enabled = enabled
+        self.current = 0
+        self.changed_at = time.monotonic()
+        self.recent = None  # smoothed latency of recent requests
+        self.stats = {'degraded': 0, 'full': 0}
+
+    def observe(self, seconds):
+        self.recent = seconds if self.recent is None else self.recent + LATENCY_SMOOTHING * (seconds - self.recent)
+
+    def update(self, depth, now=None):
+        """Level for a job arriving behind `depth` waiting jobs."""
+        if not self.enabled:
+            return 0
+        now = time.monotonic() if now is None else now
+        if depth <= 0:
+            # Backlog cleared: straight back to full quality
+            self.current = 0
+            self.changed_at = now
+            return 0
+        target = depth // self.queue_depth
+        if self.recent is not None and self.latency > 0:
+            target = max(target, int(self.recent // self.latency))
+        target = min(target, self.max_level)
+        if target > self.current:
+            self.current = target
+            self.changed_at = now
+        elif target < self.current and now - self.changed_at >= self.recover_seconds:
+            self.current -= 1
+            self.changed_at = now
+        return self.current
+
+    def count(self, degraded):
+        self.stats['degraded' if degraded else 'full'] += 1
+
+    def metrics(self):
+        return dict(self.stats, level=self.current, max_level=self.max_level,
+                    recent_latency=None if self.recent is None else round(self.recent, 1))
+
+
+def degrade_workflow(workflow, level, max_level=DEGRADE_MAX_LEVEL):
+    """Steps a ComfyUI API workflow down in place; returns descriptions of what changed."""
+    changes = []
+    if level <= 0:
+        return changes
+    steps_factor = factor(level, DEGRADE_MIN_STEPS, max_level)
+    scale = factor(level, DEGRADE_MIN_SCALE, max_level)
+    audio_factor = factor(level, DEGRADE_MIN_AUDIO, max_level)
+    for node in workflow.values():
+        inputs = node.get('inputs', {})
+        class_type = node.get('class_type', '')
+        steps = _number(inputs.get('steps'))
+        if steps:
+            reduced = max(1, round(steps * steps_factor))
+            if reduced < steps:
+                # Keep the template's type: some sampler nodes take steps as a string
+                inputs['steps'] = str(reduced) if isinstance(inputs['steps'], str) else reduced
+                changes.append(f"{reduced} steps instead of {steps:.0f}")
+        if class_type.startswith('EmptyLatentAudio'):
+            seconds = _number(inputs.get('seconds'))
+            if seconds:
+                reduced = max(min(seconds, DEGRADE_MIN_AUDIO_SECONDS), round(seconds * audio_factor))
+                if reduced < seconds:
+                    inputs['seconds'] = reduced
+                    changes.append(f"{reduced:.0f} s instead of {seconds:.0f} s")
+        elif class_type.startswith('Empty'):
+            width, height = _number(inputs.get('width')), _number(inputs.get('height'))
+            if width and height:
+                new_width = max(MIN_SIDE, int(width * scale) // 64 * 64)
+                new_height = max(MIN_SIDE, int(height * scale) // 64 * 64)
+                if (new_width, new_height) != (width, height) and new_width <= width and new_height <= height:
+                    inputs['width'], inputs['height'] = new_width, new_height
+                    changes.append(f"{new_width}x{new_height} instead of {width:.0f}x{height:.0f}")
+    return changes
+
+
+def degrade_max_length(prompt, level, max_level=DEGRADE_MAX_LEVEL):
+    """Shortens a Kobold generate request in place; returns descriptions of what changed."""
+    length = prompt.get('max_length')
+    if level <= 0 or not length:
+        return []
+    reduced = max(1, round(length * factor(level, DEGRADE_MIN_LENGTH, max_level)))
+    if reduced >= length:
+        return []
+    prompt['max_length'] = reduced
+    return [f"replies up to {reduced} tokens instead of {length}"]
+
+
+def notice(changes):
+    """What to tell the user about a degraded result, or None."""
+    if not changes:
+        return None
+    return f"⚡ Busy right now, so this was made at reduced quality: {', '.join(changes)}."
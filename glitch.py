@@ -0,0 +1,75 @@
+"""
+Glitch effect for the terminal log view.
+
+The displayed text is split into a character list once, when it changes.
+Each frame copies that list, corrupts a random subset of positions and
+joins it back. Positions are drawn by skipping ahead a geometrically
+distributed gap instead of rolling a die per character, so a frame costs
+one C-level copy and join plus a few random draws per corrupted character.
+"""
+import math
+import os
+import random
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+GLITCH_RATE = float(os.getenv('GLITCH_RATE', 0.02))  # chance per character per frame
+GLITCH_CHARS = os.getenv('GLITCH_CHARS', "@#$%&*░▒▓█▄▀▐")
+GLITCH_COLORS = os.getenv('GLITCH_COLORS', "blue,magenta,cyan,hot pink").split(',')
+GLITCH_COLOR_CHANCE = float(os.getenv('GLITCH_COLOR_CHANCE', 0.1))  # chance per frame
+GLITCH_INTERVAL = int(os.getenv('GLITCH_INTERVAL', 0))  # ms between idle glitch frames, 0 = off
+
+
+class GlitchEngine:
+    def __init__(self, rate=GLITCH_RATE, chars=GLITCH_CHARS, colors=GLITCH_COLORS,
+                 color_chance=GLITCH_COLOR_CHANCE, base_color="green", rng=None):
+        self.rate = min(max(rate, 0.0), 1.0)
+        self.chars = chars
+        self.colors = colors
+        self.color_chance = color_chance
+        self.base_color = base_color
+        self.rng = rng or random.Random()
+        self.log_keep = math.log1p(-self.rate) if 0 < self.rate < 1 else None
+        self.set_text("")
+
+    def set_text(self, text):
+        self.text = text
+        self.base = list(text)
+
+    def positions(self):
+        """Yields the positions to corrupt this frame, each chosen with probability `rate`."""
+        base = self.base
+        count = len(base)
+        if self.rate <= 0 or not count or not self.chars:
+            return
+        if self.log_keep is None:
+            yield from (index for index, char in enumerate(base) if char != '\n')
+            return
+        random_value = self.rng.random
+        index = -1
+        while True:
+            # Number of untouched characters before the next corrupted one
+            index += 1 + int(math.log(1.0 - random_value()) / self.log_keep)
+            if index >= count:
+                return
+            # Newlines are never corrupted, so the layout stays put
+            if base[index] != '\n':
+                yield index
+
+    def render(self):
+        """Returns (text, color) for one frame."""
+        positions = list(self.positions())
+        if positions:
+            frame = self.base.copy()
+            for position, char in zip(positions, self.rng.choices(self.chars, k=len(positions))):
+                frame[position] = char
+            text = "".join(frame)
+        else:
+            text = self.text
+
+        if self.colors and self.rng.random() < self.color_chance:
+            return text, self.rng.choice(self.colors)
+        return text, self.base_color
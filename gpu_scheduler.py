@@ -0,0 +1,287 @@
+"""
+Model-affinity scheduling for ComfyUI jobs.
+
+The image workflows load Flux (a GGUF unet, two text encoders and a VAE),
+music loads Stable Audio and voice runs WhisperSpeech. ComfyUI keeps only
+what fits in VRAM, so interleaving /image, /music and /voice makes the GPU
+box unload and reload several gigabytes of weights between jobs.
+
+Every ComfyUI job takes the single GPU slot through GpuScheduler.slot(),
+tagged with the model set of its workflow. When the slot frees, a waiting
+job that uses the models already loaded goes ahead of jobs ranked before
+it (see the policies below) that would force a swap. It never overtakes a
+job that has waited AFFINITY_MAX_WAIT seconds or been passed over
+AFFINITY_MAX_BYPASS times, so nothing starves.
+
+Swap cost is learned per model set as the difference between cold (first
+job after a swap) and warm job durations of successful user jobs;
+warm-ups, speculative pregen renders and failed or interrupted runs say
+little about a real request and are not learned from. Until both have
+been seen, MODEL_SWAP_SECONDS is assumed. Time saved is that estimate
+summed over the swaps avoided by reordering.
+
+Which waiting job is considered first is up to GPU_SCHEDULER_POLICY, with
+model affinity applied on top:
+  fifo  arrival order;
+  sjf   shortest estimated job first, each waited second taking SJF_AGING
+        seconds off a job's estimate so long renders still get their turn;
+  fair  cost-weighted fair share: the user with the least estimated GPU
+        time used recently (halving every FAIR_SHARE_HALF_LIFE seconds)
+        goes first, smaller jobs breaking ties.
+A job's cost comes from its workflow (megapixels x steps for images,
+seconds x steps for audio, characters for WhisperSpeech) and is turned
+into seconds with a per model set rate learned from the same warm runs.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+AFFINITY_MAX_WAIT = float(os.getenv('AFFINITY_MAX_WAIT', 90))  # seconds a job may be passed over
+AFFINITY_MAX_BYPASS = int(os.getenv('AFFINITY_MAX_BYPASS', 3))  # jobs allowed to overtake one waiter
+MODEL_SWAP_SECONDS = float(os.getenv('MODEL_SWAP_SECONDS', 20))  # assumed swap cost until measured
+GPU_SCHEDULER_POLICY = os.getenv('GPU_SCHEDULER_POLICY', 'sjf')  # fifo, sjf or fair
+SJF_AGING = float(os.getenv('SJF_AGING', 1.0))  # estimated seconds forgiven per second waited
+FAIR_SHARE_HALF_LIFE = float(os.getenv('FAIR_SHARE_HALF_LIFE', 600))
+DURATION_SMOOTHING = 0.3
+POLICIES = ('fifo', 'sjf', 'fair')
+# Jobs the bot starts on its own: shrunk or interruptible renders, never learned from,
+# and not counted as queue depth users wait behind
+BACKGROUND_KINDS = ('warmup', 'pregen')
+
+MODEL_EXTENSIONS = ('.gguf', '.safetensors', '.ckpt', '.pt', '.pth', '.bin', '.onnx')
+# Seconds per cost unit assumed until a model set has a warm run to learn from
+COST_PRIORS = {
+    'megapixel_steps': 4.0,
+    'audio_second_steps': 0.02,
+    'characters': 0.1,
+    'job': 10.0,
+}
+
+
+def workflow_models(workflow):
+    """
+    The model set a ComfyUI API workflow loads: every input naming a
+    weights file. Custom nodes that load their own weights (IF_WhisperSpeech)
+    name none, so such workflows are keyed by their node types instead.
+    """
+    files = set()
+    for node in workflow.values():
+        for value in node.get('inputs', {}).values():
+            if isinstance(value, str) and value.lower().endswith(MODEL_EXTENSIONS):
+                files.add(value)
+    if files:
+        return frozenset(files)
+    return frozenset(f"node:{node.get('class_type')}" for node in workflow.values())
+
+
+def _number(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def workflow_cost(workflow):
+    """(unit, amount) of work in a workflow, see COST_PRIORS for the units."""
+    steps = 0.0
+    pixels = audio_seconds = characters = 0.0
+    for node in workflow.values():
+        inputs = node.get('inputs', {})
+        steps = max(steps, _number(inputs.get('steps')))
+        batch = _number(inputs.get('batch_size'), 1.0) or 1.0
+        class_type = node.get('class_type', '')
+        if class_type.startswith('EmptyLatentAudio'):
+            audio_seconds += _number(inputs.get('seconds')) * batch
+        elif class_type.startswith('Empty') and 'width' in inputs and 'height' in inputs:
+            pixels += _number(inputs['width']) * _number(inputs['height']) * batch
+        elif class_type == 'IF_WhisperSpeech':
+            characters += len(str(inputs.get('text', '')))
+    steps = steps or 1.0
+    if pixels:
+        return 'megapixel_steps', pixels / 1e6 * steps
+    if audio_seconds:
+        return 'audio_second_steps', audio_seconds * steps
+    if characters:
+        return 'characters', characters
+    return 'job', 1.0
+
+
+def describe(models):
+    """Short label for logs and metrics: the first weights file, alphabetically."""
+    if not models:
+        return 'none'
+    first = sorted(models)[0]
+    return first if len(models) == 1 else f"{first} +{len(models) - 1}"
+
+
+class Waiter:
+    __slots__ = ('models', 'kind', 'future', 'queued', 'bypassed', 'cold', 'cost', 'estimate', 'user',
+                 'succeeded')
+
+    def __init__(self, models, kind, future, cost, estimate, user):
+        self.models = models
+        self.kind = kind
+        self.future = future
+        self.queued = time.monotonic()
+        self.bypassed = 0
+        self.cold = False
+        self.cost = cost  # (unit, amount)
+        self.estimate = estimate  # seconds
+        self.user = user
+        self.succeeded = False  # set by the holder of the slot once the job has produced its output
+
+
+class GpuScheduler:
+    def __init__(self, max_wait=AFFINITY_MAX_WAIT, max_bypass=AFFINITY_MAX_BYPASS,
+                 swap_seconds=MODEL_SWAP_SECONDS, policy=GPU_SCHEDULER_POLICY, aging=SJF_AGING,
+                 half_life=FAIR_SHARE_HALF_LIFE):
+        if policy not in POLICIES:
+            logging.warning(f"Unknown GPU_SCHEDULER_POLICY {policy!r}, using fifo")
+            policy = 'fifo'
+        self.max_wait = max_wait
+        self.max_bypass = max_bypass
+        self.swap_seconds = swap_seconds
+        self.policy = policy
+        self.aging = aging
+        self.half_life = half_life
+        self.loaded = None  # model set of the last job given the slot
+        self.busy = False
+        self.waiting = []  # Waiters in arrival order
+        # model set -> {'cold': seconds, 'warm': seconds}, smoothed
+        self.durations = {}
+        # model set -> seconds per cost unit, learned from warm runs
+        self.rates = {}
+        # user -> (estimated seconds used, monotonic time), decaying for fair share
+        self.usage = {}
+        self.stats = {'jobs': 0, 'swaps': 0, 'avoided_swaps': 0, 'forced': 0, 'seconds_saved': 0.0}
+
+    def estimate(self, models, cost):
+        unit, amount = cost
+        return amount * self.rates.get(models, COST_PRIORS.get(unit, COST_PRIORS['job']))
+
+    def used(self, user, now):
+        used, stamp = self.usage.get(user, (0.0, now))
+        return used * 0.5 ** ((now - stamp) / self.half_life)
+
+    def rank(self, now):
+        """Waiters in the order the policy would run them, before model affinity."""
+        if self.policy == 'sjf':
+            return sorted(self.waiting, key=lambda waiter: waiter.estimate - self.aging * (now - waiter.queued))
+        if self.policy == 'fair':
+            return sorted(self.waiting, key=lambda waiter: (self.used(waiter.user, now) + waiter.estimate,
+                                                            waiter.queued))
+        return list(self.waiting)
+
+    def swap_cost(self, models):
+        measured = self.durations.get(models, {})
+        if 'cold' in measured and 'warm' in measured:
+            return max(0.0, measured['cold'] - measured['warm'])
+        return self.swap_seconds
+
+    def user_waiting(self):
+        """Waiters for user jobs, leaving out BACKGROUND_KINDS."""
+        return [waiter for waiter in self.waiting if waiter.kind not in BACKGROUND_KINDS]
+
+    def metrics(self):
+        user_waiting = self.user_waiting()
+        return dict(self.stats,
+                    seconds_saved=round(self.stats['seconds_saved'], 1),
+                    waiting=len(user_waiting),
+                    background_waiting=len(self.waiting) - len(user_waiting),
+                    loaded=describe(self.loaded) if self.loaded is not None else None,
+                    swap_cost={describe(models): round(self.swap_cost(models), 1) for models in self.durations},
+                    policy=self.policy,
+                    queued_seconds=round(sum(waiter.estimate for waiter in user_waiting), 1),
+                    rates={describe(models): round(rate, 4) for models, rate in self.rates.items()})
+
+    def pick(self, now):
+        """The waiter to run next: the policy's first choice unless a warm job can go first."""
+        ranked = self.rank(now)
+        head = ranked[0]
+        if self.loaded is None or head.models == self.loaded:
+            return head
+        overdue = now - head.queued >= self.max_wait or head.bypassed >= self.max_bypass
+        for index, waiter in enumerate(ranked):
+            if waiter.models != self.loaded:
+                continue
+            if overdue:
+                # A warm job was available, but the head has waited long enough
+                self.stats['forced'] += 1
+                return head
+            for passed in ranked[:index]:
+                passed.bypassed += 1
+            self.stats['avoided_swaps'] += 1
+            self.stats['seconds_saved'] += self.swap_cost(head.models)
+            return waiter
+        return head
+
+    def dispatch(self):
+        while not self.busy and self.waiting:
+            now = time.monotonic()
+            waiter = self.pick(now)
+            self.waiting.remove(waiter)
+            if waiter.future.done():  # cancelled while waiting
+                continue
+            waiter.cold = waiter.models != self.loaded
+            if waiter.cold and self.loaded is not None:
+                self.stats['swaps'] += 1
+            self.loaded = waiter.models
+            self.usage[waiter.user] = (self.used(waiter.user, now) + waiter.estimate, now)
+            self.busy = True
+            waiter.future.set_result(None)
+
+    def release(self):
+        self.busy = False
+        self.dispatch()
+
+    def record(self, waiter, seconds):
+        self.stats['jobs'] += 1
+        if not waiter.succeeded or waiter.kind in BACKGROUND_KINDS:
+            return
+        measured = self.durations.setdefault(waiter.models, {})
+        key = 'cold' if waiter.cold else 'warm'
+        previous = measured.get(key)
+        measured[key] = seconds if previous is None else \
+            previous + DURATION_SMOOTHING * (seconds - previous)
+        # Load time would inflate the rate, so only warm runs refine estimates
+        amount = waiter.cost[1]
+        if not waiter.cold and amount > 0:
+            rate = seconds / amount
+            previous = self.rates.get(waiter.models)
+            self.rates[waiter.models] = rate if previous is None else \
+                previous + DURATION_SMOOTHING * (rate - previous)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, models, kind='', cost=('job', 1.0), user=None):
+        """
+        Holds the GPU for one ComfyUI job using `models`; yields the Waiter
+        (see .cold, .estimate). cost is workflow_cost() of the job, user
+        whoever it counts against for fair share. Set .succeeded on the
+        Waiter for the run's duration to be learned from.
+        """
+        waiter = Waiter(models, kind, asyncio.get_running_loop().create_future(),
+                        cost, self.estimate(models, cost), user)
+        self.waiting.append(waiter)
+        self.dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self.waiting:
+                self.waiting.remove(waiter)
+            elif waiter.future.done() and not waiter.future.cancelled():
+                # Granted the slot in the same tick we were cancelled
+                self.release()
+            raise
+        started = time.monotonic()
+        try:
+            yield waiter
+        finally:
+            self.record(waiter, time.monotonic() - started)
+            self.release()
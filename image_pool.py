@@ -0,0 +1,242 @@
+"""
+Pre-rendered "Random Generation" images, made while the GPU has nothing
+better to do.
+
+A background producer in the bot watches the ComfyUI queue. Once both the
+queue and the bot have been idle for PREGEN_IDLE_SECONDS, it renders one
+random Flux prompt for the preset with the fewest images ready. It stops
+at PREGEN_POOL_SIZE images per preset or the PREGEN_DISK_MB budget. A
+Random request without user text then takes an image from the pool
+instead of waiting for a full run. Images live on disk under PREGEN_DIR, so
+the pool survives bot restarts. A user job arriving mid-render stops the
+speculative one: a render still waiting for the GPU slot is cancelled, one
+about to be submitted is refused, and one ComfyUI is executing is
+interrupted once /queue confirms it is the running prompt.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+
+import comfyui_generation
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+PREGEN_ENABLED = os.getenv('PREGEN_ENABLED', 'false').lower() == 'true'
+PREGEN_DIR = os.getenv('PREGEN_DIR', 'pregen')
+PREGEN_PRESETS = [name.strip() for name in os.getenv('PREGEN_PRESETS', 'square,portrait,landscape').split(',')
+                  if name.strip()]
+PREGEN_POOL_SIZE = int(os.getenv('PREGEN_POOL_SIZE', 2))  # images kept per preset
+PREGEN_DISK_MB = float(os.getenv('PREGEN_DISK_MB', 200))
+PREGEN_IDLE_SECONDS = float(os.getenv('PREGEN_IDLE_SECONDS', 120))  # quiet time before rendering
+PREGEN_POLL_INTERVAL = float(os.getenv('PREGEN_POLL_INTERVAL', 15))  # seconds between queue checks
+SUBMIT_WAIT = 5.0  # seconds yield_gpu waits for a render being submitted to get its prompt id
+
+
+class ImagePool:
+    def __init__(self, directory=PREGEN_DIR, presets=PREGEN_PRESETS, pool_size=PREGEN_POOL_SIZE,
+                 disk_budget=PREGEN_DISK_MB * 2**20, idle_seconds=PREGEN_IDLE_SECONDS):
+        self.directory = directory
+        self.presets = presets
+        self.pool_size = pool_size
+        self.disk_budget = disk_budget
+        self.idle_seconds = idle_seconds
+        # preset -> [(created, image path)], oldest first
+        self.ready = {preset: [] for preset in presets}
+        self.idle_since = None
+        self.producing = None  # client id of the speculative render in flight
+        self.render_task = None
+        self.submitting = False  # the render holds the GPU slot and is going to ComfyUI
+        self.prompt_id = None  # set from do_stuff's worker thread once ComfyUI accepted it
+        self.yielded = None  # client id of the render yield_gpu() stopped
+        self.stats = {'hits': 0, 'misses': 0, 'produced': 0, 'failed': 0, 'interrupted': 0, 'evicted': 0}
+        self.scan()
+
+    def scan(self):
+        """Picks up images rendered before a restart."""
+        for preset in self.presets:
+            folder = os.path.join(self.directory, preset)
+            os.makedirs(folder, exist_ok=True)
+            for name in sorted(os.listdir(folder)):
+                if name.endswith('.png') and os.path.exists(os.path.join(folder, name[:-4] + '.json')):
+                    path = os.path.join(folder, name)
+                    self.ready[preset].append((os.path.getmtime(path), path))
+            self.ready[preset].sort()
+
+    def disk_usage(self):
+        total = 0
+        for entries in self.ready.values():
+            for _, path in entries:
+                try:
+                    total += os.path.getsize(path)
+                except OSError:
+                    pass
+        return total
+
+    def metrics(self):
+        served = self.stats['hits'] + self.stats['misses']
+        return dict(self.stats,
+                    hit_rate=self.stats['hits'] / served if served else 0.0,
+                    ready={preset: len(entries) for preset, entries in self.ready.items()},
+                    disk_mb=round(self.disk_usage() / 2**20, 1))
+
+    # -- consumer ----------------------------------------------------------
+
+    def take(self, preset):
+        """Returns (image bytes, prompt) of the oldest ready image, or None on a miss."""
+        entries = self.ready.get(preset)
+        while entries:
+            _, path = entries.pop(0)
+            try:
+                with open(path, 'rb') as f:
+                    image = f.read()
+                with open(path[:-4] + '.json') as f:
+                    prompt = json.load(f)['prompt']
+            except (OSError, ValueError, KeyError) as e:
+                logging.error(f"Dropping unreadable pre-generated image {path}: {e}")
+                self.remove(path)
+                continue
+            self.remove(path)
+            self.stats['hits'] += 1
+            return image, prompt
+        self.stats['misses'] += 1
+        return None
+
+    def remove(self, path):
+        for stale in (path, path[:-4] + '.json'):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+    # -- producer ----------------------------------------------------------
+
+    def next_preset(self):
+        """The preset with the fewest images ready, or None if all are full or over budget."""
+        if self.disk_usage() >= self.disk_budget:
+            return None
+        preset = min(self.presets, key=lambda name: len(self.ready[name]), default=None)
+        if preset is None or len(self.ready[preset]) >= self.pool_size:
+            return None
+        return preset
+
+    def update_idle(self, gpu_busy, now=None):
+        """Returns True once the GPU has been idle for idle_seconds."""
+        now = time.monotonic() if now is None else now
+        if gpu_busy:
+            self.idle_since = None
+            return False
+        if self.idle_since is None:
+            self.idle_since = now
+        return now - self.idle_since >= self.idle_seconds
+
+    def add(self, preset, image, prompt):
+        folder = os.path.join(self.directory, preset)
+        base = os.path.join(folder, f"{time.time():.0f}-{uuid.uuid4().hex[:8]}")
+        with open(base + '.json', 'w') as f:
+            json.dump({'prompt': prompt, 'created': time.time()}, f)
+        with open(base + '.png', 'wb') as f:
+            f.write(image)
+        self.ready[preset].append((time.time(), base + '.png'))
+        self.stats['produced'] += 1
+        # Stay inside the disk budget by dropping the oldest images anywhere
+        while self.disk_usage() > self.disk_budget:
+            oldest = min((entries for entries in self.ready.values() if entries),
+                         key=lambda entries: entries[0][0], default=None)
+            if oldest is None:
+                break
+            self.remove(oldest.pop(0)[1])
+            self.stats['evicted'] += 1
+
+    def start_submit(self, client_id):
+        """Called by the render once it holds the GPU slot; False if it must not go to ComfyUI."""
+        if self.producing != client_id or self.yielded == client_id:
+            return False
+        self.submitting = True
+        return True
+
+    def on_queued(self, prompt_id):
+        self.prompt_id = prompt_id
+
+    async def yield_gpu(self):
+        """Called before a user job: stops a speculative render still in flight."""
+        client_id = self.producing
+        if client_id is None or self.yielded == client_id:
+            return
+        self.idle_since = None
+        # Before anything else, so run() never counts this render as failed
+        self.yielded = client_id
+        if not self.submitting:
+            # Still waiting for the GPU slot (or about to ask for it)
+            self.render_task.cancel()
+            self.stats['interrupted'] += 1
+            return
+        waited = 0.0
+        while self.prompt_id is None and self.producing == client_id and waited < SUBMIT_WAIT:
+            await asyncio.sleep(0.05)
+            waited += 0.05
+        prompt_id = self.prompt_id
+        if prompt_id is None or self.producing != client_id:
+            return
+        try:
+            # /interrupt stops whatever is executing, so make sure that is ours
+            queue = await asyncio.to_thread(comfyui_generation.get_queue)
+            if prompt_id not in {entry[1] for entry in queue.get('queue_running', [])}:
+                return
+            await asyncio.to_thread(comfyui_generation.interrupt)
+            self.stats['interrupted'] += 1
+        except Exception as e:
+            logging.error(f"Could not interrupt pre-generation: {e}")
+
+    async def run(self, render, is_busy, on_change=None, interval=PREGEN_POLL_INTERVAL):
+        """
+        Producer loop. render(preset, client_id) -> (image bytes or None,
+        prompt) is awaited for each speculative image. is_busy() reports
+        bot-side work; on_change(metrics) is called whenever the pool changes.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            preset = self.next_preset()
+            if preset is None:
+                continue
+            if is_busy():
+                self.update_idle(True)
+                continue
+            try:
+                queue = await asyncio.to_thread(comfyui_generation.get_queue)
+            except Exception as e:
+                # Unreachable ComfyUI counts as busy; nothing to render on anyway
+                logging.warning(f"Pre-generation queue check failed: {e}")
+                self.update_idle(True)
+                continue
+            gpu_busy = bool(queue.get('queue_running') or queue.get('queue_pending'))
+            if not self.update_idle(gpu_busy or is_busy()):
+                continue
+
+            self.producing = client_id = str(uuid.uuid4())
+            self.render_task = asyncio.ensure_future(render(preset, client_id))
+            try:
+                # wait() rather than await, so cancelling the render does not cancel this loop
+                await asyncio.wait([self.render_task])
+                image, prompt = (None, None) if self.render_task.cancelled() else self.render_task.result()
+            except asyncio.CancelledError:
+                self.render_task.cancel()
+                raise
+            except Exception as e:
+                logging.error(f"Pre-generation failed: {e}")
+                image, prompt = None, None
+            finally:
+                self.producing = self.render_task = self.prompt_id = None
+                self.submitting = False
+            if image is not None:
+                self.add(preset, image, prompt)
+            elif self.yielded != client_id:
+                # Renders we interrupted are already counted as such
+                self.stats['failed'] += 1
+            self.yielded = None
+            if on_change is not None:
+                on_change(self.metrics())
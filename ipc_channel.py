@@ -0,0 +1,378 @@
+"""
+Typed event channel between the Bravolith processes.
+
+Events are small NamedTuples with a compact struct encoding. Senders batch
+events into frames and coalesce status wakeups, so a burst of
+activity costs one pipe write instead of one pickle per message. Adding an
+event type means defining a class with `type_id`, `encode` and `decode` and
+decorating it with `@register`.
+
+Every frame is written with a single non-blocking write of at most
+PIPE_BUF bytes, which the kernel makes atomic: writers in several
+processes need no shared lock, a writer killed mid-flush cannot leave half
+a frame in the pipe, and a full pipe (the GUI dead or restarting) never
+blocks the sender. Events that cannot be written yet stay pending, up to
+MAX_PENDING; past that the oldest log lines are dropped first.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import select
+import struct
+import threading
+import time
+from typing import NamedTuple
+
+FLUSH_INTERVAL = 0.02  # seconds a sender waits to fill a batch
+MAX_BATCH = 256
+MAX_PENDING = 4096  # events held back while the receiver is not reading
+BLOCKED_RETRY = 0.25  # seconds between writes to a full pipe
+
+_LENGTH = struct.Struct('!I')  # wire prefix of every frame
+_FRAME_HEADER = struct.Struct('!I')
+_EVENT_HEADER = struct.Struct('!BI')
+MAX_FRAME = select.PIPE_BUF - _LENGTH.size
+# Largest single event payload; a frame of one such event still fits in one write
+MAX_PAYLOAD = MAX_FRAME - _FRAME_HEADER.size - _EVENT_HEADER.size
+
+EVENT_TYPES = {}
+
+
+def register(cls):
+    if cls.type_id in EVENT_TYPES:
+        raise ValueError(f"Duplicate event type id {cls.type_id}")
+    EVENT_TYPES[cls.type_id] = cls
+    return cls
+
+
+@register
+class LogRecord(NamedTuple):
+    text: str
+    level: int = logging.INFO
+
+    type_id = 2
+
+    def encode(self):
+        text = self.text.encode('utf-8')
+        if len(text) > MAX_PAYLOAD - 1:
+            # Cut at a character boundary
+            text = text[:MAX_PAYLOAD - 4].decode('utf-8', errors='ignore').encode('utf-8') + b'...'
+        return struct.pack('!B', self.level) + text
+
+    @classmethod
+    def decode(cls, payload):
+        return cls(payload[1:].decode('utf-8'), payload[0])
+
+
+@register
+class JobProgress(NamedTuple):
+    job_id: str
+    stage: str
+    value: int = 0
+    maximum: int = 0
+
+    type_id = 3
+
+    def encode(self):
+        text = f"{self.job_id}\0{self.stage}".encode('utf-8')
+        return struct.pack('!II', self.value, self.maximum) + text
+
+    @classmethod
+    def decode(cls, payload):
+        value, maximum = struct.unpack_from('!II', payload)
+        job_id, stage = payload[8:].decode('utf-8').split('\0', 1)
+        return cls(job_id, stage, value, maximum)
+
+
+@register
+class Metrics(NamedTuple):
+    source: str
+    values: dict
+
+    type_id = 4
+
+    def encode(self):
+        return json.dumps([self.source, self.values], separators=(',', ':')).encode('utf-8')
+
+    @classmethod
+    def decode(cls, payload):
+        source, values = json.loads(payload)
+        return cls(source, values)
+
+
+@register
+class StatusChanged(NamedTuple):
+    """The status board or the telemetry buffer was written; re-read whichever changed."""
+
+    type_id = 6
+
+    def encode(self):
+        return b''
+
+    @classmethod
+    def decode(cls, payload):
+        return cls()
+
+
+@register
+class Profile(NamedTuple):
+    seconds: int
+
+    type_id = 5
+
+    def encode(self):
+        return struct.pack('!H', self.seconds)
+
+    @classmethod
+    def decode(cls, payload):
+        return cls(struct.unpack('!H', payload)[0])
+
+
+def _frame(parts):
+    return _FRAME_HEADER.pack(len(parts) // 2) + b''.join(parts)
+
+
+def encode_frames(events):
+    """
+    Packs events into frames of at most MAX_FRAME bytes; returns
+    [(frame, number of events it covers)]. Events that fail to encode or
+    are too large are logged and left out.
+    """
+    frames = []
+    parts = []
+    size = _FRAME_HEADER.size
+    covered = 0
+    for event in events:
+        covered += 1
+        try:
+            payload = event.encode()
+        except Exception as e:
+            logging.error(f"Dropping IPC event that cannot be encoded: {event!r}: {e}")
+            continue
+        if len(payload) > MAX_PAYLOAD:
+            logging.error(f"Dropping IPC event of {len(payload)} bytes, more than {MAX_PAYLOAD}: {event!r:.200}")
+            continue
+        needed = _EVENT_HEADER.size + len(payload)
+        if parts and size + needed > MAX_FRAME:
+            frames.append((_frame(parts), covered - 1))
+            parts, size, covered = [], _FRAME_HEADER.size, 1
+        parts.append(_EVENT_HEADER.pack(event.type_id, len(payload)))
+        parts.append(payload)
+        size += needed
+    if covered:
+        frames.append((_frame(parts), covered))
+    return frames
+
+
+def decode_batch(frame):
+    (count,) = _FRAME_HEADER.unpack_from(frame)
+    offset = _FRAME_HEADER.size
+    events = []
+    for _ in range(count):
+        type_id, length = _EVENT_HEADER.unpack_from(frame, offset)
+        offset += _EVENT_HEADER.size
+        if offset + length > len(frame):
+            raise ValueError(f"IPC event of {length} bytes overruns its frame")
+        cls = EVENT_TYPES.get(type_id)
+        if cls is None:
+            logging.error(f"Unknown IPC event type {type_id}")
+        else:
+            try:
+                events.append(cls.decode(frame[offset:offset + length]))
+            except Exception as e:
+                logging.error(f"Dropping IPC event that cannot be decoded ({cls.__name__}): {e}")
+        offset += length
+    return events
+
+
+class ChannelSender:
+    """
+    Thread-safe batching writer. A background thread flushes pending events
+    every FLUSH_INTERVAL, or as soon as MAX_BATCH events are waiting.
+    """
+
+    def __init__(self, conn, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH, max_pending=MAX_PENDING):
+        # A multiprocessing Connection, used only to carry the fd to child processes
+        self.conn = conn
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.cond = threading.Condition()
+        self.pending = []
+        self.status_pending = False
+        self.dropped = 0  # events discarded since the last successful write
+        self.thread = None
+        if self.conn is not None:
+            os.set_blocking(self.conn.fileno(), False)
+
+    def __getstate__(self):
+        return {'conn': self.conn, 'flush_interval': self.flush_interval,
+                'max_batch': self.max_batch, 'max_pending': self.max_pending}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset()
+
+    def send(self, event):
+        if self.pid != os.getpid():
+            # Inherited across fork: the parent's flusher thread does not exist here
+            self._reset()
+        with self.cond:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='ipc-flush', daemon=True)
+                self.thread.start()
+            if isinstance(event, StatusChanged):
+                # One wakeup per batch is enough: the receiver reads the whole board
+                if self.status_pending:
+                    return
+                self.status_pending = True
+            self.pending.append(event)
+            self._trim()
+            if len(self.pending) == 1 or len(self.pending) == self.max_batch:
+                self.cond.notify()
+
+    def _trim(self):
+        """Caps pending events, dropping the oldest log line (or else the oldest event)."""
+        while len(self.pending) > self.max_pending:
+            index = next((i for i, event in enumerate(self.pending) if isinstance(event, LogRecord)), 0)
+            del self.pending[index]
+            self.dropped += 1
+
+    def status_changed(self):
+        self.send(StatusChanged())
+
+    def log(self, text, level=logging.INFO):
+        self.send(LogRecord(text, level))
+
+    def progress(self, job_id, stage, value=0, maximum=0):
+        self.send(JobProgress(job_id, stage, value, maximum))
+
+    def metrics(self, source, values):
+        self.send(Metrics(source, values))
+
+    def flush(self):
+        """Writes what it can; returns False if the pipe was full and events are still pending."""
+        with self.cond:
+            events = self.pending
+            self.pending = []
+            self.status_pending = False
+        written = 0
+        try:
+            for frame, covered in encode_frames(events):
+                os.write(self.conn.fileno(), _LENGTH.pack(len(frame)) + frame)
+                written += covered
+        except BlockingIOError:
+            # Nobody is reading: keep the rest, in order, ahead of anything sent since
+            with self.cond:
+                self.pending[:0] = events[written:]
+                self._trim()
+            return False
+        except Exception as e:
+            # The flusher thread must survive anything, or every later event is silently lost
+            logging.error(f"Error writing IPC batch: {e}")
+        if self.dropped and written:
+            logging.warning(f"Dropped {self.dropped} IPC events while the receiver was not reading")
+            self.dropped = 0
+        return True
+
+    def _run(self):
+        while True:
+            with self.cond:
+                # Sleep until there is something to send, then give the batch time to fill
+                while not self.pending:
+                    self.cond.wait()
+                if len(self.pending) < self.max_batch:
+                    self.cond.wait(self.flush_interval)
+            if not self.flush():
+                time.sleep(BLOCKED_RETRY)
+
+
+class NullSender(ChannelSender):
+    """Discards every event; for a sender with no receiver, e.g. the bot run on its own."""
+
+    def __init__(self):
+        self.conn = None
+        self._reset()
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def send(self, event):
+        pass
+
+
+class ChannelReceiver:
+    def __init__(self, conn):
+        # A multiprocessing Connection, used only to carry the fd to child processes
+        self.conn = conn
+        self.buffer = bytearray()
+        # Set once every sender is gone; the fd then stays readable forever
+        self.closed = False
+        os.set_blocking(conn.fileno(), False)
+
+    def fileno(self):
+        return self.conn.fileno()
+
+    def next_frame(self):
+        """
+        The next complete frame, or None. Reads only as far as that frame, so
+        frames left in the pipe keep the fd readable for the caller's loop.
+        """
+        while True:
+            if len(self.buffer) >= _LENGTH.size:
+                (length,) = _LENGTH.unpack_from(self.buffer)
+                if length > MAX_FRAME:
+                    # Writers never send this much, so the stream is corrupt; skip what we have
+                    logging.error(f"Discarding IPC data with an impossible frame length {length}")
+                    self.buffer.clear()
+                    continue
+                missing = _LENGTH.size + length - len(self.buffer)
+                if missing <= 0:
+                    frame = bytes(self.buffer[_LENGTH.size:_LENGTH.size + length])
+                    del self.buffer[:_LENGTH.size + length]
+                    return frame
+            else:
+                missing = _LENGTH.size - len(self.buffer)
+            try:
+                data = os.read(self.conn.fileno(), missing)
+            except BlockingIOError:
+                return None
+            except OSError:
+                data = b''
+            if not data:
+                self.closed = True
+                return None
+            self.buffer += data
+
+    def poll(self, max_frames=None):
+        """Returns all events that are ready, without blocking."""
+        events = []
+        frames = 0
+        while max_frames is None or frames < max_frames:
+            frame = self.next_frame()
+            if frame is None:
+                break
+            frames += 1
+            try:
+                events.extend(decode_batch(frame))
+            except Exception as e:
+                # A bad frame costs its own events only; the length prefix keeps the stream in step
+                logging.error(f"Dropping undecodable IPC frame of {len(frame)} bytes: {e}")
+        return events
+
+
+class Channel:
+    """One-way channel from the bot (and supervisor) to the GUI."""
+
+    def __init__(self):
+        reader, writer = multiprocessing.Pipe(duplex=False)
+        self.receiver = ChannelReceiver(reader)
+        self.sender = ChannelSender(writer)
@@ -0,0 +1,125 @@
+"""
+Durable journal of the bot's jobs, so a restart loses no queued command and
+no GPU work.
+
+An append-only SQLite table (WAL mode) records each job as a sequence of
+states; the newest row of a job is its current state:
+  queued     parameters: a command waiting in the task queue (chat and
+             message to fetch again), or a ComfyUI job (the final
+             workflow, client id and where to reply)
+  submitted  ComfyUI accepted the prompt; its prompt_id
+  done       delivered (the result, or the error that ended it) or handed on
+  failed     could not be delivered, with the error
+On start the bot replays pending() jobs: commands are fetched from Telegram
+and queued again, submitted prompts are collected from ComfyUI's history
+(waiting if they are still rendering), and queued ComfyUI jobs run again.
+
+synchronous=NORMAL in WAL mode survives the process dying at any point,
+which is what a supervisor restart does; only an OS crash or power loss
+can drop the last few rows. Finished jobs are pruned after
+JOB_JOURNAL_KEEP_DAYS.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import NamedTuple
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+JOB_JOURNAL = os.getenv('JOB_JOURNAL', 'bravolith_jobs.db')  # empty disables the journal
+JOB_JOURNAL_KEEP_DAYS = float(os.getenv('JOB_JOURNAL_KEEP_DAYS', 7))
+JOB_RESUME_MAX_AGE = float(os.getenv('JOB_RESUME_MAX_AGE', 6 * 3600))  # older pending jobs are dropped
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    time REAL NOT NULL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS journal_job ON journal (job_id, seq);
+"""
+
+
+class PendingJob(NamedTuple):
+    job_id: str
+    state: str  # 'queued' or 'submitted'
+    params: dict  # as given to add()
+    created: float  # wall clock time of the 'queued' row
+    prompt_id: str = None
+
+
+class JobJournal:
+    def __init__(self, path=JOB_JOURNAL, keep_days=JOB_JOURNAL_KEEP_DAYS):
+        self.path = path
+        # Written from the event loop and from do_stuff's worker threads (on_queued)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(SCHEMA)
+        self.prune(keep_days)
+
+    def append(self, job_id, state, data=None):
+        with self.lock:
+            self.db.execute('INSERT INTO journal (job_id, state, time, data) VALUES (?, ?, ?, ?)',
+                            (job_id, state, time.time(), None if data is None else json.dumps(data)))
+
+    def add(self, params):
+        """Journals a new job in the 'queued' state; returns its id."""
+        job_id = uuid.uuid4().hex
+        self.append(job_id, 'queued', params)
+        return job_id
+
+    def submitted(self, job_id, prompt_id):
+        self.append(job_id, 'submitted', {'prompt_id': prompt_id})
+
+    def finish(self, job_id, error=None):
+        if error is None:
+            self.append(job_id, 'done')
+        else:
+            self.append(job_id, 'failed', {'error': str(error)})
+
+    def pending(self):
+        """Jobs whose newest state is not final, oldest first."""
+        with self.lock:
+            rows = self.db.execute("""
+                SELECT latest.job_id, latest.state, latest.data, queued.data, queued.time
+                FROM journal AS latest
+                JOIN (SELECT job_id, MAX(seq) AS seq FROM journal GROUP BY job_id) AS newest
+                    ON latest.seq = newest.seq
+                JOIN journal AS queued ON queued.job_id = latest.job_id AND queued.state = 'queued'
+                WHERE latest.state NOT IN ('done', 'failed')
+                ORDER BY queued.seq
+            """).fetchall()
+        jobs = []
+        for job_id, state, data, params, created in rows:
+            try:
+                params = json.loads(params)
+                prompt_id = json.loads(data)['prompt_id'] if state == 'submitted' else None
+            except (TypeError, ValueError, KeyError) as e:
+                logging.error(f"Unreadable journal entry for job {job_id}: {e}")
+                self.finish(job_id, 'unreadable journal entry')
+                continue
+            jobs.append(PendingJob(job_id, state, params, created, prompt_id))
+        return jobs
+
+    def prune(self, keep_days):
+        cutoff = time.time() - keep_days * 86400
+        with self.lock:
+            self.db.execute("""
+                DELETE FROM journal WHERE job_id IN (
+                    SELECT job_id FROM journal WHERE state IN ('done', 'failed') AND time < ?)
+            """, (cutoff,))
+
+    def close(self):
+        with self.lock:
+            self.db.close()
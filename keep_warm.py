@@ -0,0 +1,177 @@
+"""
+Keeps the Monolith's models loaded so the first request after a quiet
+spell does not pay the full load.
+
+A target is a kind of job with a cheap warm-up: 'image' and 'music' run
+their ComfyUI workflow at one step and minimal size on the same loader
+nodes, 'ask' asks Kobold for a single token with the usual memory prefix.
+Warm-ups are sent
+  - on a schedule, for KEEPWARM_TARGETS idle for KEEPWARM_INTERVAL
+    seconds, within KEEPWARM_HOURS and only while the bot is not busy;
+  - when a chat becomes active, e.g. /image starts the Flux warm-up while
+    the user is still picking a resolution. Only targets with such a pause
+    qualify: an /ask goes to Kobold straight away, so 'ask' is warmed on
+    the schedule alone.
+
+Every user request is also classified for tuning: 'cold' is the first
+request after KEEPWARM_COLD_AFTER idle seconds (or after a model swap) with
+no warm-up in between, 'prewarmed' the same with a warm-up, and 'warm'
+everything else. Latency counts from the request reaching the backend,
+including time spent behind a warm-up still running.
+"""
+import asyncio
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+KEEPWARM_ENABLED = os.getenv('KEEPWARM_ENABLED', 'false').lower() == 'true'
+KEEPWARM_TARGETS = [name.strip() for name in os.getenv('KEEPWARM_TARGETS', 'image,ask').split(',') if name.strip()]
+KEEPWARM_INTERVAL = float(os.getenv('KEEPWARM_INTERVAL', 240))  # re-warm a target idle this long
+KEEPWARM_HOURS = os.getenv('KEEPWARM_HOURS', '')  # e.g. "8-23" for scheduled warm-ups; empty = always
+KEEPWARM_COLD_AFTER = float(os.getenv('KEEPWARM_COLD_AFTER', 300))  # idle seconds after which a request is "first"
+KEEPWARM_CHECK_SECONDS = 30
+
+LATENCY_CLASSES = ('cold', 'prewarmed', 'warm')
+# Save nodes swapped for their temp-file twins so warm-ups leave nothing in ComfyUI's output folder
+PREVIEW_NODES = {'SaveImage': 'PreviewImage', 'SaveAudio': 'PreviewAudio'}
+
+
+def warmup_workflow(workflow):
+    """Turns a (already shrunk) workflow into a warm-up that saves nothing."""
+    for node in workflow.values():
+        preview = PREVIEW_NODES.get(node.get('class_type'))
+        if preview is not None:
+            node['class_type'] = preview
+            node['inputs'].pop('filename_prefix', None)
+    return workflow
+
+
+def parse_hours(spec):
+    """"8-23" -> (8, 23); empty or malformed -> None (always)."""
+    try:
+        start, end = (int(part) for part in spec.split('-'))
+    except ValueError:
+        if spec:
+            logging.warning(f"Ignoring KEEPWARM_HOURS={spec!r}, expected e.g. 8-23")
+        return None
+    return start % 24, end % 24
+
+
+def in_hours(hours, hour=None):
+    if hours is None:
+        return True
+    hour = time.localtime().tm_hour if hour is None else hour
+    start, end = hours
+    if start <= end:
+        return start <= hour <= end
+    return hour >= start or hour <= end  # window across midnight
+
+
+class KeepWarm:
+    def __init__(self, warmups, is_busy=lambda: False, enabled=KEEPWARM_ENABLED, scheduled=KEEPWARM_TARGETS,
+                 interval=KEEPWARM_INTERVAL, hours=KEEPWARM_HOURS, cold_after=KEEPWARM_COLD_AFTER,
+                 on_change=None):
+        # target -> async callable sending one warm-up request
+        self.warmups = warmups
+        self.is_busy = is_busy
+        self.enabled = enabled
+        self.scheduled = [target for target in scheduled if target in warmups]
+        self.interval = interval
+        self.hours = parse_hours(hours)
+        self.cold_after = cold_after
+        self.on_change = on_change
+        self.last_used = {}  # target -> monotonic time of the last request or warm-up
+        self.last_request = {}  # same, user requests only
+        self.last_warmup = {}
+        self.inflight = set()
+        self.tasks = set()
+        self.latency = {}  # target -> class -> {'count', 'total', 'last'}
+        self.stats = {'warmups': 0, 'warmup_failures': 0, 'warmup_seconds': 0.0}
+
+    def idle_for(self, target, now=None):
+        now = time.monotonic() if now is None else now
+        last = self.last_used.get(target)
+        return float('inf') if last is None else now - last
+
+    def touch(self, target, now=None):
+        self.last_used[target] = time.monotonic() if now is None else now
+
+    def classify(self, target, started, swapped=False):
+        last = self.last_request.get(target)
+        first = swapped or last is None or started - last >= self.cold_after
+        if not first:
+            return 'warm'
+        warmed = self.last_warmup.get(target)
+        if warmed is not None and started - warmed < self.cold_after and not swapped:
+            return 'prewarmed'
+        return 'cold'
+
+    def record(self, target, seconds, swapped=False):
+        """A user request for `target` that took `seconds`; swapped means its models had to be loaded."""
+        now = time.monotonic()
+        started = now - seconds
+        latency_class = self.classify(target, started, swapped)
+        entry = self.latency.setdefault(target, {}).setdefault(
+            latency_class, {'count': 0, 'total': 0.0, 'last': 0.0})
+        entry['count'] += 1
+        entry['total'] += seconds
+        entry['last'] = seconds
+        self.last_request[target] = now
+        self.touch(target, now)
+        self.changed()
+        return latency_class
+
+    def metrics(self):
+        latency = {}
+        for target, classes in self.latency.items():
+            latency[target] = {name: {'count': entry['count'],
+                                      'mean_s': round(entry['total'] / entry['count'], 2),
+                                      'last_s': round(entry['last'], 2)}
+                               for name, entry in classes.items()}
+        return dict(self.stats, warmup_seconds=round(self.stats['warmup_seconds'], 1), latency=latency)
+
+    def changed(self):
+        if self.on_change is not None:
+            self.on_change(self.metrics())
+
+    async def warm(self, target, reason):
+        if target in self.inflight or target not in self.warmups:
+            return
+        self.inflight.add(target)
+        started = time.monotonic()
+        try:
+            await self.warmups[target]()
+            self.stats['warmups'] += 1
+            self.last_warmup[target] = time.monotonic()
+            self.touch(target)
+            logging.info(f"Warmed {target} ({reason}) in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            self.stats['warmup_failures'] += 1
+            logging.warning(f"Warm-up of {target} failed: {e}")
+        finally:
+            self.stats['warmup_seconds'] += time.monotonic() - started
+            self.inflight.discard(target)
+        self.changed()
+
+    def activity(self, target):
+        """A chat just asked for something that will need `target`; warm it if it went cold."""
+        if not self.enabled or target is None or self.idle_for(target) < self.cold_after:
+            return
+        task = asyncio.create_task(self.warm(target, 'activity'))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run(self, interval=KEEPWARM_CHECK_SECONDS):
+        """Scheduled keep-warm loop."""
+        while True:
+            await asyncio.sleep(interval)
+            if not self.enabled or not in_hours(self.hours) or self.is_busy():
+                continue
+            for target in self.scheduled:
+                if self.idle_for(target) >= self.interval:
+                    await self.warm(target, 'schedule')
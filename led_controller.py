@@ -1,89 +1,180 @@
+import os
 import time
 import threading
 import gpiod
 
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+LED_TICK = float(os.getenv('LED_TICK', 0.05))  # scheduler resolution, seconds
+# "led:pin" pairs; LEDs without a pin only exist on screen
+LED_GPIO_PINS = {name: int(pin) for name, pin in
+                 (pair.split(':') for pair in os.getenv('LED_GPIO_PINS', 'cpu:17').split(',') if pair)}
+
+# Each pattern is a list of (on, seconds) steps, repeated. An LED follows
+# its 'active' pattern while its activity flag is set, otherwise 'idle'.
+LED_PATTERNS = {
+    'cpu': {
+        'idle': [(True, 0.4), (False, 0.4)],
+        'active': [(True, 0.2), (False, 0.2)],
+        'idle_color': 'green', 'active_color': 'red',
+    },
+    'webcam': {
+        'idle': [(True, 1.5), (False, 1.5)],
+        'active': [(True, 0.5), (False, 0.5)],
+        'idle_color': 'DarkGoldenrod4', 'active_color': 'yellow',
+    },
+    'telegram': {
+        'idle': [(True, 1.6), (False, 1.6)],
+        'active': [(True, 0.4), (False, 0.4)],
+        'idle_color': 'blue4', 'active_color': 'dodger blue',
+    },
+    'monolith': {
+        'idle': [(True, 2), (False, 2)],
+        'active': [(True, 0.2), (False, 0.2)],
+        'idle_color': 'brown4', 'active_color': 'red',
+    },
+}
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: `size` slots of `tick` seconds each. Items further
+    out than one revolution carry a round counter. Scheduling and expiry
+    are O(1) per item.
+    """
+
+    def __init__(self, tick=LED_TICK, size=64):
+        self.tick = tick
+        self.size = size
+        self.slots = [[] for _ in range(size)]
+        self.current = 0
+        self.ticks_done = 0
+        self.started = time.monotonic()
+
+    def schedule(self, item, delay):
+        ticks = max(1, round(delay / self.tick))
+        slot = (self.current + ticks) % self.size
+        self.slots[slot].append([(ticks - 1) // self.size, item])
+
+    def advance(self, now):
+        """Returns the items that expired up to `now`, in expiry order."""
+        due = []
+        target = int((now - self.started) / self.tick)
+        while self.ticks_done < target:
+            self.ticks_done += 1
+            self.current = (self.current + 1) % self.size
+            bucket = self.slots[self.current]
+            if not bucket:
+                continue
+            waiting = []
+            for entry in bucket:
+                if entry[0] == 0:
+                    due.append(entry[1])
+                else:
+                    entry[0] -= 1
+                    waiting.append(entry)
+            self.slots[self.current] = waiting
+        return due
+
+    def next_delay(self, now):
+        """Seconds until the next slot holding an item, or None if empty."""
+        occupied = False
+        for step in range(1, self.size + 1):
+            bucket = self.slots[(self.current + step) % self.size]
+            occupied = occupied or bool(bucket)
+            if any(entry[0] == 0 for entry in bucket):
+                return max(0.0, self.started + (self.ticks_done + step) * self.tick - now)
+        # Only far-future items: come back after one revolution
+        return self.size * self.tick if occupied else None
+
+
 class LEDController:
-    def __init__(self):
+    """
+    Drives every LED from one timer wheel. With threaded=True a single
+    background thread runs it; with threaded=False the owner calls `tick()`
+    and sleeps `next_delay()` itself (e.g. from the Tk loop).
+    """
+
+    def __init__(self, patterns=LED_PATTERNS, gpio_pins=LED_GPIO_PINS, threaded=True):
+        self.patterns = patterns
         self.leds = {
-            'cpu': {'color': 'green','color2': 'red', 'state': False, 'gpio_pin': 17,'active' : False},
-            'webcam': {'color': 'yellow','color2': 'DarkGoldenrod4', 'state': False, 'active' : False},
-            'telegram': {'color': 'dodger blue','color2': 'blue4', 'state': False, 'active' : False},
-            'monolith': {'color': 'red','color2': 'brown4', 'state': False, 'active' : False}
+            name: {'state': False, 'active': False, 'step': 0, 'gpio_pin': gpio_pins.get(name)}
+            for name in patterns
         }
+        self.lock = threading.Lock()
+        self.wheel = TimerWheel()
+        # Called from the scheduler thread after any LED flips (threaded mode only)
+        self.on_change = None
         self.setup_gpio()
-        self.start_blink_threads()
+        for name in self.leds:
+            self.wheel.schedule(name, 0)
+        if threaded:
+            thread = threading.Thread(target=self.run, name='led-scheduler', daemon=True)
+            thread.start()
 
     def setup_gpio(self):
+        self.gpio_names = [name for name, led in self.leds.items() if led['gpio_pin'] is not None]
+        self.gpio_values = None
         try:
             self.chip = gpiod.Chip('gpiochip4')  # Raspberry Pi 5 uses gpiochip4
-            self.led_line = self.chip.get_line(self.leds['cpu']['gpio_pin'])
-            self.led_line.request(consumer="LED", type=gpiod.LINE_REQ_DIR_OUT)
-            self.gpio_available = True
+            # One bulk request so every tick is a single set_values call
+            self.gpio_lines = self.chip.get_lines([self.leds[name]['gpio_pin'] for name in self.gpio_names])
+            self.gpio_lines.request(consumer="LED", type=gpiod.LINE_REQ_DIR_OUT)
+            self.gpio_available = bool(self.gpio_names)
             print("Creeper is CHARGING....")
         except Exception as e:
             print(f"Error initializing GPIO: {e}. Creeper is DEAD.")
             self.gpio_available = False
 
+    def write_gpio(self):
+        values = [1 if self.leds[name]['state'] else 0 for name in self.gpio_names]
+        if not self.gpio_available or values == self.gpio_values:
+            return
+        try:
+            self.gpio_lines.set_values(values)
+            self.gpio_values = values
+        except Exception as e:
+            print(f"Error setting LED state: {e}")
+
     def set_led_state(self, led_name, state):
-        self.leds[led_name]['state'] = state
-        if led_name == 'cpu' and self.gpio_available:
-            try:
-                self.led_line.set_value(1 if state else 0)
-            except Exception as e:
-                print(f"Error setting LED state: {e}")
-
-    def blink_led(self, led_name):
+        with self.lock:
+            self.leds[led_name]['state'] = state
+            self.write_gpio()
+
+    def advance_led(self, led_name):
+        led = self.leds[led_name]
+        steps = self.patterns[led_name]['active' if led['active'] else 'idle']
+        state, duration = steps[led['step'] % len(steps)]
+        led['step'] += 1
+        self.wheel.schedule(led_name, duration)
+        changed = led['state'] != state
+        led['state'] = state
+        return changed
+
+    def tick(self, now=None):
+        """Runs every LED step that is due; returns True if any LED changed."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            changed = False
+            for led_name in self.wheel.advance(now):
+                changed = self.advance_led(led_name) or changed
+            if changed:
+                self.write_gpio()
+        return changed
+
+    def next_delay(self):
+        with self.lock:
+            delay = self.wheel.next_delay(time.monotonic())
+        return self.wheel.tick if delay is None else delay
+
+    def run(self):
         while True:
-            if led_name == 'cpu':
-                self.cpu_blink()
-            elif led_name == 'webcam':
-                self.webcam_blink()
-            elif led_name == 'telegram':
-                self.telegram_blink()
-            elif led_name == 'monolith':
-                self.monolith_blink()
-
-    def cpu_blink(self):
-        blink_speed = 0.4
-        if self.leds['cpu']['active']:
-            blink_speed = 0.2
-        self.set_led_state('cpu', True)
-        time.sleep(blink_speed)
-        self.set_led_state('cpu', False)
-        time.sleep(blink_speed)
-
-    def webcam_blink(self):
-        blink_speed = 1.5
-        if self.leds['webcam']['active']:
-            blink_speed = 0.5
-        self.set_led_state('webcam', True)
-        time.sleep(blink_speed)  # On for longer
-        self.set_led_state('webcam', False)
-        time.sleep(blink_speed)  # Off for shorter
-
-    def telegram_blink(self):
-        blink_speed = 1.6
-        if self.leds['telegram']['active']:
-            blink_speed = 0.4
-        self.set_led_state('telegram', True)
-        time.sleep(blink_speed)
-        self.set_led_state('telegram', False)
-        time.sleep(blink_speed)
-    
-    def monolith_blink(self):
-        blink_speed = 2
-        if self.leds['monolith']['active']:
-            blink_speed = 0.2
-        self.set_led_state('monolith', True)
-        time.sleep(blink_speed)
-        self.set_led_state('monolith', False)
-        time.sleep(blink_speed)
-
-    def start_blink_threads(self):
-        for led_name in self.leds:
-            thread = threading.Thread(target=self.blink_led, args=(led_name,))
-            thread.daemon = True
-            thread.start()
+            if self.tick() and self.on_change is not None:
+                self.on_change()
+            time.sleep(self.next_delay())
 
     def get_led_state(self, led_name):
         return self.leds[led_name]['state']
@@ -94,10 +185,8 @@ class LEDController:
         if not led['state']:
             return 'grey14'
 
-        if led_name == 'cpu':
-            return led['color2'] if led['active'] else led['color']
-        else:
-            return led['color'] if led['active'] else led['color2']
+        pattern = self.patterns[led_name]
+        return pattern['active_color'] if led['active'] else pattern['idle_color']
 
     def set_cpu_usage(self, cpu_percent):
         if cpu_percent > 50:
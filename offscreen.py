@@ -0,0 +1,425 @@
+"""
+Offscreen stand-ins for the Tk root, canvas and widgets RetroTerminal uses,
+so the terminal can run, render and be profiled without a display.
+
+OffscreenCanvas keeps the same display list a tk.Canvas would (text, ovals,
+images, embedded windows, in stacking order) and composites it into a PIL
+image on demand. HeadlessRoot runs `after` timers and file handlers from its
+own loop and renders a frame every 1/RENDER_FPS seconds into a sink: PNG
+files or a Linux framebuffer device.
+"""
+import heapq
+import itertools
+import logging
+import os
+import selectors
+import time
+from collections import deque
+from functools import lru_cache
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+RENDER_FPS = float(os.getenv('RENDER_FPS', 5))
+RENDER_PNG_KEEP = int(os.getenv('RENDER_PNG_KEEP', 0))  # numbered PNGs kept, 0 = only latest.png
+READABLE = 2  # tkinter.READABLE
+
+# X11 colour names used by the terminal that PIL does not know
+TK_COLORS = {
+    'gray5': (13, 13, 13),
+    'grey14': (36, 36, 36),
+    'ivory2': (238, 238, 224),
+    'blue4': (0, 0, 139),
+    'brown4': (139, 35, 35),
+    'darkgoldenrod4': (139, 101, 8),
+    'dodger blue': (30, 144, 255),
+    'hot pink': (255, 105, 180),
+}
+
+
+@lru_cache(maxsize=64)
+def color(name):
+    rgb = TK_COLORS.get(name.lower())
+    return rgb if rgb is not None else ImageColor.getrgb(name)[:3]
+
+
+@lru_cache(maxsize=16)
+def load_font(size):
+    """Courier like the Tk canvas, or the closest monospace font installed."""
+    for name in ("courier.ttf", "DejaVuSansMono.ttf", "LiberationMono-Regular.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def anchor_origin(x, y, width, height, anchor):
+    """Top-left corner of a width x height box placed at (x, y) with a Tk anchor."""
+    if anchor == 'center':
+        anchor = ''
+    if 'w' in anchor:
+        left = x
+    elif 'e' in anchor:
+        left = x - width
+    else:
+        left = x - width // 2
+    if 'n' in anchor:
+        top = y
+    elif 's' in anchor:
+        top = y - height
+    else:
+        top = y - height // 2
+    return int(left), int(top)
+
+
+@lru_cache(maxsize=1024)
+def line_mask(text, size):
+    """One rendered line as an 'L' mask; labels, the banner and log lines that
+    are still on screen hit the cache."""
+    font = load_font(size)
+    left, _, right, _ = font.getbbox(text)
+    ascent, descent = font.getmetrics()
+    mask = Image.new('L', (max(1, right), ascent + descent))
+    ImageDraw.Draw(mask).text((0, 0), text, fill=255, font=font)
+    return mask
+
+
+class OffscreenPhoto:
+    """ImageTk.PhotoImage look-alike holding a PIL image."""
+
+    def __init__(self, image=None, size=None, **kw):
+        if isinstance(image, str):  # PhotoImage(mode, size)
+            image = Image.new(image, size)
+        self.image = image
+        self.version = 0
+
+    def paste(self, image):
+        self.image.paste(image)
+        self.version += 1
+
+    def width(self):
+        return self.image.width
+
+    def height(self):
+        return self.image.height
+
+
+class OffscreenEntry:
+    """The bits of tk.Entry the search box needs; text is set by the owner."""
+
+    def __init__(self, master=None, fg="white", font=("Courier", 10), **kw):
+        self.fg = fg
+        self.font = font
+        self.text = ""
+
+    def get(self):
+        return self.text
+
+    def bind(self, sequence, callback):
+        pass
+
+    def focus_set(self):
+        pass
+
+
+class OffscreenCanvas:
+    def __init__(self, master, width, height, bg="black", **kw):
+        self.width = width
+        self.height = height
+        self.bg = bg
+        # item id -> (kind, coords, options); dicts keep creation, i.e. stacking, order
+        self.items = {}
+        self.ids = itertools.count(1)
+        self.version = 0
+        self.rendered_key = None
+        self.rendered = None
+        if master is not None:
+            master.canvas = self
+
+    def pack(self, **kw):
+        pass
+
+    def _create(self, kind, coords, options):
+        item = next(self.ids)
+        self.items[item] = (kind, coords, options)
+        self.version += 1
+        return item
+
+    def create_text(self, x, y, **options):
+        return self._create('text', (x, y), options)
+
+    def create_image(self, x, y, **options):
+        return self._create('image', (x, y), options)
+
+    def create_oval(self, x0, y0, x1, y1, **options):
+        return self._create('oval', (x0, y0, x1, y1), options)
+
+    def create_window(self, x, y, **options):
+        return self._create('window', (x, y), options)
+
+    def itemconfig(self, item, **options):
+        self.items[item][2].update(options)
+        self.version += 1
+
+    def delete(self, item):
+        self.items.pop(item, None)
+        self.version += 1
+
+    def _render_key(self):
+        # Pasting into a photo changes the picture without touching the display list
+        photos = tuple(options['image'].version for kind, _, options in self.items.values()
+                       if kind == 'image' and options.get('image') is not None)
+        return self.version, photos
+
+    def render(self):
+        """Composites the display list into an RGB image; unchanged frames are reused."""
+        key = self._render_key()
+        if key == self.rendered_key:
+            return self.rendered
+        image = Image.new('RGB', (self.width, self.height), color(self.bg))
+        draw = ImageDraw.Draw(image)
+        for kind, coords, options in self.items.values():
+            if options.get('state') == 'hidden':
+                continue
+            if kind == 'text':
+                self._draw_text(image, coords, options.get('text', ""), options)
+            elif kind == 'oval':
+                draw.ellipse(coords, fill=color(options['fill']) if options.get('fill') else None,
+                             outline=color(options['outline']) if options.get('outline') else None)
+            elif kind == 'image':
+                photo = options.get('image')
+                if photo is None:
+                    continue
+                source = photo.image
+                origin = anchor_origin(*coords, *source.size, options.get('anchor', 'center'))
+                image.paste(source, origin, source if source.mode == 'RGBA' else None)
+            elif kind == 'window':
+                widget = options['window']
+                self._draw_text(image, coords, widget.get(),
+                                {'fill': widget.fg, 'font': widget.font, 'anchor': options.get('anchor', 'center')})
+        self.rendered_key = key
+        self.rendered = image
+        return image
+
+    def _draw_text(self, image, coords, text, options):
+        if not text:
+            return
+        size = options.get('font', ("Courier", 12))[1]
+        masks = [line_mask(line, size) for line in text.split("\n")]
+        line_height = masks[0].height + 4  # PIL's default multiline spacing
+        width = max(mask.width for mask in masks)
+        left, top = anchor_origin(*coords, width, line_height * len(masks) - 4, options.get('anchor', 'center'))
+        fill = color(options.get('fill', 'black'))
+        justify = options.get('justify', 'left')
+        for row, mask in enumerate(masks):
+            x = left
+            if justify == 'center':
+                x += (width - mask.width) // 2
+            elif justify == 'right':
+                x += width - mask.width
+            y = top + row * line_height
+            image.paste(fill, (x, y, x + mask.width, y + mask.height), mask)
+
+
+class PNGSink:
+    """Writes frames as PNGs; latest.png is always the newest, replaced atomically."""
+
+    def __init__(self, directory, keep=RENDER_PNG_KEEP):
+        self.directory = directory
+        self.keep = keep
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, image):
+        latest = os.path.join(self.directory, 'latest.png')
+        image.save(latest + '.tmp', format='PNG', compress_level=1)
+        os.replace(latest + '.tmp', latest)
+        if self.keep > 0:
+            image.save(os.path.join(self.directory, f'frame_{self.count:06d}.png'), compress_level=1)
+            stale = os.path.join(self.directory, f'frame_{self.count - self.keep:06d}.png')
+            if self.count >= self.keep and os.path.exists(stale):
+                os.remove(stale)
+        self.count += 1
+
+    def close(self):
+        pass
+
+
+class FramebufferSink:
+    """Writes frames to a Linux framebuffer device (16 or 32 bits per pixel)."""
+
+    def __init__(self, device='/dev/fb0'):
+        sysfs = os.path.join('/sys/class/graphics', os.path.basename(device))
+        with open(os.path.join(sysfs, 'bits_per_pixel')) as f:
+            self.bits_per_pixel = int(f.read())
+        with open(os.path.join(sysfs, 'virtual_size')) as f:
+            self.width, self.height = (int(value) for value in f.read().split(','))
+        with open(os.path.join(sysfs, 'stride')) as f:
+            self.stride = int(f.read())
+        if self.bits_per_pixel not in (16, 32):
+            raise ValueError(f"Unsupported framebuffer depth: {self.bits_per_pixel} bpp")
+        self.device = open(device, 'r+b', buffering=0)
+
+    def encode(self, image):
+        if image.size != (self.width, self.height):
+            # No scaling: the terminal is drawn 1:1 in the top-left corner
+            screen = Image.new('RGB', (self.width, self.height))
+            screen.paste(image, (0, 0))
+            image = screen
+        if self.bits_per_pixel == 32:
+            return image.tobytes('raw', 'BGRX')
+        import numpy as np  # only the 16 bpp path needs it
+
+        rgb = np.asarray(image, dtype=np.uint16)
+        pixels = ((rgb[..., 0] >> 3) << 11) | ((rgb[..., 1] >> 2) << 5) | (rgb[..., 2] >> 3)
+        return pixels.astype('<u2').tobytes()
+
+    def write(self, image):
+        data = self.encode(image)
+        row = self.width * self.bits_per_pixel // 8
+        self.device.seek(0)
+        if row == self.stride:
+            self.device.write(data)
+            return
+        for y in range(self.height):
+            self.device.seek(y * self.stride)
+            self.device.write(data[y * row:(y + 1) * row])
+
+    def close(self):
+        self.device.close()
+
+
+def open_sink(target):
+    """'png:DIRECTORY' or 'fb:/dev/fbN' as in RENDER_OUTPUT."""
+    kind, _, path = target.partition(':')
+    if kind == 'png':
+        return PNGSink(path or 'frames')
+    if kind == 'fb':
+        return FramebufferSink(path or '/dev/fb0')
+    raise ValueError(f"Unknown render output: {target}")
+
+
+class HeadlessRoot:
+    """
+    Enough of tk.Tk to host a RetroTerminal: `after` timers, Tk-style file
+    handlers (via selectors) and a main loop that renders the canvas at a
+    fixed tick. `master.tk` is the root itself, as RetroTerminal calls
+    `master.tk.createfilehandler`.
+    """
+
+    def __init__(self, sink=None, fps=RENDER_FPS):
+        self.tk = self
+        self.canvas = None
+        self.sink = sink
+        self.frame_interval = 1 / fps if fps > 0 else 0.0
+        self.timers = []  # heap of (due, order, timer id, callback, args)
+        self.cancelled = set()
+        self.order = itertools.count()
+        self.selector = selectors.DefaultSelector()
+        self.bindings = {}
+        self.running = False
+        self.frames = 0
+        self.render_times = deque(maxlen=100)  # seconds per rendered frame
+
+    # -- tk.Tk surface -----------------------------------------------------
+
+    def title(self, text=None):
+        pass
+
+    def geometry(self, spec=None):
+        pass
+
+    def focus_set(self):
+        pass
+
+    def bind(self, sequence, callback):
+        self.bindings[sequence] = callback
+
+    def event_generate(self, sequence):
+        callback = self.bindings.get(sequence)
+        if callback is not None:
+            callback(None)
+
+    def after(self, ms, callback, *args):
+        order = next(self.order)
+        timer_id = f'after#{order}'
+        heapq.heappush(self.timers, (time.monotonic() + ms / 1000, order, timer_id, callback, args))
+        return timer_id
+
+    def after_cancel(self, timer_id):
+        self.cancelled.add(timer_id)
+
+    def createfilehandler(self, fd, mask, callback):
+        self.selector.register(fd, selectors.EVENT_READ, callback)
+
+    def deletefilehandler(self, fd):
+        try:
+            self.selector.unregister(fd)
+        except (KeyError, ValueError):
+            pass
+
+    def quit(self):
+        self.running = False
+
+    def destroy(self):
+        self.running = False
+        self.selector.close()
+        if self.sink is not None:
+            self.sink.close()
+
+    # -- loop --------------------------------------------------------------
+
+    def run_timers(self, now):
+        while self.timers and self.timers[0][0] <= now:
+            _, _, timer_id, callback, args = heapq.heappop(self.timers)
+            if timer_id in self.cancelled:
+                self.cancelled.discard(timer_id)
+                continue
+            try:
+                callback(*args)
+            except Exception as e:
+                logging.exception(f"Error in headless timer callback: {e}")
+
+    def poll_files(self, timeout):
+        if not self.selector.get_map():
+            if timeout > 0:
+                time.sleep(timeout)
+            return
+        for key, _ in self.selector.select(timeout):
+            try:
+                key.data(key.fd, READABLE)
+            except Exception as e:
+                logging.exception(f"Error in headless file handler: {e}")
+
+    def update(self):
+        """Runs whatever is due right now without blocking, like tk.update()."""
+        self.poll_files(0)
+        self.run_timers(time.monotonic())
+
+    def render_frame(self):
+        start = time.perf_counter()
+        image = self.canvas.render()
+        if self.sink is not None:
+            self.sink.write(image)
+        self.render_times.append(time.perf_counter() - start)
+        self.frames += 1
+        return image
+
+    def mainloop(self, frames=None):
+        self.running = True
+        next_frame = time.monotonic()
+        while self.running and (frames is None or self.frames < frames):
+            now = time.monotonic()
+            self.run_timers(now)
+            if self.canvas is not None and now >= next_frame:
+                self.render_frame()
+                # Skip missed ticks rather than rendering a burst to catch up
+                next_frame = max(next_frame + self.frame_interval, now)
+            wake = next_frame if self.canvas is not None else now + 1
+            if self.timers:
+                wake = min(wake, self.timers[0][0])
+            self.poll_files(max(0.0, wake - time.monotonic()))
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+LOOP_LAG_THRESHOLD = float(os.getenv('LOOP_LAG_THRESHOLD', 0.25))  # seconds
+PROFILE_DIR = os.getenv('PROFILE_DIR', '.')
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))  # seconds between samples
+PROFILE_SECONDS = int(os.getenv('PROFILE_SECONDS', 30))
+
+
+class LoopWatchdog:
+    """
+    Detects callbacks that block an event loop (asyncio or Tk).
+
+    The loop beats every `interval` seconds; a background thread notices when
+    beats stop arriving and logs the loop thread's stack while it is still
+    stuck, so the offending call shows up in the log.
+    """
+
+    def __init__(self, name, interval=0.1, threshold=LOOP_LAG_THRESHOLD):
+        self.name = name
+        self.interval = interval
+        self.threshold = threshold
+        self.thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.reported_beat = None
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.beats = 0
+        self.stalls = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._watch, daemon=True)
+        self.thread.start()
+
+    def beat(self, lag):
+        self.last_beat = time.monotonic()
+        self.beats += 1
+        self.total_lag += lag
+        if lag > self.max_lag:
+            self.max_lag = lag
+        if lag > self.threshold:
+            logging.warning(f"{self.name} loop lag {lag * 1000:.0f} ms")
+
+    def stats(self):
+        return {
+            'beats': self.beats,
+            'stalls': self.stalls,
+            'max_lag_ms': self.max_lag * 1000,
+            'avg_lag_ms': (self.total_lag / self.beats * 1000) if self.beats else 0.0,
+        }
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _watch(self):
+        while not self.stop_event.wait(self.threshold / 2):
+            last_beat = self.last_beat
+            stalled = time.monotonic() - last_beat - self.interval
+            if stalled > self.threshold and self.reported_beat != last_beat:
+                self.reported_beat = last_beat
+                self.stalls += 1
+                frame = sys._current_frames().get(self.thread_id)
+                stack = ''.join(traceback.format_stack(frame)) if frame else '<no frame>'
+                logging.warning(f"{self.name} loop blocked for {stalled * 1000:.0f} ms in:\n{stack}")
+
+
+def monitor_asyncio(loop=None, interval=0.1, threshold=LOOP_LAG_THRESHOLD):
+    """Must be called from the thread running `loop`."""
+    loop = loop or asyncio.get_running_loop()
+    watchdog = LoopWatchdog('asyncio', interval, threshold)
+
+    async def beat():
+        while not watchdog.stop_event.is_set():
+            start = loop.time()
+            await asyncio.sleep(interval)
+            watchdog.beat(loop.time() - start - interval)
+
+    watchdog.task = loop.create_task(beat())
+    return watchdog
+
+
+def monitor_tk(root, interval=0.1, threshold=LOOP_LAG_THRESHOLD):
+    """Must be called from the Tk thread."""
+    watchdog = LoopWatchdog('tk', interval, threshold)
+    interval_ms = int(interval * 1000)
+
+    def beat(scheduled):
+        watchdog.beat(max(0.0, time.monotonic() - scheduled))
+        if not watchdog.stop_event.is_set():
+            root.after(interval_ms, beat, time.monotonic() + interval)
+
+    root.after(interval_ms, beat, time.monotonic() + interval)
+    return watchdog
+
+
+class SamplingProfiler:
+    """
+    Samples every thread's stack at a fixed interval and writes folded stacks
+    ("frame;frame;frame count" per line), the input format of flamegraph.pl,
+    speedscope and inferno.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL, output_dir=PROFILE_DIR):
+        self.interval = interval
+        self.output_dir = output_dir
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.samples = Counter()
+        self.output_path = None
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, seconds=PROFILE_SECONDS):
+        """Returns the path the profile will be written to, or None if already running."""
+        with self.lock:
+            if self.is_running():
+                return None
+            self.samples = Counter()
+            self.stop_event.clear()
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            self.output_path = os.path.join(self.output_dir, f"profile-{os.getpid()}-{stamp}.folded")
+            self.thread = threading.Thread(target=self._run, args=(seconds,), daemon=True)
+            self.thread.start()
+            return self.output_path
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self, seconds):
+        own_id = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not self.stop_event.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[';'.join(reversed(stack))] += 1
+        self._write()
+
+    def _write(self):
+        try:
+            with open(self.output_path, 'w') as file:
+                for stack, count in self.samples.most_common():
+                    file.write(f"{stack} {count}\n")
+            logging.warning(f"Profile written to {self.output_path} ({sum(self.samples.values())} samples)")
+        except OSError as e:
+            logging.error(f"Error writing profile: {e}")
+
+
+profiler = SamplingProfiler()
+
+
+def toggle_profiler(seconds=PROFILE_SECONDS):
+    """Start the process-wide profiler, or stop it early if it is running."""
+    if profiler.is_running():
+        profiler.stop()
+        return None
+    return profiler.start(seconds)
+
+
+def install_signal_handler(signum=getattr(signal, 'SIGUSR1', None)):
+    """`kill -USR1 <pid>` starts a PROFILE_SECONDS profile; a second signal stops it."""
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return
+    signal.signal(signum, lambda *_: toggle_profiler())
@@ -0,0 +1,111 @@
+"""
+Compiled prompt templates for words.PromptGenerator and
+words_flux.FluxPromptGenerator.
+
+A template such as "A {adj:size} {noun} in {location}" is parsed once into
+a tuple of tokens: literal strings, word pools (vocabulary.Vocabulary) and
+named slots the generator fills per prompt. Expanding it is one pass and a
+join, instead of re-scanning and re-slicing the string for every tag.
+"""
+import re
+
+import vocabulary
+
+TAG = re.compile(r'\{([^{}]*)\}')
+
+
+class Slot:
+    """A per-prompt value (e.g. Flux quality tags), filled from `slots` at expansion."""
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Weighted:
+    """A pool whose words come out wrapped, e.g. "(word:1.2)" for ComfyUI."""
+    __slots__ = ('pool', 'format')
+
+    def __init__(self, pool, format):
+        self.pool = pool
+        self.format = format
+
+    def draw(self, random):
+        return self.format.format(self.pool.draw(random))
+
+
+def build_pools(words, vocab_dir=None):
+    """
+    Maps (category, subcategory) to a vocabulary to draw from; see
+    vocabulary.load_words for files overriding the inline lists.
+    """
+    return vocabulary.load_words(words, vocab_dir)
+
+
+def find_pool(pools, category, subcategory=None):
+    """Same fallbacks as the original _select_word: unknown subcategory means the whole category."""
+    if subcategory is not None:
+        pool = pools.get((category, subcategory))
+        if pool is not None:
+            return pool
+    return pools.get((category, None))
+
+
+class CompiledTemplate:
+    __slots__ = ('template', 'tokens')
+
+    def __init__(self, template, tokens):
+        self.template = template
+        self.tokens = tokens
+
+    def expand(self, random, slots=None):
+        """`random` is a bound Random.random (or random.random); slots fills Slot tokens."""
+        parts = []
+        append = parts.append
+        for token in self.tokens:
+            kind = token.__class__
+            if kind is str:
+                append(token)
+            elif kind is Slot:
+                append(slots[token.name])
+            else:
+                append(token.draw(random))
+        return "".join(parts)
+
+
+def compile_template(template, pools, slots=(), weighted=(), weight_format="({}:1.2)"):
+    """
+    `slots` names tags filled per prompt by the caller; words drawn for
+    `weighted` categories come out wrapped in weight_format.
+    """
+    tokens = []
+    position = 0
+    for match in TAG.finditer(template):
+        if match.start() > position:
+            tokens.append(template[position:match.start()])
+        category, _, subcategory = match.group(1).partition(':')
+        if category in slots:
+            token = Slot(category)
+        else:
+            pool = find_pool(pools, category, subcategory or None)
+            if not pool:
+                token = f"<unknown-{category}>"
+                if category in weighted:
+                    token = weight_format.format(token)
+            elif category in weighted:
+                token = Weighted(pool, weight_format)
+            else:
+                token = pool
+        tokens.append(token)
+        position = match.end()
+    if position < len(template):
+        tokens.append(template[position:])
+
+    # Merge neighbouring literals so expansion appends fewer pieces
+    merged = []
+    for token in tokens:
+        if token.__class__ is str and merged and merged[-1].__class__ is str:
+            merged[-1] += token
+        else:
+            merged.append(token)
+    return CompiledTemplate(template, tuple(merged))
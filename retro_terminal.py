@@ -1,30 +1,47 @@
 import tkinter as tk
-from PIL import Image, ImageTk, ImageDraw, ImageFont
-import random
+from PIL import Image, ImageTk, ImageDraw
 from collections import deque
+from functools import lru_cache
+from itertools import islice
+import re
 import textwrap
-import os, logging, time, psutil
+import os, logging, math, time, psutil
 from led_controller import LEDController
-import cv2
+import glitch
+import scrollback
+from video_stream import DecoderPool, VideoGovernor, VideoStream
+import telemetry as pi_telemetry
+import ipc_channel
+import offscreen
+import profiling
 from dotenv import load_dotenv
 import urllib.request
-import numpy as np
-import threading
-import queue
 
 # Load environment variables
 load_dotenv()
 
 LOG_FILE_TERMINAL = os.getenv('LOG_FILE_TERMINAL')
+# Comma-separated MJPEG URLs, shown as a grid; the first one feeds /snapshot
+VIDEO_STREAMS = os.getenv('VIDEO_STREAMS', "http://192.168.0.5:8000/stream.mjpg").split(',')
+VIDEO_STATS = os.getenv('VIDEO_STATS', 'true').lower() == 'true'  # FPS / cost overlay
+LOG_FRAMES_PER_TICK = int(os.getenv('LOG_FRAMES_PER_TICK', 4))  # IPC batches read per Tk callback
+LOG_RENDER_INTERVAL = int(os.getenv('LOG_RENDER_INTERVAL', 50))  # ms, coalesces log redraws
+LOG_BACKLOG_MAX = int(os.getenv('LOG_BACKLOG_MAX', 256))  # unrendered lines kept for the live view
+SCROLLBACK_SEARCH_CHUNK = int(os.getenv('SCROLLBACK_SEARCH_CHUNK', 500))  # records scanned per tick
 
 logging.basicConfig(filename=LOG_FILE_TERMINAL, level=logging.WARNING,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
+@lru_cache(maxsize=4096)
+def wrap_line(text, width):
+    return tuple(textwrap.wrap(text, width=width))
+
 class CRTFrame:
-    def __init__(self, width, height, border_width=60):
+    def __init__(self, width, height, border_width=60, photo_class=ImageTk.PhotoImage):
         self.width = width
         self.height = height
         self.border_width = border_width
+        self.photo_class = photo_class
         self.frame_image = self.create_frame()
 
     def create_frame(self):
@@ -51,7 +68,7 @@ class CRTFrame:
         # Draw corner lines
         self.draw_corner_lines(draw, line_color2, thickness2)
 
-        return ImageTk.PhotoImage(image)
+        return self.photo_class(image)
 
     def draw_frame_edge(self, draw, color, thickness):
         edges = [
@@ -76,47 +93,11 @@ class CRTFrame:
     def get_frame(self):
         return self.frame_image
 
-class VideoStream:
-    def __init__(self, url, width, height):
-        self.url = url
-        self.width = width
-        self.height = height
-        self.frame_queue = queue.Queue(maxsize=1)
-        self.stop_event = threading.Event()
-        self.thread = None
-
-    def start(self):
-        self.stop_event.clear()
-        self.thread = threading.Thread(target=self._capture_frames)
-        self.thread.daemon = True
-        self.thread.start()
-
-    def stop(self):
-        self.stop_event.set()
-        if self.thread:
-            self.thread.join()
-
-    def _capture_frames(self):
-        cap = cv2.VideoCapture(self.url)
-        while not self.stop_event.is_set():
-            ret, frame = cap.read()
-            if ret:
-                frame = cv2.resize(frame, (self.width, self.height))
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                if not self.frame_queue.full():
-                    self.frame_queue.put(frame)
-            else:
-                time.sleep(0.1)
-        cap.release()
-
-    def get_frame(self):
-        try:
-            return self.frame_queue.get_nowait()
-        except queue.Empty:
-            return None
-
 class RetroTerminal:
-    def __init__(self, master, width, height, max_logs=4, font_size=12, log_queue=None, led_control_queue=None):
+    photo_class = ImageTk.PhotoImage
+
+    def __init__(self, master, width, height, max_logs=4, font_size=12, channel=None, status=None,
+                 shared_frame=None, telemetry=None):
         self.master = master
         self.master.title("Bravolith Terminal")
         
@@ -124,25 +105,62 @@ class RetroTerminal:
         self.height = height
         self.master.geometry(f"{width}x{height}")
         
-        self.log_queue = log_queue
+        # ipc_channel.ChannelReceiver fed by the bot and supervisor
+        self.channel = channel
         self.max_logs = max_logs
         self.font_size = font_size
         self.log_lines = deque(maxlen=max_logs)
 
-        self.canvas = tk.Canvas(master, bg="gray5", width=width, height=height)
-        self.canvas.pack(fill=tk.BOTH, expand=True)
-        self.led_controller = LEDController()
-        self.led_control_queue = led_control_queue
+        self.canvas = self.create_canvas()
+        # Driven from the Tk loop, so no scheduler thread is needed in the GUI
+        self.led_controller = LEDController(threaded=False)
+        self.led_toggles = {
+            'telegram': self.toggle_telegram,
+            'monolith': self.toggle_monolith,
+            'webcam': self.toggle_webcam,
+        }
+        self.metrics = {}
+        # status_board.StatusBoard written by the bot; read lock-free on StatusChanged
+        self.status = status
+        # shared_frame.SharedFrame the capture thread publishes webcam frames to
+        self.shared_frame = shared_frame
+        # telemetry.TelemetryBuffer sampled by the parent; None falls back to psutil on a timer
+        self.telemetry = telemetry
+        self.telemetry_written = None
+        self.telemetry_latest = None
+        self.sparkline_samples = 30
+        self.status_sequence = None
+        self.status_snapshot = None
 
         # Start video stream
-        self.video_stream_url = "http://192.168.0.5:8000/stream.mjpg"
-        self.video_stream = None
-        self.video_frame = None
-
-        self.led_update_interval = 100  # milliseconds
-        self.log_update_interval = 100  # milliseconds
+        self.video_stream_urls = [url.strip() for url in VIDEO_STREAMS if url.strip()]
+        self.video_streams = []
+        self.video_frames = []
+        self.video_photos = []
+
+        self.stats_interval = 1000  # milliseconds between psutil checks, only without telemetry
+        self.fallback_poll_interval = 100  # milliseconds, only without Tk file handlers
+        self.video_governor = VideoGovernor()
+        self.video_frame_interval = 1000 // self.video_governor.max_fps  # milliseconds
         self.led_states = {name: False for name in ['cpu', 'webcam', 'telegram', 'monolith']}
-        self.log_buffer = []
+        # Lines received but not drawn yet; during a flood the oldest are only kept on disk
+        self.log_buffer = deque(maxlen=LOG_BACKLOG_MAX)
+        self.log_frames_per_tick = LOG_FRAMES_PER_TICK
+        self.log_render_interval = LOG_RENDER_INTERVAL
+        self.log_render_pending = False
+        try:
+            self.scrollback = scrollback.ScrollbackStore()
+        except OSError as e:
+            logging.error(f"Error opening scrollback file: {e}")
+            self.scrollback = None
+        self.history_end = None  # sequence the history view ends at, None while live
+        self.search_id = 0
+        self.search_pattern = None
+        self.search_resume = None
+        self.glitch = glitch.GlitchEngine()
+        self.glitch_interval = glitch.GLITCH_INTERVAL  # milliseconds, 0 = only on new logs
+        self.glitch_pending = False
+        self.log_fill = "green"
 
         self.setup_video_stream()
 
@@ -150,14 +168,23 @@ class RetroTerminal:
         self.create_log_display()
     
         # Create CRT frame
-        self.crt_frame = CRTFrame(width, height)
+        self.crt_frame = CRTFrame(width, height, photo_class=self.photo_class)
         self.canvas.create_image(0, 0, anchor="nw", image=self.crt_frame.get_frame())
     
         self.create_leds()
+        self.create_job_display()
 
-        self.last_cpu_check = time.time()
         self.start_update_loops()
 
+    def create_canvas(self):
+        canvas = tk.Canvas(self.master, bg="gray5", width=self.width, height=self.height)
+        canvas.pack(fill=tk.BOTH, expand=True)
+        return canvas
+
+    def create_search_entry(self):
+        return tk.Entry(self.master, bg="gray5", fg="green", insertbackground="green",
+                        font=("Courier", 10), width=24)
+
     def create_ascii_art(self):
         self.ascii_art_2 = """
  ▄▄▄▄    ██▀███   ▄▄▄    ██▒   █▓ ▒█████   ██▓     ██▓▄▄▄█████▓ ██░ ██ 
@@ -196,7 +223,27 @@ class RetroTerminal:
         )
 
         self.calculate_max_lines()
-        self.update_logs()
+        self.wrap_width = self.log_display_width // (self.font_size // 2)
+        self.create_history_controls()
+
+    def create_history_controls(self):
+        self.history_display = self.canvas.create_text(
+            70, self.height - 30,
+            text="",
+            fill="ivory2",
+            font=("Courier", 10),
+            anchor="w"
+        )
+        self.search_entry = self.create_search_entry()
+        self.search_window = self.canvas.create_window(
+            self.width - 70, self.height - 30, window=self.search_entry, anchor="e", state="hidden"
+        )
+        self.search_entry.bind('<Return>', lambda event: self.start_search(self.search_entry.get()))
+        self.search_entry.bind('<Escape>', lambda event: self.show_live())
+        self.master.bind('<Prior>', lambda event: self.page_history(-1))
+        self.master.bind('<Next>', lambda event: self.page_history(1))
+        self.master.bind('<End>', lambda event: self.show_live())
+        self.master.bind('<Control-f>', lambda event: self.open_search())
 
     def create_leds(self):
         self.led_radius = 10
@@ -220,58 +267,173 @@ class RetroTerminal:
     def setup_video_stream(self):
         video_width = self.width - 123
         video_height = self.height - 124
-        self.video_stream = VideoStream(self.video_stream_url, video_width, video_height)
-        self.video_frame = self.canvas.create_image(
-            self.width // 2 + 1, self.height // 2 + 1,
-            anchor="center"
+        gap = 2
+        count = max(1, len(self.video_stream_urls))
+        columns = math.ceil(math.sqrt(count))
+        rows = math.ceil(count / columns)
+        tile_width = (video_width - gap * (columns - 1)) // columns
+        tile_height = (video_height - gap * (rows - 1)) // rows
+        left = self.width // 2 + 1 - video_width // 2
+        top = self.height // 2 + 1 - video_height // 2
+
+        # One small decoder pool for every tile instead of a decode thread per camera
+        self.video_pool = DecoderPool()
+        for index, url in enumerate(self.video_stream_urls):
+            row, column = divmod(index, columns)
+            stream = VideoStream(url, tile_width, tile_height, pool=self.video_pool,
+                                 shared_frame=self.shared_frame if index == 0 else None)
+            stream.set_quality(self.video_governor.max_fps, self.video_governor.divisor)
+            self.video_streams.append(stream)
+            self.video_frames.append(self.canvas.create_image(
+                left + column * (tile_width + gap) + tile_width // 2,
+                top + row * (tile_height + gap) + tile_height // 2,
+                anchor="center"
+            ))
+            # Created once; each frame is pasted into it in place
+            self.video_photos.append(self.photo_class('RGB', (tile_width, tile_height)))
+        self.video_stats_display = self.canvas.create_text(
+            self.width - 70, 48,
+            text="",
+            fill="ivory2",
+            font=("Courier", 8),
+            anchor="e"
         )
 
+    def video_running(self):
+        return any(stream.thread is not None for stream in self.video_streams)
+
     def start_video_stream(self):
         #self.setup_video_stream()
-        self.video_stream.start()
+        for stream, item, photo in zip(self.video_streams, self.video_frames, self.video_photos):
+            stream.start()
+            self.canvas.itemconfig(item, image=photo)
         self.update_video_frame()
         #self.toggle_webcam(True)
 
     def stop_video_stream(self):
-        self.video_stream.stop()
+        for stream in self.video_streams:
+            stream.stop()
+        self.canvas.itemconfig(self.video_stats_display, text="")
         #self.toggle_webcam(False)
 
     def update_video_frame(self):
-        frame = self.video_stream.get_frame()
-        if frame is not None:
-            image = Image.fromarray(frame)
-            photo = ImageTk.PhotoImage(image=image)
-            self.canvas.itemconfig(self.video_frame, image=photo)
-            self.canvas.image = photo  # Keep a reference to avoid garbage collection
+        if not self.video_running():
+            return  # stream stopped; start_video_stream restarts the loop
+
+        for stream, photo in zip(self.video_streams, self.video_photos):
+            frame = stream.get_frame()
+            if frame is not None:
+                start = time.perf_counter()
+                photo.paste(frame)
+                stream.stats.add_draw(time.perf_counter() - start)
 
-        self.master.after(66, self.update_video_frame)  # Update roughly 30 times per second
+        self.master.after(self.video_frame_interval, self.update_video_frame)
 
     def start_update_loops(self):
-        self.update_led_activity()
-        self.update_logs()
+        self.drive_leds()
 
-    def update_led_activity(self):
-        current_time = time.time()
-        if current_time - self.last_cpu_check >= 1:  # Update CPU usage every second
-            cpu_percent = psutil.cpu_percent()
-            self.led_controller.set_cpu_usage(cpu_percent)
-            self.last_cpu_check = current_time
+        if self.channel is not None:
+            self.watch_fd(self.channel.fileno(), self.on_channel_ready)
+
+        if self.channel is None or self.telemetry is None:
+            # Nothing announces new samples or board writes; poll for them
+            self.update_system_stats()
+        else:
+            # Afterwards StatusChanged brings every board write and telemetry sample
+            self.read_status()
+        self.schedule_glitch()
 
-        while not self.led_control_queue.empty():
+    def watch_fd(self, fd, callback):
+        """Runs callback(fd, mask) on the Tk thread whenever fd is readable."""
+        try:
+            self.master.tk.createfilehandler(fd, tk.READABLE, callback)
+        except (AttributeError, tk.TclError):
+            # Tk file handlers are Unix only; fall back to polling elsewhere
+            def poll():
+                callback(fd, tk.READABLE)
+                self.master.after(self.fallback_poll_interval, poll)
+            poll()
+
+    def drive_leds(self):
+        # Sleep exactly until the next blink step instead of polling LED states
+        if self.led_controller.tick():
+            self.update_led_activity()
+        delay_ms = max(1, int(self.led_controller.next_delay() * 1000))
+        self.master.after(delay_ms, self.drive_leds)
+
+    def on_channel_ready(self, fd, mask):
+        self.update_logs()
+        if self.channel.closed:
+            logging.error("IPC channel closed, no more terminal updates")
             try:
-                message = self.led_control_queue.get_nowait()
-                if message.startswith('telegram:'):
-                    _, state = message.split(':')
-                    self.toggle_telegram(state == 'True')
-                if message.startswith('monolith:'):
-                    _, state = message.split(':')
-                    self.toggle_monolith(state == 'True')
-                if message.startswith('webcam:'):
-                    _, state = message.split(':')
-                    self.toggle_webcam(state == 'True')
-            except queue.Empty:
-                break
+                self.master.tk.deletefilehandler(fd)
+            except (AttributeError, tk.TclError):
+                pass
+
+    def read_status(self):
+        """Handles StatusChanged: re-reads the status board and, once per new sample, telemetry."""
+        if self.read_status_board():
+            self.update_led_activity()
+        if self.telemetry is not None and self.telemetry.written() != self.telemetry_written:
+            sample = self.read_telemetry()
+            if sample is not None:
+                temperature = None if math.isnan(sample.temperature) else sample.temperature
+                self.show_system_stats(sample.cpu, temperature)
+
+    def update_system_stats(self):
+        # Fallback timer for when no StatusChanged events arrive to drive read_status
+        sample = self.read_telemetry()
+        if sample is None:
+            cpu_percent = psutil.cpu_percent()
+            temperature = pi_telemetry.read_cpu_temperature()
+        else:
+            cpu_percent = sample.cpu
+            temperature = None if math.isnan(sample.temperature) else sample.temperature
+        self.show_system_stats(cpu_percent, temperature)
+        if self.read_status_board():
+            self.update_led_activity()
+
+        self.master.after(self.stats_interval, self.update_system_stats)
+
+    def show_system_stats(self, cpu_percent, temperature):
+        self.led_controller.set_cpu_usage(cpu_percent)
+        if self.video_running():
+            self.govern_video(cpu_percent, temperature)
+            self.show_video_stats()
+
+    def govern_video(self, cpu_percent, temperature):
+        governor = self.video_governor
+        if governor.update(cpu_percent, temperature):
+            self.video_frame_interval = 1000 // governor.max_fps
+            for stream in self.video_streams:
+                stream.set_quality(governor.max_fps, governor.divisor)
+            logging.warning(f"Video quality level {governor.level}: "
+                            f"{governor.max_fps} fps, 1/{governor.divisor} resolution")
+
+    def show_video_stats(self):
+        reports = [stream.stats.report() for stream in self.video_streams]
+        captured = sum(report['capture_fps'] for report in reports)
+        displayed = sum(report['display_fps'] for report in reports)
+        stats = {
+            'capture_fps': captured,
+            'display_fps': displayed,
+            # Averages weighted by how many frames each tile contributed
+            'decode_ms': sum(r['decode_ms'] * r['capture_fps'] for r in reports) / captured if captured else 0.0,
+            'draw_ms': sum(r['draw_ms'] * r['display_fps'] for r in reports) / displayed if displayed else 0.0,
+            'dropped': sum(report['dropped'] for report in reports),
+            'skipped': sum(report['skipped'] for report in reports),
+            'tiles': len(reports),
+        }
+        self.metrics['video'] = stats
+        if VIDEO_STATS:
+            self.canvas.itemconfig(
+                self.video_stats_display,
+                text=f"{stats['display_fps']:4.1f}/{stats['capture_fps']:4.1f} FPS  "
+                     f"DEC {stats['decode_ms']:4.1f}MS  DRAW {stats['draw_ms']:4.1f}MS  "
+                     f"DROP {stats['dropped']}  Q{self.video_governor.level}"
+            )
 
+    def update_led_activity(self):
         led_updates = []
         for led_name, led_oval in self.leds.items():
             new_color = self.led_controller.get_led_color(led_name)
@@ -280,62 +442,206 @@ class RetroTerminal:
                 self.led_states[led_name] = new_color
 
         if led_updates:
-            self.canvas.after(0, self.batch_update_leds, led_updates)
+            self.batch_update_leds(led_updates)
+
+    def poll_channel(self, max_frames=None):
+        if self.channel is None:
+            return
+        for event in self.channel.poll(max_frames):
+            if isinstance(event, ipc_channel.StatusChanged):
+                self.read_status()
+            elif isinstance(event, ipc_channel.LogRecord):
+                if self.scrollback is not None:
+                    self.scrollback.append(event.text, event.level)
+                self.log_buffer.append(event.text)
+            elif isinstance(event, ipc_channel.JobProgress):
+                self.show_job_progress(event)
+            elif isinstance(event, ipc_channel.Metrics):
+                self.metrics[event.source] = event.values
+            elif isinstance(event, ipc_channel.Profile):
+                profiling.toggle_profiler(event.seconds)
+
+    def read_status_board(self):
+        """Returns True if the board changed since the last read."""
+        if self.status is None or self.status.sequence() == self.status_sequence:
+            return False
+        snapshot = self.status.snapshot()
+        self.status_sequence = snapshot.sequence
+        self.status_snapshot = snapshot
+        for name, toggle in self.led_toggles.items():
+            toggle(snapshot.leds[name])
+        return True
+
+    def create_job_display(self):
+        self.job_display = self.canvas.create_text(
+            70, 30,
+            text="",
+            fill="ivory2",
+            font=("Courier", 10),
+            anchor="w"
+        )
+        self.telemetry_display = self.canvas.create_text(
+            70, 48,
+            text="",
+            fill="ivory2",
+            font=("Courier", 8),
+            anchor="w"
+        )
 
-        self.master.after(self.led_update_interval, self.update_led_activity)
+    def read_telemetry(self):
+        """Returns the newest sample, redrawing the sparklines when it is new."""
+        if self.telemetry is None:
+            return None
+        written = self.telemetry.written()
+        if written == self.telemetry_written:
+            return self.telemetry_latest
+        self.telemetry_written = written
+        samples = self.telemetry.samples(count=self.sparkline_samples)
+        self.telemetry_latest = samples[-1] if samples else None
+        if samples:
+            latest = samples[-1]
+            spark = pi_telemetry.sparkline
+            net = [sample.net_rx + sample.net_tx for sample in samples]
+            temperature = "--" if math.isnan(latest.temperature) else f"{latest.temperature:.0f}C"
+            self.canvas.itemconfig(
+                self.telemetry_display,
+                text=f"CPU {spark([s.cpu for s in samples], 0, 100)} {latest.cpu:3.0f}%  "
+                     f"TMP {spark([s.temperature for s in samples], 40, 85)} {temperature}  "
+                     f"NET {spark(net, 0)} {net[-1] / 1024:.0f}K/S"
+            )
+        return self.telemetry_latest
+
+    def show_job_progress(self, progress):
+        if progress.maximum and progress.value >= progress.maximum:
+            text = ""
+        else:
+            text = f"{progress.stage.upper()} {progress.value}/{progress.maximum}"
+        self.canvas.itemconfig(self.job_display, text=text)
 
     def batch_update_leds(self, updates):
         for led_oval, color in updates:
             self.canvas.itemconfig(led_oval, fill=color)
 
     def update_logs(self):
-        try:
-            while not self.log_queue.empty():
-                log = self.log_queue.get_nowait()
-                self.log_buffer.append(log)
-        except queue.Empty:
-            pass
+        # Frames left in the pipe keep the fd readable, so Tk calls back after
+        # handling other events instead of draining a flood in one go
+        self.poll_channel(self.log_frames_per_tick)
 
-        if self.log_buffer:
-            self.process_log_buffer()
-
-        self.master.after(self.log_update_interval, self.update_logs)
+        if self.log_buffer and not self.log_render_pending:
+            self.log_render_pending = True
+            self.master.after(self.log_render_interval, self.process_log_buffer)
 
     def process_log_buffer(self):
-        for log in self.log_buffer:
-            wrapped_lines = textwrap.wrap(log, width=self.log_display_width // (self.font_size // 2))
-            self.log_lines.extend(wrapped_lines)
-
+        self.log_render_pending = False
+        # Only the newest lines can still be on screen, so wrap from the end
+        # and stop once the view is full
+        wrapped_lines = []
+        while self.log_buffer and len(wrapped_lines) < self.max_logs:
+            wrapped_lines[:0] = wrap_line(self.log_buffer.pop(), self.wrap_width)
         self.log_buffer.clear()
-        self.display_logs()
+        self.log_lines.extend(wrapped_lines)
+
+        if self.history_end is None:
+            self.display_logs()
 
     def display_logs(self):
-        display_lines = list(self.log_lines)[-self.max_lines:]
-        display_text = "\n".join(display_lines)
+        start = max(0, len(self.log_lines) - self.max_lines)
+        display_text = "\n".join(islice(self.log_lines, start, None))
         self.glitch_print(display_text)
 
-    def glitch_print(self, text):
-        glitched_text = ""
-        colors = ["blue", "magenta", "cyan", "hot pink"]
-        for char in text:
-            if random.random() < 0.02:
-                glitched_text += random.choice("@#$%&*░▒▓█▄▀▐")
-            else:
-                glitched_text += char
+    def page_history(self, direction):
+        if self.scrollback is None or self.scrollback.next_sequence == 0:
+            return
+        end = self.scrollback.next_sequence if self.history_end is None else self.history_end
+        end += direction * self.max_logs
+        if end >= self.scrollback.next_sequence:
+            self.show_live()
+        else:
+            self.show_history(max(end, self.scrollback.first_sequence + 1))
+
+    def show_history(self, end, note=""):
+        self.history_end = end
+        lines = self.scrollback.read(end - self.max_logs, self.max_logs)
+        wrapped_lines = [row for line in lines for row in wrap_line(line.text, self.wrap_width)]
+        self.glitch_print("\n".join(wrapped_lines[-self.max_logs:]))
+        self.canvas.itemconfig(
+            self.history_display,
+            text=f"HISTORY {end}/{self.scrollback.next_sequence} {note}- PGUP/PGDN, CTRL+F, END"
+        )
 
-        self.canvas.itemconfig(self.log_display, text=glitched_text)
+    def show_live(self):
+        self.history_end = None
+        self.search_id += 1  # abandons a search in progress
+        self.search_resume = None
+        self.canvas.itemconfig(self.search_window, state="hidden")
+        self.canvas.itemconfig(self.history_display, text="")
+        self.master.focus_set()
+        self.display_logs()
 
-        if random.random() < 0.1:
-            glitch_color = random.choice(colors)
-            self.canvas.itemconfig(self.log_display, fill=glitch_color)
+    def open_search(self):
+        if self.scrollback is None:
+            return
+        self.canvas.itemconfig(self.search_window, state="normal")
+        self.search_entry.focus_set()
+
+    def start_search(self, term):
+        if not term:
+            return
+        pattern = re.compile(re.escape(term), re.IGNORECASE)
+        if self.search_pattern is not None and pattern.pattern == self.search_pattern.pattern \
+                and self.search_resume is not None:
+            before = self.search_resume  # Return again finds the next older match
         else:
-            self.canvas.itemconfig(self.log_display, fill="green")
+            before = self.history_end
+        self.search_pattern = pattern
+        self.search_id += 1
+        self.canvas.itemconfig(self.history_display, text=f"SEARCHING {term}...")
+        self.search_step(self.search_id, before)
+
+    def search_step(self, search_id, before):
+        if search_id != self.search_id:
+            return
+        match, resume = self.scrollback.search(self.search_pattern, before, SCROLLBACK_SEARCH_CHUNK)
+        if match is not None:
+            self.search_resume = match.sequence
+            self.show_history(match.sequence + 1, note=f"MATCH #{match.sequence} ")
+        elif resume is None:
+            self.search_resume = None
+            self.canvas.itemconfig(self.history_display, text="NOT FOUND - ESC TO RETURN")
+        else:
+            # Yield to the render loop between chunks of a long scan
+            self.master.after(1, self.search_step, search_id, resume)
+
+    def glitch_print(self, text):
+        self.glitch.set_text(text)
+        self.render_glitch()
+        self.schedule_glitch()
+
+    def render_glitch(self):
+        glitched_text, color = self.glitch.render()
+        self.canvas.itemconfig(self.log_display, text=glitched_text)
+        if color != self.log_fill:
+            self.canvas.itemconfig(self.log_display, fill=color)
+            self.log_fill = color
+
+    def schedule_glitch(self):
+        # At most one tick pending, and none while there is nothing to animate
+        if self.glitch_interval > 0 and self.glitch.text and not self.glitch_pending:
+            self.glitch_pending = True
+            self.master.after(self.glitch_interval, self.glitch_tick)
+
+    def glitch_tick(self):
+        # Idle animation; stops while the log view is empty until glitch_print restarts it
+        self.glitch_pending = False
+        if self.glitch.text:
+            self.render_glitch()
+        self.schedule_glitch()
 
     def toggle_webcam(self, is_active):
         self.led_controller.toggle_webcam(is_active)
-        if is_active and not self.video_stream.thread:
+        if is_active and not self.video_running():
             self.start_video_stream()
-        elif not is_active and self.video_stream.thread:
+        elif not is_active and self.video_running():
             self.stop_video_stream()
 
     def toggle_telegram(self, is_active):
@@ -345,7 +651,22 @@ class RetroTerminal:
         self.led_controller.toggle_monolith(is_active)
 
     def calculate_max_lines(self):
-        font = ImageFont.truetype("courier.ttf", self.font_size)
+        font = offscreen.load_font(self.font_size)
         _,_,_, line_height = font.getbbox("A")  # text width, height
         self.max_lines = self.log_display_height // line_height
 
+
+
+class HeadlessTerminal(RetroTerminal):
+    """
+    RetroTerminal drawn into an offscreen.OffscreenCanvas instead of a Tk
+    window. `master` is an offscreen.HeadlessRoot, whose main loop renders
+    the canvas at a fixed tick into PNGs or a framebuffer.
+    """
+    photo_class = offscreen.OffscreenPhoto
+
+    def create_canvas(self):
+        return offscreen.OffscreenCanvas(self.master, self.width, self.height, bg="gray5")
+
+    def create_search_entry(self):
+        return offscreen.OffscreenEntry(self.master, fg="green", font=("Courier", 10))
@@ -0,0 +1,128 @@
+"""
+Disk-backed ring buffer holding the full terminal log history.
+
+The file is a header followed by `capacity` fixed-size records, memory
+mapped so appends are a memcpy; the kernel writes pages back on its own and
+the history survives GUI restarts. Record `n` lives in slot
+`n % capacity`, so the newest `capacity` records are always available.
+Lines longer than one record are split across consecutive records.
+"""
+import logging
+import mmap
+import os
+import re
+import struct
+import time
+from typing import NamedTuple
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+SCROLLBACK_FILE = os.getenv('SCROLLBACK_FILE', 'bravolith_scrollback.bin')
+SCROLLBACK_LINES = int(os.getenv('SCROLLBACK_LINES', 20000))
+RECORD_SIZE = 256
+
+MAGIC = b'BRVSCRL1'
+_FILE_HEADER = struct.Struct('<8sIIQ')   # magic, capacity, record size, next sequence
+_RECORD_HEADER = struct.Struct('<QdBH')  # sequence + 1 (0 = empty slot), time, level, text bytes
+HEADER_SIZE = 64
+
+
+class LogLine(NamedTuple):
+    sequence: int
+    time: float
+    level: int
+    text: str
+
+
+class ScrollbackStore:
+    def __init__(self, path=SCROLLBACK_FILE, capacity=SCROLLBACK_LINES, record_size=RECORD_SIZE):
+        self.path = path
+        self.capacity = capacity
+        self.record_size = record_size
+        self.text_size = record_size - _RECORD_HEADER.size
+        size = HEADER_SIZE + capacity * record_size
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            self.mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        magic, stored_capacity, stored_record_size, next_sequence = _FILE_HEADER.unpack_from(self.mm, 0)
+        if (magic, stored_capacity, stored_record_size) != (MAGIC, capacity, record_size):
+            # New file or a different layout: start an empty history
+            self.mm[:] = bytes(size)
+            next_sequence = 0
+        self.next_sequence = next_sequence
+        self._write_header()
+
+    def _write_header(self):
+        _FILE_HEADER.pack_into(self.mm, 0, MAGIC, self.capacity, self.record_size, self.next_sequence)
+
+    def _offset(self, sequence):
+        return HEADER_SIZE + (sequence % self.capacity) * self.record_size
+
+    @property
+    def first_sequence(self):
+        return max(0, self.next_sequence - self.capacity)
+
+    def append(self, text, level=logging.INFO, when=None):
+        when = time.time() if when is None else when
+        data = text.encode('utf-8', errors='replace')
+        while True:
+            chunk = data[:self.text_size]
+            data = data[self.text_size:]
+            offset = self._offset(self.next_sequence)
+            _RECORD_HEADER.pack_into(self.mm, offset, self.next_sequence + 1, when, level, len(chunk))
+            start = offset + _RECORD_HEADER.size
+            self.mm[start:start + len(chunk)] = chunk
+            self.next_sequence += 1
+            if not data:
+                break
+        self._write_header()
+
+    def get(self, sequence):
+        if not self.first_sequence <= sequence < self.next_sequence:
+            return None
+        offset = self._offset(sequence)
+        stored, when, level, length = _RECORD_HEADER.unpack_from(self.mm, offset)
+        if stored != sequence + 1:
+            return None
+        start = offset + _RECORD_HEADER.size
+        # A split multi-byte character at a record boundary is dropped
+        text = self.mm[start:start + length].decode('utf-8', errors='ignore')
+        return LogLine(sequence, when, level, text)
+
+    def read(self, start, count):
+        """Returns up to `count` records starting at sequence `start`, oldest first."""
+        start = max(start, self.first_sequence)
+        stop = min(start + count, self.next_sequence)
+        return [line for line in map(self.get, range(start, stop)) if line is not None]
+
+    def search(self, pattern, before=None, max_records=2000):
+        """
+        Scans backwards from `before` (exclusive, default newest) over at most
+        `max_records` records, so callers can spread a long search over
+        several event-loop ticks. Returns (match or None, sequence to resume
+        before, or None once the oldest record was scanned).
+        """
+        if isinstance(pattern, str):
+            pattern = re.compile(re.escape(pattern), re.IGNORECASE)
+        before = self.next_sequence if before is None else min(before, self.next_sequence)
+        stop = max(self.first_sequence, before - max_records)
+        for sequence in range(before - 1, stop - 1, -1):
+            line = self.get(sequence)
+            if line is not None and pattern.search(line.text):
+                return line, sequence
+        return None, (stop if stop > self.first_sequence else None)
+
+    def close(self):
+        self._write_header()
+        self.mm.flush()
+        self.mm.close()
@@ -0,0 +1,115 @@
+"""
+Latest webcam frame, shared from the GUI process to the bot.
+
+The GUI's capture thread copies a decoded RGB frame into a shared-memory
+block every SNAPSHOT_PUBLISH_INTERVAL seconds, stamped with a sequence
+number and the capture time. The bot reads it for /snapshot, so there is
+no second camera connection or decode pipeline. Like status_board, the
+block is guarded by a seqlock: one writer, lock-free readers that retry
+if the frame changed under them.
+"""
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+SHARED_FRAME_BYTES = int(os.getenv('SHARED_FRAME_BYTES', 1280 * 720 * 3))
+SNAPSHOT_PUBLISH_INTERVAL = float(os.getenv('SNAPSHOT_PUBLISH_INTERVAL', 0.5))  # seconds
+SNAPSHOT_MAX_AGE = float(os.getenv('SNAPSHOT_MAX_AGE', 5))  # older frames count as no camera
+
+_HEADER = struct.Struct('<QdII')  # sequence, capture time (epoch), width, height
+HEADER_SIZE = 64
+
+
+class Frame(NamedTuple):
+    sequence: int
+    timestamp: float
+    width: int
+    height: int
+    rgb: bytes
+
+
+class SharedFrame:
+    def __init__(self, name=None, create=False, capacity=SHARED_FRAME_BYTES):
+        size = HEADER_SIZE + capacity if create else 0
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self.buf = self.shm.buf
+        self.capacity = self.shm.size - HEADER_SIZE
+        self.owner = create
+        self.last_publish = 0.0
+        if create:
+            self.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+
+    def __getstate__(self):
+        # Children started with the spawn method attach by name
+        return {'name': self.name}
+
+    def __setstate__(self, state):
+        self.__init__(state['name'])
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    # -- writer side (GUI capture thread) ----------------------------------
+
+    def due(self):
+        return time.monotonic() - self.last_publish >= SNAPSHOT_PUBLISH_INTERVAL
+
+    def publish(self, rgb, width, height, timestamp=None):
+        """Copies an RGB frame (any C-contiguous buffer of width*height*3 bytes)."""
+        data = memoryview(rgb).cast('B')
+        if len(data) != width * height * 3 or len(data) > self.capacity:
+            return False
+        sequence, = struct.unpack_from('<Q', self.buf, 0)
+        struct.pack_into('<Q', self.buf, 0, sequence + 1)
+        try:
+            self.buf[HEADER_SIZE:HEADER_SIZE + len(data)] = data
+            struct.pack_into('<dII', self.buf, 8, time.time() if timestamp is None else timestamp,
+                             width, height)
+        finally:
+            struct.pack_into('<Q', self.buf, 0, sequence + 2)
+        self.last_publish = time.monotonic()
+        return True
+
+    # -- reader side (bot) -------------------------------------------------
+
+    def read(self, retries=100):
+        """Returns the latest Frame, or None if nothing was published yet."""
+        for _ in range(retries):
+            sequence, timestamp, width, height = _HEADER.unpack_from(self.buf, 0)
+            if sequence & 1:
+                time.sleep(0.001)  # a frame copy takes well under a millisecond
+                continue
+            if sequence == 0:
+                return None
+            rgb = bytes(self.buf[HEADER_SIZE:HEADER_SIZE + width * height * 3])
+            if struct.unpack_from('<Q', self.buf, 0)[0] != sequence:
+                continue
+            return Frame(sequence // 2, timestamp, width, height, rgb)
+        raise RuntimeError("Shared frame is being rewritten too often to read")
+
+
+def encode_jpeg(frame, quality=85):
+    # PIL is only needed when someone asks for a snapshot
+    import io
+    from PIL import Image
+
+    image = Image.frombuffer('RGB', (frame.width, frame.height), frame.rgb, 'raw', 'RGB', 0, 1)
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=quality)
+    output.name = 'snapshot.jpg'
+    output.seek(0)
+    return output
@@ -0,0 +1,148 @@
+"""
+Shared-memory status block: current LED flags, in-flight job counts and
+backend health, written by the bot and read by any process.
+
+There is a single writer. It bumps a sequence counter to an odd value
+before changing the block and back to even afterwards (a seqlock). Readers
+never lock: they compare the counter before and after reading and retry if
+it moved or was odd. A reader that only wants to know whether anything
+changed can compare `sequence()` with the last value it saw. The writer
+can also set `notify` to a callable run after every write, e.g. to wake a
+reader that would otherwise only poll on a timer.
+"""
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+LED_NAMES = ('cpu', 'webcam', 'telegram', 'monolith')
+JOB_KINDS = ('queued', 'image', 'music', 'voice', 'speak', 'ask')
+BACKENDS = ('comfyui', 'kobold', 'tts', 'telegram')
+
+BACKEND_UNKNOWN = 0
+BACKEND_UP = 1
+BACKEND_DOWN = 2
+
+_HEADER = struct.Struct('<QI4x')          # sequence, LED bitmask
+_JOBS = struct.Struct('<8H')              # in-flight count per JOB_KINDS entry
+_BACKEND = struct.Struct('<B3xfd')        # state, last latency ms, last update (epoch)
+_JOBS_OFFSET = _HEADER.size
+_BACKENDS_OFFSET = _JOBS_OFFSET + _JOBS.size
+SIZE = _BACKENDS_OFFSET + _BACKEND.size * 8
+
+
+class BackendHealth(NamedTuple):
+    state: int
+    latency_ms: float
+    updated: float
+
+
+class StatusSnapshot(NamedTuple):
+    sequence: int
+    leds: dict
+    jobs: dict
+    backends: dict
+
+
+class StatusBoard:
+    def __init__(self, name=None, create=False):
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=SIZE if create else 0)
+        self.buf = self.shm.buf
+        self.owner = create
+        # Serialises writers inside the bot process; other processes only read
+        self.write_lock = threading.Lock()
+        self.notify = None  # called after each write, see the module docstring
+        if create:
+            self.buf[:SIZE] = bytes(SIZE)
+
+    def __getstate__(self):
+        # Children started with the spawn method attach by name
+        return {'name': self.name}
+
+    def __setstate__(self, state):
+        self.__init__(state['name'])
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    # -- writer side -------------------------------------------------------
+
+    @contextmanager
+    def _write(self):
+        with self.write_lock:
+            sequence, = struct.unpack_from('<Q', self.buf, 0)
+            struct.pack_into('<Q', self.buf, 0, sequence + 1)
+            try:
+                yield
+            finally:
+                struct.pack_into('<Q', self.buf, 0, sequence + 2)
+        if self.notify is not None:
+            self.notify()
+
+    def set_led(self, name, active):
+        bit = 1 << LED_NAMES.index(name)
+        with self._write():
+            _, flags = _HEADER.unpack_from(self.buf, 0)
+            flags = flags | bit if active else flags & ~bit
+            struct.pack_into('<I', self.buf, 8, flags)
+
+    def add_jobs(self, kind, delta):
+        offset = _JOBS_OFFSET + 2 * JOB_KINDS.index(kind)
+        with self._write():
+            count, = struct.unpack_from('<H', self.buf, offset)
+            struct.pack_into('<H', self.buf, offset, max(0, min(0xFFFF, count + delta)))
+
+    def set_jobs(self, kind, count):
+        offset = _JOBS_OFFSET + 2 * JOB_KINDS.index(kind)
+        with self._write():
+            struct.pack_into('<H', self.buf, offset, max(0, min(0xFFFF, count)))
+
+    @contextmanager
+    def job(self, kind):
+        """Counts a job as in flight for the duration of the block."""
+        self.add_jobs(kind, 1)
+        try:
+            yield
+        finally:
+            self.add_jobs(kind, -1)
+
+    def set_backend(self, name, up, latency_ms=0.0):
+        offset = _BACKENDS_OFFSET + _BACKEND.size * BACKENDS.index(name)
+        state = BACKEND_UP if up else BACKEND_DOWN
+        with self._write():
+            _BACKEND.pack_into(self.buf, offset, state, latency_ms, time.time())
+
+    # -- reader side -------------------------------------------------------
+
+    def sequence(self):
+        return struct.unpack_from('<Q', self.buf, 0)[0]
+
+    def snapshot(self, retries=1000):
+        for _ in range(retries):
+            before = self.sequence()
+            if before & 1:
+                time.sleep(0)  # let the writer finish
+                continue
+            _, flags = _HEADER.unpack_from(self.buf, 0)
+            counts = _JOBS.unpack_from(self.buf, _JOBS_OFFSET)
+            health = [_BACKEND.unpack_from(self.buf, _BACKENDS_OFFSET + _BACKEND.size * i)
+                      for i in range(len(BACKENDS))]
+            if self.sequence() != before:
+                time.sleep(0)
+                continue
+            return StatusSnapshot(
+                before,
+                {name: bool(flags & (1 << i)) for i, name in enumerate(LED_NAMES)},
+                dict(zip(JOB_KINDS, counts)),
+                {name: BackendHealth(*values) for name, values in zip(BACKENDS, health)},
+            )
+        raise RuntimeError("Status board is being rewritten too often to read")
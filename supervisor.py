@@ -0,0 +1,184 @@
+import logging
+import multiprocessing
+import os
+import queue
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+HEARTBEAT_INTERVAL = float(os.getenv('HEARTBEAT_INTERVAL', 5))
+HEARTBEAT_TIMEOUT_GUI = float(os.getenv('HEARTBEAT_TIMEOUT_GUI', 30))
+# Backend calls run in worker threads, so a long stall of the bot's event loop means it is stuck
+HEARTBEAT_TIMEOUT_BOT = float(os.getenv('HEARTBEAT_TIMEOUT_BOT', 60))
+RESTART_BACKOFF_BASE = float(os.getenv('RESTART_BACKOFF_BASE', 1))
+RESTART_BACKOFF_MAX = float(os.getenv('RESTART_BACKOFF_MAX', 60))
+# A child that stays up this long has its backoff and failure streak reset
+RESTART_STABLE_AFTER = float(os.getenv('RESTART_STABLE_AFTER', 120))
+MAX_CONSECUTIVE_RESTARTS = int(os.getenv('MAX_CONSECUTIVE_RESTARTS', 5))
+
+
+def send_heartbeat(heartbeat_queue, name):
+    """Called periodically from a child's main loop."""
+    if heartbeat_queue is None:
+        return
+    try:
+        heartbeat_queue.put_nowait((name, os.getpid(), time.time()))
+    except Exception as e:
+        logging.error(f"Error sending heartbeat: {e}")
+
+
+class Child:
+    def __init__(self, name, target, args, heartbeat_timeout, exit_on_clean_exit=False):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.heartbeat_timeout = heartbeat_timeout
+        # A clean exit of this child (e.g. the GUI window closed) stops the whole app
+        self.exit_on_clean_exit = exit_on_clean_exit
+        self.process = None
+        self.started_at = None
+        self.last_heartbeat = None
+        self.down_since = None
+        self.restart_at = None
+        self.backoff = RESTART_BACKOFF_BASE
+        self.restarts = 0
+        self.consecutive_failures = 0
+        self.total_downtime = 0.0
+
+    def start(self):
+        self.process = multiprocessing.Process(target=self.target, args=self.args, name=self.name)
+        self.process.start()
+        now = time.monotonic()
+        self.started_at = now
+        self.last_heartbeat = now
+        if self.down_since is not None:
+            self.total_downtime += now - self.down_since
+        self.down_since = None
+        self.restart_at = None
+
+    def stop(self, timeout=5):
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=timeout)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+
+    def stats(self):
+        downtime = self.total_downtime
+        if self.down_since is not None:
+            downtime += time.monotonic() - self.down_since
+        return {
+            'restarts': self.restarts,
+            'downtime_s': downtime,
+            'pid': self.process.pid if self.process else None,
+            'alive': bool(self.process and self.process.is_alive()),
+        }
+
+
+class Supervisor:
+    """
+    Watches each child process on its own: a child that dies or stops sending
+    heartbeats is restarted alone, with exponential backoff, while the other
+    keeps running.
+    """
+
+    def __init__(self, heartbeat_queue, channel=None):
+        self.heartbeat_queue = heartbeat_queue
+        # ipc_channel.ChannelSender, used to echo supervisor events on the terminal
+        self.channel = channel
+        self.children = {}
+        self.running = False
+
+    def add(self, name, target, args, heartbeat_timeout, exit_on_clean_exit=False):
+        self.children[name] = Child(name, target, args, heartbeat_timeout, exit_on_clean_exit)
+
+    def report(self, message):
+        logging.error(message)
+        if self.channel is not None:
+            self.channel.log(f"{message}\n", logging.ERROR)
+
+    def run(self):
+        self.running = True
+        for child in self.children.values():
+            logging.error(f"Starting {child.name} process")
+            child.start()
+        try:
+            while self.running:
+                self._drain_heartbeats(timeout=1)
+                for child in self.children.values():
+                    self._check(child)
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self.running = False
+        for child in self.children.values():
+            child.stop()
+        for name, stats in self.stats().items():
+            logging.error(f"{name}: {stats['restarts']} restarts, {stats['downtime_s']:.1f}s total downtime")
+
+    def stats(self):
+        return {name: child.stats() for name, child in self.children.items()}
+
+    def _drain_heartbeats(self, timeout):
+        try:
+            message = self.heartbeat_queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            name, pid, _ = message
+            child = self.children.get(name)
+            # Ignore late beats from a process that was already replaced
+            if child is not None and child.process is not None and child.process.pid == pid:
+                child.last_heartbeat = time.monotonic()
+            try:
+                message = self.heartbeat_queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def _check(self, child):
+        now = time.monotonic()
+
+        if child.restart_at is not None:
+            if now >= child.restart_at:
+                downtime = now - child.down_since
+                child.restarts += 1
+                child.start()
+                self.report(f"Supervisor: restarted {child.name} after {downtime:.1f}s down "
+                            f"(restart #{child.restarts}, {child.total_downtime:.1f}s total)")
+            return
+
+        if child.process.is_alive():
+            if now - child.last_heartbeat > child.heartbeat_timeout:
+                self.report(f"Supervisor: {child.name} missed heartbeats for "
+                            f"{now - child.last_heartbeat:.0f}s, killing it")
+                child.stop()
+                self._schedule_restart(child, now)
+            elif now - child.started_at > RESTART_STABLE_AFTER:
+                child.backoff = RESTART_BACKOFF_BASE
+                child.consecutive_failures = 0
+            return
+
+        if child.process.exitcode == 0 and child.exit_on_clean_exit:
+            logging.error(f"{child.name} exited normally, shutting down")
+            self.running = False
+            return
+
+        self.report(f"Supervisor: {child.name} exited with code {child.process.exitcode}")
+        self._schedule_restart(child, now)
+
+    def _schedule_restart(self, child, now):
+        child.down_since = now
+        child.consecutive_failures += 1
+        if child.consecutive_failures > MAX_CONSECUTIVE_RESTARTS:
+            logging.error(f"{child.name} failed {child.consecutive_failures} times in a row. Exiting.")
+            self.running = False
+            return
+        child.restart_at = now + child.backoff
+        logging.error(f"Restarting {child.name} in {child.backoff:.1f}s "
+                      f"(failure {child.consecutive_failures}/{MAX_CONSECUTIVE_RESTARTS})")
+        child.backoff = min(child.backoff * 2, RESTART_BACKOFF_MAX)
@@ -0,0 +1,234 @@
+"""
+Pi health telemetry: a background sampler writes CPU per core, memory, SoC
+temperature, firmware throttling flags and disk / network throughput into
+a fixed-size ring buffer in shared memory, once per TELEMETRY_INTERVAL.
+
+The parent process owns the buffer and runs the sampler. The bot
+summarises it for /status and the GUI draws sparklines from it, so there
+is exactly one sampler no matter how many readers. The buffer uses the
+same single-writer seqlock as status_board, including its `notify` hook,
+so readers can be woken per sample instead of polling.
+"""
+import logging
+import math
+import os
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import psutil
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+TELEMETRY_INTERVAL = float(os.getenv('TELEMETRY_INTERVAL', 1))  # seconds
+TELEMETRY_CAPACITY = int(os.getenv('TELEMETRY_CAPACITY', 3600))  # samples kept
+THERMAL_ZONE = '/sys/class/thermal/thermal_zone0/temp'
+THROTTLED_PATH = '/sys/devices/platform/soc/soc:firmware/get_throttled'
+MAX_CORES = 8
+
+# Firmware get_throttled bits; the same flags shifted by 16 mean "has occurred since boot"
+THROTTLE_FLAGS = {
+    0: 'under-voltage',
+    1: 'frequency capped',
+    2: 'throttled',
+    3: 'soft temperature limit',
+}
+
+_HEADER = struct.Struct('<QQII')  # seqlock counter, samples written, capacity, record size
+_RECORD = struct.Struct(f'<dB3xI{MAX_CORES}f9f')
+HEADER_SIZE = 64
+
+
+class Sample(NamedTuple):
+    time: float
+    cores: tuple           # percent per core
+    cpu: float             # percent, all cores
+    memory: float          # percent used
+    memory_available: float  # MB
+    temperature: float     # degrees C, NaN when unknown
+    disk_read: float       # bytes per second
+    disk_write: float
+    net_rx: float
+    net_tx: float
+    swap: float            # percent used
+    throttled: int         # raw get_throttled bits
+
+
+def read_cpu_temperature(path=THERMAL_ZONE):
+    """SoC temperature in degrees C, or None where the sensor is not exposed."""
+    try:
+        with open(path) as f:
+            return int(f.read()) / 1000
+    except (OSError, ValueError):
+        return None
+
+
+def read_throttled(path=THROTTLED_PATH):
+    try:
+        with open(path) as f:
+            return int(f.read().strip(), 16)
+    except (OSError, ValueError):
+        return 0
+
+
+def describe_throttled(bits):
+    now = [name for bit, name in THROTTLE_FLAGS.items() if bits & (1 << bit)]
+    since_boot = [name for bit, name in THROTTLE_FLAGS.items() if bits & (1 << (bit + 16))]
+    return now, since_boot
+
+
+class TelemetryBuffer:
+    def __init__(self, name=None, create=False, capacity=TELEMETRY_CAPACITY):
+        size = HEADER_SIZE + capacity * _RECORD.size if create else 0
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self.buf = self.shm.buf
+        self.owner = create
+        if create:
+            self.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+            _HEADER.pack_into(self.buf, 0, 0, 0, capacity, _RECORD.size)
+        _, _, self.capacity, _ = _HEADER.unpack_from(self.buf, 0)
+        self.notify = None  # called after each append, see the module docstring
+
+    def __getstate__(self):
+        # Children started with the spawn method attach by name
+        return {'name': self.name}
+
+    def __setstate__(self, state):
+        self.__init__(state['name'])
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def append(self, sample):
+        sequence, written, _, _ = _HEADER.unpack_from(self.buf, 0)
+        struct.pack_into('<Q', self.buf, 0, sequence + 1)
+        try:
+            cores = (tuple(sample.cores) + (math.nan,) * MAX_CORES)[:MAX_CORES]
+            _RECORD.pack_into(
+                self.buf, HEADER_SIZE + (written % self.capacity) * _RECORD.size,
+                sample.time, min(len(sample.cores), MAX_CORES), sample.throttled, *cores,
+                sample.cpu, sample.memory, sample.memory_available, sample.temperature,
+                sample.disk_read, sample.disk_write, sample.net_rx, sample.net_tx, sample.swap,
+            )
+            struct.pack_into('<Q', self.buf, 8, written + 1)
+        finally:
+            struct.pack_into('<Q', self.buf, 0, sequence + 2)
+        if self.notify is not None:
+            self.notify()
+
+    def written(self):
+        """Total samples ever appended; changes whenever a new sample lands."""
+        return struct.unpack_from('<Q', self.buf, 8)[0]
+
+    def samples(self, seconds=None, count=None, retries=100):
+        """
+        Newest samples, oldest first: those from the last `seconds`, at most
+        `count`, or everything kept. Walks back from the newest record, so
+        short windows do not copy the whole buffer.
+        """
+        for _ in range(retries):
+            sequence, written, _, _ = _HEADER.unpack_from(self.buf, 0)
+            if sequence & 1:
+                time.sleep(0.001)
+                continue
+            limit = min(written, self.capacity, count if count is not None else self.capacity)
+            result = []
+            cutoff = None
+            for index in range(written - 1, written - 1 - limit, -1):
+                values = _RECORD.unpack_from(self.buf, HEADER_SIZE + (index % self.capacity) * _RECORD.size)
+                when, cores, throttled = values[:3]
+                if seconds is not None:
+                    cutoff = when - seconds if cutoff is None else cutoff
+                    if when < cutoff:
+                        break
+                result.append(Sample(when, values[3:3 + cores], *values[3 + MAX_CORES:], throttled))
+            if struct.unpack_from('<Q', self.buf, 0)[0] == sequence:
+                result.reverse()
+                return result
+        raise RuntimeError("Telemetry buffer is being rewritten too often to read")
+
+    def latest(self):
+        samples = self.samples(count=1)
+        return samples[-1] if samples else None
+
+
+class TelemetrySampler:
+    """Samples into a TelemetryBuffer from a daemon thread."""
+
+    def __init__(self, buffer, interval=TELEMETRY_INTERVAL):
+        self.buffer = buffer
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.previous = None
+
+    def start(self):
+        psutil.cpu_percent(percpu=True)  # prime the counters
+        self.previous = self._counters()
+        self.thread = threading.Thread(target=self._run, name='telemetry', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _counters(self):
+        disk = psutil.disk_io_counters()
+        net = psutil.net_io_counters()
+        return (time.monotonic(),
+                disk.read_bytes if disk else 0, disk.write_bytes if disk else 0,
+                net.bytes_recv, net.bytes_sent)
+
+    def sample(self):
+        cores = psutil.cpu_percent(percpu=True)
+        memory = psutil.virtual_memory()
+        counters = self._counters()
+        elapsed = max(counters[0] - self.previous[0], 1e-6)
+        rates = [max(0, new - old) / elapsed for new, old in zip(counters[1:], self.previous[1:])]
+        self.previous = counters
+        temperature = read_cpu_temperature()
+        return Sample(
+            time.time(), tuple(cores), sum(cores) / len(cores) if cores else 0.0,
+            memory.percent, memory.available / 2**20,
+            math.nan if temperature is None else temperature,
+            *rates, psutil.swap_memory().percent, read_throttled(),
+        )
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.buffer.append(self.sample())
+            except Exception as e:
+                logging.error(f"Telemetry sample failed: {e}")
+
+
+def summarize(samples, field):
+    """(min, avg, max) of a Sample field, ignoring unknown (NaN) values."""
+    values = [value for value in (getattr(sample, field) for sample in samples) if not math.isnan(value)]
+    if not values:
+        return None
+    return min(values), sum(values) / len(values), max(values)
+
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def sparkline(values, low=None, high=None):
+    values = [value for value in values if not math.isnan(value)]
+    if not values:
+        return ""
+    low = min(values) if low is None else low
+    high = max(values) if high is None else high
+    span = (high - low) or 1
+    top = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[max(0, min(top, round((value - low) / span * top)))] for value in values)
@@ -0,0 +1,186 @@
+"""Policies, model affinity and learning of the GPU scheduler."""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip('dotenv')
+
+import gpu_scheduler
+from gpu_scheduler import GpuScheduler, Waiter
+
+FLUX = frozenset({'flux.gguf', 'ae.safetensors'})
+AUDIO = frozenset({'stable_audio.safetensors'})
+
+
+def waiter(scheduler, models=FLUX, kind='image', estimate=10.0, user=None, waited=0.0, cost=('job', 1.0)):
+    added = Waiter(models, kind, None, cost, estimate, user)
+    added.queued = time.monotonic() - waited
+    scheduler.waiting.append(added)
+    return added
+
+
+def image_workflow(width=1024, height=1024, steps=20, batch=1):
+    return {
+        '1': {'class_type': 'UnetLoaderGGUF', 'inputs': {'unet_name': 'flux.gguf'}},
+        '2': {'class_type': 'EmptySD3LatentImage',
+              'inputs': {'width': width, 'height': height, 'batch_size': batch}},
+        '3': {'class_type': 'KSampler', 'inputs': {'steps': steps, 'seed': 1}},
+    }
+
+
+def test_workflow_models_are_the_weights_files():
+    assert gpu_scheduler.workflow_models(image_workflow()) == frozenset({'flux.gguf'})
+    speech = {'1': {'class_type': 'IF_WhisperSpeech', 'inputs': {'text': 'hi'}}}
+    assert gpu_scheduler.workflow_models(speech) == frozenset({'node:IF_WhisperSpeech'})
+
+
+def test_workflow_cost_units():
+    assert gpu_scheduler.workflow_cost(image_workflow(1000, 1000, 20, 2)) == ('megapixel_steps', 40.0)
+    audio = {'1': {'class_type': 'EmptyLatentAudio', 'inputs': {'seconds': 30}},
+             '2': {'class_type': 'KSampler', 'inputs': {'steps': 100}}}
+    assert gpu_scheduler.workflow_cost(audio) == ('audio_second_steps', 3000.0)
+    speech = {'1': {'class_type': 'IF_WhisperSpeech', 'inputs': {'text': 'hello'}}}
+    assert gpu_scheduler.workflow_cost(speech) == ('characters', 5.0)
+    assert gpu_scheduler.workflow_cost({}) == ('job', 1.0)
+
+
+def test_unknown_policy_falls_back_to_fifo():
+    assert GpuScheduler(policy='lottery').policy == 'fifo'
+
+
+def test_fifo_runs_in_arrival_order():
+    scheduler = GpuScheduler(policy='fifo')
+    first = waiter(scheduler, estimate=100.0)
+    waiter(scheduler, estimate=1.0)
+    assert scheduler.pick(time.monotonic()) is first
+
+
+def test_sjf_runs_the_shortest_job_first():
+    scheduler = GpuScheduler(policy='sjf', aging=1.0)
+    waiter(scheduler, estimate=100.0)
+    short = waiter(scheduler, estimate=5.0)
+    assert scheduler.pick(time.monotonic()) is short
+
+
+def test_sjf_aging_lets_long_jobs_through():
+    scheduler = GpuScheduler(policy='sjf', aging=1.0)
+    long = waiter(scheduler, estimate=100.0, waited=200.0)
+    waiter(scheduler, estimate=5.0)
+    assert scheduler.pick(time.monotonic()) is long
+
+
+def test_fair_share_prefers_the_lighter_user():
+    scheduler = GpuScheduler(policy='fair', half_life=600)
+    now = time.monotonic()
+    scheduler.usage['heavy'] = (500.0, now)
+    waiter(scheduler, user='heavy', estimate=5.0)
+    light = waiter(scheduler, user='light', estimate=50.0)
+    assert scheduler.pick(now) is light
+
+
+def test_fair_share_usage_decays():
+    scheduler = GpuScheduler(policy='fair', half_life=10)
+    now = time.monotonic()
+    scheduler.usage['user'] = (100.0, now - 20)
+    assert scheduler.used('user', now) == pytest.approx(25.0)
+
+
+def test_warm_job_overtakes_a_swap():
+    scheduler = GpuScheduler(policy='fifo', swap_seconds=20)
+    scheduler.loaded = FLUX
+    cold = waiter(scheduler, models=AUDIO)
+    warm = waiter(scheduler, models=FLUX)
+    assert scheduler.pick(time.monotonic()) is warm
+    assert cold.bypassed == 1
+    assert scheduler.stats['avoided_swaps'] == 1
+    assert scheduler.stats['seconds_saved'] == 20
+
+
+def test_affinity_stops_after_max_bypass():
+    scheduler = GpuScheduler(policy='fifo', max_bypass=2)
+    scheduler.loaded = FLUX
+    cold = waiter(scheduler, models=AUDIO)
+    cold.bypassed = 2
+    waiter(scheduler, models=FLUX)
+    assert scheduler.pick(time.monotonic()) is cold
+    assert scheduler.stats['forced'] == 1
+
+
+def test_affinity_stops_after_max_wait():
+    scheduler = GpuScheduler(policy='fifo', max_wait=30)
+    scheduler.loaded = FLUX
+    cold = waiter(scheduler, models=AUDIO, waited=31)
+    waiter(scheduler, models=FLUX)
+    assert scheduler.pick(time.monotonic()) is cold
+
+
+def test_learns_only_from_successful_user_jobs():
+    scheduler = GpuScheduler()
+    failed = Waiter(FLUX, 'image', None, ('megapixel_steps', 10.0), 40.0, None)
+    scheduler.record(failed, 5.0)
+    pregen = Waiter(FLUX, 'pregen', None, ('megapixel_steps', 10.0), 40.0, None)
+    pregen.succeeded = True
+    scheduler.record(pregen, 5.0)
+    assert scheduler.durations == {}
+    assert scheduler.rates == {}
+    assert scheduler.stats['jobs'] == 2
+
+
+def test_swap_cost_and_rate_come_from_cold_and_warm_runs():
+    scheduler = GpuScheduler(swap_seconds=20)
+    assert scheduler.swap_cost(FLUX) == 20
+    cold = Waiter(FLUX, 'image', None, ('megapixel_steps', 10.0), 40.0, None)
+    cold.cold = cold.succeeded = True
+    scheduler.record(cold, 50.0)
+    warm = Waiter(FLUX, 'image', None, ('megapixel_steps', 10.0), 40.0, None)
+    warm.succeeded = True
+    scheduler.record(warm, 30.0)
+    assert scheduler.swap_cost(FLUX) == 20.0
+    # Only the warm run sets the rate, so estimates leave out load time
+    assert scheduler.rates[FLUX] == 3.0
+    assert scheduler.estimate(FLUX, ('megapixel_steps', 2.0)) == 6.0
+
+
+def test_background_jobs_are_not_queue_depth():
+    scheduler = GpuScheduler()
+    waiter(scheduler, kind='pregen', estimate=30.0)
+    waiter(scheduler, kind='warmup', estimate=30.0)
+    user = waiter(scheduler, kind='image', estimate=10.0)
+    assert scheduler.user_waiting() == [user]
+    metrics = scheduler.metrics()
+    assert metrics['waiting'] == 1
+    assert metrics['background_waiting'] == 2
+    assert metrics['queued_seconds'] == 10.0
+
+
+def test_slot_serialises_jobs_and_skips_cancelled_waiters():
+    async def main():
+        scheduler = GpuScheduler(policy='fifo')
+        order = []
+
+        async def job(name, hold=None):
+            async with scheduler.slot(FLUX, kind='image') as holder:
+                order.append(name)
+                holder.succeeded = True
+                if hold is not None:
+                    await hold
+
+        gate = asyncio.get_running_loop().create_future()
+        first = asyncio.create_task(job('first', gate))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(job('cancelled'))
+        last = asyncio.create_task(job('last'))
+        await asyncio.sleep(0)
+        assert order == ['first']
+        assert len(scheduler.waiting) == 2
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        assert len(scheduler.waiting) == 1
+        gate.set_result(None)
+        await asyncio.gather(first, last)
+        assert order == ['first', 'last']
+        assert not scheduler.busy
+        assert scheduler.stats['jobs'] == 2
+
+    asyncio.run(main())
@@ -0,0 +1,181 @@
+"""Encoding, framing and back-pressure of the typed IPC channel."""
+import logging
+import multiprocessing
+import os
+
+import pytest
+
+import ipc_channel
+from ipc_channel import JobProgress, LogRecord, Metrics, Profile, StatusChanged
+
+
+@pytest.fixture
+def pipe():
+    reader, writer = multiprocessing.Pipe(duplex=False)
+    yield reader, writer
+    reader.close()
+    writer.close()
+
+
+def quiet_sender(writer, **kwargs):
+    # A flush interval no test waits out, so only explicit flush() calls write
+    return ipc_channel.ChannelSender(writer, flush_interval=3600, **kwargs)
+
+
+def test_every_event_type_round_trips():
+    events = [
+        LogRecord("héllo", logging.WARNING),
+        JobProgress("job-1", "sampling", 3, 20),
+        Metrics("bot", {'queue': 2, 'latency': 0.5}),
+        StatusChanged(),
+        Profile(30),
+    ]
+    frames = ipc_channel.encode_frames(events)
+    assert len(frames) == 1
+    frame, covered = frames[0]
+    assert covered == len(events)
+    assert ipc_channel.decode_batch(frame) == events
+
+
+def test_frames_split_below_pipe_buf():
+    events = [LogRecord("x" * 500) for _ in range(50)]
+    frames = ipc_channel.encode_frames(events)
+    assert len(frames) > 1
+    assert all(len(frame) <= ipc_channel.MAX_FRAME for frame, _ in frames)
+    assert sum(covered for _, covered in frames) == len(events)
+    assert [event for frame, _ in frames for event in ipc_channel.decode_batch(frame)] == events
+
+
+def test_long_log_line_is_truncated_to_fit_one_frame():
+    [(frame, covered)] = ipc_channel.encode_frames([LogRecord("é" * ipc_channel.MAX_FRAME)])
+    assert len(frame) <= ipc_channel.MAX_FRAME
+    [event] = ipc_channel.decode_batch(frame)
+    assert event.text.endswith("...")
+
+
+def test_unencodable_event_is_dropped_but_covered():
+    [(frame, covered)] = ipc_channel.encode_frames([LogRecord("a"), Profile(-1), LogRecord("b")])
+    assert covered == 3
+    assert ipc_channel.decode_batch(frame) == [LogRecord("a"), LogRecord("b")]
+
+
+def test_bad_event_costs_only_itself():
+    # A Profile with a one byte payload and an unknown type between two good events
+    parts = []
+    for type_id, payload in ((LogRecord.type_id, LogRecord("a").encode()), (Profile.type_id, b'\x00'),
+                             (99, b'?'), (LogRecord.type_id, LogRecord("b").encode())):
+        parts += [ipc_channel._EVENT_HEADER.pack(type_id, len(payload)), payload]
+    assert ipc_channel.decode_batch(ipc_channel._frame(parts)) == [LogRecord("a"), LogRecord("b")]
+
+
+def test_overrunning_event_rejects_the_frame():
+    [(frame, _)] = ipc_channel.encode_frames([LogRecord("abc")])
+    with pytest.raises(ValueError):
+        ipc_channel.decode_batch(frame[:-1])
+
+
+def test_sender_to_receiver(pipe):
+    reader, writer = pipe
+    sender = quiet_sender(writer)
+    receiver = ipc_channel.ChannelReceiver(reader)
+    for i in range(100):
+        sender.log(f"line {i}")
+    sender.progress("job", "done", 1, 1)
+    assert sender.flush()
+    events = receiver.poll()
+    assert [event.text for event in events[:-1]] == [f"line {i}" for i in range(100)]
+    assert events[-1] == JobProgress("job", "done", 1, 1)
+    assert receiver.poll() == []
+    assert not receiver.closed
+
+
+def test_poll_budget_leaves_frames_in_the_pipe(pipe):
+    reader, writer = pipe
+    sender = quiet_sender(writer)
+    receiver = ipc_channel.ChannelReceiver(reader)
+    for _ in range(20):
+        sender.log("x" * 1000)
+    sender.flush()
+    first = receiver.poll(max_frames=1)
+    assert 0 < len(first) < 20
+    assert len(first) + len(receiver.poll()) == 20
+
+
+def test_status_changed_is_coalesced(pipe):
+    reader, writer = pipe
+    sender = quiet_sender(writer)
+    receiver = ipc_channel.ChannelReceiver(reader)
+    sender.status_changed()
+    sender.log("between")
+    sender.status_changed()
+    sender.status_changed()
+    sender.flush()
+    assert receiver.poll() == [StatusChanged(), LogRecord("between")]
+    sender.status_changed()
+    sender.flush()
+    assert receiver.poll() == [StatusChanged()]
+
+
+def test_pending_cap_drops_oldest_log_lines_first(pipe):
+    _, writer = pipe
+    sender = quiet_sender(writer, max_pending=3)
+    sender.log("old")
+    sender.metrics("bot", {})
+    sender.log("newer")
+    sender.log("newest")
+    assert sender.pending == [Metrics("bot", {}), LogRecord("newer"), LogRecord("newest")]
+    assert sender.dropped == 1
+
+
+def test_full_pipe_keeps_events_pending(pipe):
+    reader, writer = pipe
+    sender = quiet_sender(writer)
+    receiver = ipc_channel.ChannelReceiver(reader)
+    with pytest.raises(BlockingIOError):
+        while True:
+            os.write(writer.fileno(), b'\0' * 4096)
+    sender.log("waiting")
+    assert not sender.flush()
+    assert sender.pending == [LogRecord("waiting")]
+    # Once the reader makes room the event goes through
+    with pytest.raises(BlockingIOError):
+        while True:
+            os.read(reader.fileno(), 65536)
+    assert sender.flush()
+    assert receiver.poll() == [LogRecord("waiting")]
+
+
+def test_corrupt_frame_does_not_desync_the_stream(pipe):
+    reader, writer = pipe
+    receiver = ipc_channel.ChannelReceiver(reader)
+    garbage = b'\xff' * 16
+    [(good, _)] = ipc_channel.encode_frames([LogRecord("after")])
+    os.write(writer.fileno(), ipc_channel._LENGTH.pack(len(garbage)) + garbage
+             + ipc_channel._LENGTH.pack(len(good)) + good)
+    assert receiver.poll() == [LogRecord("after")]
+
+
+def test_impossible_frame_length_is_discarded(pipe):
+    reader, writer = pipe
+    receiver = ipc_channel.ChannelReceiver(reader)
+    os.write(writer.fileno(), ipc_channel._LENGTH.pack(ipc_channel.MAX_FRAME + 1) + b'junk')
+    assert receiver.poll() == []
+    [(good, _)] = ipc_channel.encode_frames([LogRecord("next")])
+    os.write(writer.fileno(), ipc_channel._LENGTH.pack(len(good)) + good)
+    assert receiver.poll() == [LogRecord("next")]
+
+
+def test_receiver_notices_closed_sender(pipe):
+    reader, writer = pipe
+    receiver = ipc_channel.ChannelReceiver(reader)
+    writer.close()
+    assert receiver.poll() == []
+    assert receiver.closed
+
+
+def test_null_sender_discards_everything():
+    sender = ipc_channel.NullSender()
+    sender.log("nobody listens")
+    sender.status_changed()
+    assert sender.pending == []
+    assert sender.thread is None
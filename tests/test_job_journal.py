@@ -0,0 +1,74 @@
+"""States, recovery and pruning of the job journal."""
+import pytest
+
+pytest.importorskip('dotenv')
+
+import job_journal
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'jobs.db')
+
+
+def test_job_lifecycle(path):
+    journal = job_journal.JobJournal(path)
+    job_id = journal.add({'command': '/image', 'chat_id': 1, 'message_id': 2})
+    [job] = journal.pending()
+    assert (job.job_id, job.state, job.prompt_id) == (job_id, 'queued', None)
+    assert job.params == {'command': '/image', 'chat_id': 1, 'message_id': 2}
+    journal.submitted(job_id, 'prompt-1')
+    [job] = journal.pending()
+    assert (job.state, job.prompt_id) == ('submitted', 'prompt-1')
+    assert job.params['command'] == '/image'
+    journal.finish(job_id)
+    assert journal.pending() == []
+    journal.close()
+
+
+def test_failed_jobs_are_not_pending(path):
+    journal = job_journal.JobJournal(path)
+    job_id = journal.add({})
+    journal.finish(job_id, RuntimeError("upload failed"))
+    assert journal.pending() == []
+    journal.close()
+
+
+def test_pending_jobs_survive_a_restart_oldest_first(path):
+    journal = job_journal.JobJournal(path)
+    first = journal.add({'n': 1})
+    second = journal.add({'n': 2})
+    journal.submitted(first, 'prompt-1')
+    finished = journal.add({'n': 3})
+    journal.finish(finished)
+    # Left open, as a killed process would
+    reopened = job_journal.JobJournal(path)
+    assert [(job.job_id, job.state) for job in reopened.pending()] == [(first, 'submitted'), (second, 'queued')]
+    reopened.close()
+    journal.close()
+
+
+def test_unreadable_entry_is_failed_not_replayed(path):
+    journal = job_journal.JobJournal(path)
+    broken = journal.add({'n': 1})
+    journal.append(broken, 'submitted', {'no prompt id': True})
+    good = journal.add({'n': 2})
+    assert [job.job_id for job in journal.pending()] == [good]
+    assert [job.job_id for job in journal.pending()] == [good]
+    state, = journal.db.execute('SELECT state FROM journal WHERE job_id = ? ORDER BY seq DESC LIMIT 1',
+                                (broken,)).fetchone()
+    assert state == 'failed'
+    journal.close()
+
+
+def test_prune_drops_only_old_finished_jobs(path):
+    journal = job_journal.JobJournal(path)
+    finished = journal.add({})
+    journal.finish(finished)
+    waiting = journal.add({})
+    journal.db.execute('UPDATE journal SET time = time - 86400 * 2')
+    journal.prune(keep_days=1)
+    rows = {job_id for job_id, in journal.db.execute('SELECT job_id FROM journal')}
+    assert rows == {waiting}
+    assert [job.job_id for job in journal.pending()] == [waiting]
+    journal.close()
@@ -0,0 +1,28 @@
+"""Smoke run of benchmark.loadgen against the fake backends."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for module in ('telethon', 'requests', 'websocket', 'dotenv', 'PIL', 'numpy'):
+    pytest.importorskip(module)
+
+
+def test_loadgen_requests_succeed(tmp_path):
+    report_path = tmp_path / 'report.json'
+    # image and ask only: music and speak need ffmpeg for the MP3 conversion
+    run = subprocess.run([sys.executable, '-m', 'benchmark.loadgen', '--rate', '4', '--duration', '2',
+                          '--timeout', '60', '--mix', 'image=1,ask=1', '--seed', '1',
+                          '--comfy-latency', '0.1', '--kobold-latency', '0.05', '--json', str(report_path)],
+                         cwd=ROOT, env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+                         capture_output=True, text=True, timeout=120)
+    assert run.returncode == 0, run.stderr
+    report = json.loads(report_path.read_text())['results']['all']
+    assert report['requests'] > 0
+    assert report['ok'] == report['requests']
+    # The status board's /dev/shm segment is unlinked on the way out
+    assert 'leaked shared_memory' not in run.stderr
@@ -0,0 +1,80 @@
+"""Ring wrap, record splitting and search of the disk scrollback."""
+import logging
+
+import pytest
+
+pytest.importorskip('dotenv')
+
+import scrollback
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'scrollback.bin')
+
+
+def test_append_and_read(path):
+    store = scrollback.ScrollbackStore(path, capacity=8)
+    store.append("first", logging.WARNING, when=1.0)
+    store.append("second")
+    lines = store.read(0, 10)
+    assert [line.text for line in lines] == ["first", "second"]
+    assert lines[0] == scrollback.LogLine(0, 1.0, logging.WARNING, "first")
+    store.close()
+
+
+def test_ring_keeps_the_newest_capacity_records(path):
+    store = scrollback.ScrollbackStore(path, capacity=4)
+    for i in range(10):
+        store.append(f"line {i}")
+    assert store.next_sequence == 10
+    assert store.first_sequence == 6
+    assert store.get(5) is None
+    assert [line.text for line in store.read(0, 100)] == [f"line {i}" for i in range(6, 10)]
+    assert [line.sequence for line in store.read(7, 2)] == [7, 8]
+    store.close()
+
+
+def test_long_lines_span_records(path):
+    store = scrollback.ScrollbackStore(path, capacity=8, record_size=64)
+    text = "0123456789" * 10
+    store.append(text)
+    lines = store.read(0, 8)
+    assert len(lines) > 1
+    assert "".join(line.text for line in lines) == text
+    store.close()
+
+
+def test_history_survives_reopening(path):
+    store = scrollback.ScrollbackStore(path, capacity=4)
+    for i in range(6):
+        store.append(f"line {i}")
+    store.close()
+    store = scrollback.ScrollbackStore(path, capacity=4)
+    assert store.next_sequence == 6
+    assert [line.text for line in store.read(0, 10)] == ["line 2", "line 3", "line 4", "line 5"]
+    store.close()
+
+
+def test_changed_layout_starts_empty(path):
+    store = scrollback.ScrollbackStore(path, capacity=4)
+    store.append("old layout")
+    store.close()
+    store = scrollback.ScrollbackStore(path, capacity=8)
+    assert store.next_sequence == 0
+    assert store.read(0, 10) == []
+    store.close()
+
+
+def test_search_scans_backwards_in_chunks(path):
+    store = scrollback.ScrollbackStore(path, capacity=16)
+    for i in range(12):
+        store.append("needle" if i in (2, 9) else f"hay {i}")
+    line, resume = store.search("NEEDLE")
+    assert (line.sequence, resume) == (9, 9)
+    line, resume = store.search("needle", before=resume)
+    assert (line.sequence, resume) == (2, 2)
+    assert store.search("needle", before=2) == (None, None)
+    # A bounded scan that finds nothing says where to carry on
+    assert store.search("needle", before=8, max_records=3) == (None, 5)
+    store.close()
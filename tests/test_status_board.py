@@ -0,0 +1,111 @@
+"""Seqlock round trips through the shared-memory status board."""
+import pickle
+import threading
+
+import pytest
+
+import status_board
+
+
+@pytest.fixture
+def board():
+    board = status_board.StatusBoard(create=True)
+    yield board
+    board.close()
+
+
+def test_new_board_is_empty(board):
+    snapshot = board.snapshot()
+    assert snapshot.sequence == 0
+    assert not any(snapshot.leds.values())
+    assert not any(snapshot.jobs.values())
+    assert all(health.state == status_board.BACKEND_UNKNOWN for health in snapshot.backends.values())
+
+
+def test_writes_round_trip(board):
+    board.set_led('telegram', True)
+    board.set_led('monolith', True)
+    board.set_led('monolith', False)
+    board.add_jobs('image', 2)
+    board.set_jobs('queued', 5)
+    board.set_backend('kobold', True, 12.5)
+    board.set_backend('comfyui', False)
+    snapshot = board.snapshot()
+    assert snapshot.leds == {'cpu': False, 'webcam': False, 'telegram': True, 'monolith': False}
+    assert snapshot.jobs['image'] == 2
+    assert snapshot.jobs['queued'] == 5
+    assert snapshot.backends['kobold'].state == status_board.BACKEND_UP
+    assert snapshot.backends['kobold'].latency_ms == 12.5
+    assert snapshot.backends['comfyui'].state == status_board.BACKEND_DOWN
+
+
+def test_every_write_moves_the_sequence_by_two(board):
+    board.set_led('cpu', True)
+    board.add_jobs('ask', 1)
+    assert board.sequence() == 4
+    assert board.snapshot().sequence == 4
+
+
+def test_job_counts_clamp(board):
+    board.add_jobs('voice', -3)
+    assert board.snapshot().jobs['voice'] == 0
+    board.set_jobs('voice', 1 << 20)
+    assert board.snapshot().jobs['voice'] == 0xFFFF
+
+
+def test_job_context_counts_while_inside(board):
+    with board.job('music'):
+        assert board.snapshot().jobs['music'] == 1
+    assert board.snapshot().jobs['music'] == 0
+
+
+def test_notify_runs_after_each_write(board):
+    seen = []
+    board.notify = lambda: seen.append(board.sequence())
+    board.set_led('webcam', True)
+    board.add_jobs('speak', 1)
+    # Called once the write has finished, so readers woken by it see even counters
+    assert seen == [2, 4]
+
+
+def test_reader_waits_out_a_write_in_progress(board):
+    # An odd counter means a write is in progress
+    board.buf[0] = 1
+    with pytest.raises(RuntimeError):
+        board.snapshot(retries=3)
+    board.buf[0] = 2
+    assert board.snapshot(retries=3).sequence == 2
+
+
+def test_concurrent_reader_sees_consistent_snapshots(board):
+    stop = threading.Event()
+
+    def write():
+        count = 0
+        while not stop.is_set():
+            count += 1
+            # Both counts change in one write; a torn read would see them differ
+            with board._write():
+                for kind in ('image', 'music'):
+                    offset = status_board._JOBS_OFFSET + 2 * status_board.JOB_KINDS.index(kind)
+                    board.buf[offset:offset + 2] = (count & 0xFFFF).to_bytes(2, 'little')
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(2000):
+            jobs = board.snapshot().jobs
+            assert jobs['image'] == jobs['music']
+    finally:
+        stop.set()
+        writer.join()
+
+
+def test_attach_by_name(board):
+    board.set_led('cpu', True)
+    reader = pickle.loads(pickle.dumps(board))
+    try:
+        assert reader.snapshot().leds['cpu']
+        assert not reader.owner
+    finally:
+        reader.close()
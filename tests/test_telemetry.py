@@ -0,0 +1,87 @@
+"""Ring buffer reads and summaries of Pi telemetry."""
+import math
+
+import pytest
+
+pytest.importorskip('dotenv')
+pytest.importorskip('psutil')
+
+import telemetry
+
+
+def make_sample(when, cpu=10.0, temperature=50.0, cores=(10.0, 10.0)):
+    return telemetry.Sample(when, cores, cpu, 40.0, 1024.0, temperature,
+                            0.0, 0.0, 100.0, 50.0, 0.0, 0)
+
+
+@pytest.fixture
+def buffer():
+    buffer = telemetry.TelemetryBuffer(create=True, capacity=5)
+    yield buffer
+    buffer.close()
+
+
+def test_empty_buffer(buffer):
+    assert buffer.written() == 0
+    assert buffer.samples() == []
+    assert buffer.latest() is None
+
+
+def test_sample_round_trips(buffer):
+    sample = make_sample(100.0, cpu=37.5, temperature=61.25, cores=(30.0, 45.0))
+    buffer.append(sample)
+    assert buffer.latest() == sample
+
+
+def test_unknown_temperature_is_nan(buffer):
+    buffer.append(make_sample(1.0, temperature=math.nan))
+    assert math.isnan(buffer.latest().temperature)
+
+
+def test_ring_wraps_keeping_the_newest(buffer):
+    for when in range(8):
+        buffer.append(make_sample(float(when)))
+    assert buffer.written() == 8
+    assert [sample.time for sample in buffer.samples()] == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert [sample.time for sample in buffer.samples(count=2)] == [6.0, 7.0]
+    assert [sample.time for sample in buffer.samples(seconds=1.5)] == [6.0, 7.0]
+
+
+def test_extra_cores_are_cut_to_max_cores(buffer):
+    buffer.append(make_sample(1.0, cores=tuple(range(telemetry.MAX_CORES + 4))))
+    assert len(buffer.latest().cores) == telemetry.MAX_CORES
+
+
+def test_notify_runs_after_each_append(buffer):
+    seen = []
+    buffer.notify = lambda: seen.append(buffer.written())
+    buffer.append(make_sample(1.0))
+    buffer.append(make_sample(2.0))
+    assert seen == [1, 2]
+
+
+def test_reader_refuses_a_write_in_progress(buffer):
+    buffer.append(make_sample(1.0))
+    buffer.buf[0] += 1
+    with pytest.raises(RuntimeError):
+        buffer.samples(retries=2)
+    buffer.buf[0] += 1
+    assert len(buffer.samples(retries=2)) == 1
+
+
+def test_summarize_ignores_unknown_values():
+    samples = [make_sample(1.0, temperature=40.0), make_sample(2.0, temperature=math.nan),
+               make_sample(3.0, temperature=60.0)]
+    assert telemetry.summarize(samples, 'temperature') == (40.0, 50.0, 60.0)
+    assert telemetry.summarize(samples[1:2], 'temperature') is None
+
+
+def test_sparkline_spans_the_range():
+    assert telemetry.sparkline([0, 50, 100]) == "▁▅█"
+    assert telemetry.sparkline([math.nan]) == ""
+
+
+def test_throttle_flags():
+    now, since_boot = telemetry.describe_throttled(0b101 | (1 << 18))
+    assert now == ['under-voltage', 'throttled']
+    assert since_boot == ['throttled']
@@ -0,0 +1,73 @@
+"""Frame buffers, decoding and the quality governor of the webcam preview."""
+import pytest
+
+pytest.importorskip('dotenv')
+pytest.importorskip('PIL')
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+
+import shared_frame
+import video_stream
+
+
+def solid_bgr(width, height, bgr):
+    frame = np.empty((height, width, 3), np.uint8)
+    frame[:] = bgr
+    return frame
+
+
+def test_images_are_views_of_the_buffers():
+    frames = video_stream.FrameBuffers(8, 6)
+    frames.back_buffer()[:] = (1, 2, 3, 255)
+    frames.publish()
+    image = frames.acquire()
+    # Pasting must see what the decoder wrote, without a copy in between
+    assert image.getpixel((0, 0)) == (1, 2, 3, 255)
+    frames.arrays[frames.front][:] = (4, 5, 6, 255)
+    assert image.getpixel((7, 5)) == (4, 5, 6, 255)
+
+
+def test_unshown_frames_count_as_dropped():
+    frames = video_stream.FrameBuffers(4, 4)
+    assert not frames.publish()
+    assert frames.publish()
+    assert frames.acquire() is not None
+    assert frames.acquire() is None
+
+
+def test_decoded_frame_reaches_preview_and_snapshot():
+    snapshot = shared_frame.SharedFrame(create=True)
+    try:
+        stream = video_stream.VideoStream('0', 8, 6, shared_frame=snapshot,
+                                          pool=video_stream.DecoderPool(workers=0))
+        stream.frames = video_stream.FrameBuffers(8, 6)
+        stream.decode(('bgr', solid_bgr(16, 12, (10, 20, 30))))
+        assert stream.get_frame().getpixel((3, 3)) == (30, 20, 10, 255)
+        frame = snapshot.read()
+        assert (frame.width, frame.height) == (8, 6)
+        assert frame.rgb == bytes((30, 20, 10)) * 8 * 6
+    finally:
+        snapshot.close()
+
+
+def test_jpeg_decodes_at_a_reduced_scale():
+    decoder = video_stream.FrameDecoder(16, 12)
+    _, jpeg = cv2.imencode('.jpg', solid_bgr(128, 96, (200, 100, 50)))
+    out = np.empty((12, 16, 4), np.uint8)
+    assert decoder.decode_jpeg(jpeg.tobytes(), out)
+    assert decoder.flag == cv2.IMREAD_REDUCED_COLOR_8
+    assert np.allclose(out[6, 8], (50, 100, 200, 255), atol=4)
+    assert decoder.to_rgb(out).shape == (12, 16, 3)
+
+
+def test_governor_backs_off_and_recovers():
+    governor = video_stream.VideoGovernor(levels=[(15, 1), (6, 2)], cpu_high=80, cpu_low=50,
+                                          temp_high=75, temp_low=65, raise_after=2)
+    assert governor.update(90)
+    assert (governor.max_fps, governor.divisor) == (6, 2)
+    assert not governor.update(95)  # already at the lowest level
+    assert not governor.update(20, 70)  # cool CPU but a warm SoC is not calm
+    assert not governor.update(20, 60)
+    assert governor.update(20, 60)
+    assert governor.level == 0
+    assert governor.update(20, 80)  # hot SoC alone backs off
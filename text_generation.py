@@ -1,5 +1,7 @@
 import requests, json,logging,os
 
+import tracing
+
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -18,7 +20,8 @@ def split_into_messages(text):
 
 def process_message(prompt):
     try:
-        response = requests.post(f"{MONOLITH_ENDPOINT}/api/v1/generate", json=prompt)
+        with tracing.span('kobold.generate'):
+            response = requests.post(f"{MONOLITH_ENDPOINT}/api/v1/generate", json=prompt)
         if response.status_code == 200:
             try:
                 results = response.json().get('results', [])
@@ -0,0 +1,135 @@
+"""
+Offline analyzer for the JSONL span file written by tracing.py.
+
+    python trace_report.py                      # reads TRACE_FILE and its rotations
+    python trace_report.py trace.jsonl.1 trace.jsonl
+"""
+import argparse
+import json
+import math
+import os
+from collections import defaultdict
+
+import tracing
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def load_spans(paths):
+    spans = []
+    for path in paths:
+        with open(path, 'r') as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    spans.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return spans
+
+
+def summarize(durations):
+    durations = sorted(durations)
+    return {
+        'count': len(durations),
+        'p50': percentile(durations, 50),
+        'p95': percentile(durations, 95),
+        'p99': percentile(durations, 99),
+        'max': durations[-1] if durations else 0.0,
+    }
+
+
+def build_report(spans):
+    by_stage = defaultdict(list)
+    by_command_stage = defaultdict(list)
+    trace_bounds = {}
+    errors = defaultdict(int)
+
+    for span in spans:
+        name = span['name']
+        command = span.get('command') or '?'
+        duration = span['duration_ms']
+        by_stage[name].append(duration)
+        by_command_stage[(command, name)].append(duration)
+        if span.get('error'):
+            errors[name] += 1
+
+        start = span['start']
+        end = start + duration / 1000
+        key = (command, span['trace_id'])
+        if key in trace_bounds:
+            first, last = trace_bounds[key]
+            trace_bounds[key] = (min(first, start), max(last, end))
+        else:
+            trace_bounds[key] = (start, end)
+
+    end_to_end = defaultdict(list)
+    for (command, _), (first, last) in trace_bounds.items():
+        end_to_end[command].append((last - first) * 1000)
+
+    return {
+        'stages': {name: summarize(d) for name, d in by_stage.items()},
+        'command_stages': {key: summarize(d) for key, d in by_command_stage.items()},
+        'end_to_end': {command: summarize(d) for command, d in end_to_end.items()},
+        'errors': dict(errors),
+    }
+
+
+def format_row(label, stats, errors=0):
+    return (f"{label:<40} {stats['count']:>6} {stats['p50']:>10.1f} {stats['p95']:>10.1f} "
+            f"{stats['p99']:>10.1f} {stats['max']:>10.1f} {errors:>6}")
+
+
+def print_report(report):
+    header = f"{'':<40} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10} {'errors':>6}"
+
+    print("End-to-end per command")
+    print(header)
+    for command, stats in sorted(report['end_to_end'].items()):
+        print(format_row(command, stats))
+
+    print("\nPer stage")
+    print(header)
+    stages = sorted(report['stages'].items(), key=lambda item: -item[1]['p95'])
+    for name, stats in stages:
+        print(format_row(name, stats, report['errors'].get(name, 0)))
+
+    print("\nPer command and stage")
+    print(header)
+    for (command, name), stats in sorted(report['command_stages'].items()):
+        print(format_row(f"{command} {name}", stats))
+
+
+def default_paths():
+    base = tracing.TRACE_FILE
+    # Oldest rotation first so spans are read in time order
+    paths = [f"{base}.{i}" for i in range(tracing.TRACE_BACKUP_COUNT, 0, -1)] + [base]
+    return [path for path in paths if os.path.exists(path)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Percentile breakdown of Bravolith request traces")
+    parser.add_argument('files', nargs='*', help="JSONL span files (default: TRACE_FILE and rotations)")
+    args = parser.parse_args()
+
+    paths = args.files or default_paths()
+    if not paths:
+        print("No trace files found.")
+        return
+    spans = load_spans(paths)
+    if not spans:
+        print("No spans recorded.")
+        return
+    print_report(build_report(spans))
+
+
+if __name__ == '__main__':
+    main()
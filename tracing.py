@@ -0,0 +1,137 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Set TRACE_FILE to an empty string to disable tracing
+TRACE_FILE = os.getenv('TRACE_FILE', 'bravolith_trace.jsonl')
+TRACE_MAX_BYTES = int(os.getenv('TRACE_MAX_BYTES', 5 * 1024 * 1024))
+TRACE_BACKUP_COUNT = int(os.getenv('TRACE_BACKUP_COUNT', 3))
+
+_current_trace = contextvars.ContextVar('bravolith_trace', default=None)
+_current_span = contextvars.ContextVar('bravolith_span', default=None)
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+class Trace:
+    """A single user request, possibly spanning several Telegram events."""
+    __slots__ = ('trace_id', 'command', 'started')
+
+    def __init__(self, command, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.command = command
+        self.started = time.time()
+
+
+def _get_logger():
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                logger = logging.getLogger('bravolith.trace')
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                if TRACE_FILE:
+                    handler = RotatingFileHandler(TRACE_FILE, maxBytes=TRACE_MAX_BYTES,
+                                                  backupCount=TRACE_BACKUP_COUNT)
+                    handler.setFormatter(logging.Formatter('%(message)s'))
+                    logger.addHandler(handler)
+                else:
+                    logger.disabled = True
+                _logger = logger
+    return _logger
+
+
+def _write(record):
+    try:
+        _get_logger().info(json.dumps(record, default=str))
+    except Exception as e:
+        logging.error(f"Error writing trace record: {e}")
+
+
+def start_trace(command):
+    return Trace(command)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def use_trace(trace):
+    """Make `trace` the active trace for spans opened in this context."""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a stage of the active trace. Yields a dict that callers may add
+    attributes to. Does nothing when no trace is active.
+    """
+    trace = _current_trace.get()
+    if trace is None or not TRACE_FILE:
+        yield attrs
+        return
+
+    parent_id = _current_span.get()
+    span_id = uuid.uuid4().hex[:8]
+    token = _current_span.set(span_id)
+    start_wall = time.time()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current_span.reset(token)
+        _write({
+            'trace_id': trace.trace_id,
+            'span_id': span_id,
+            'parent_id': parent_id,
+            'command': trace.command,
+            'name': name,
+            'start': round(start_wall, 6),
+            'duration_ms': round(duration * 1000, 3),
+            'error': error,
+            'pid': os.getpid(),
+            'attrs': attrs or None,
+        })
+
+
+def record_span(name, start_wall, duration, trace=None, **attrs):
+    """Record a span measured elsewhere, e.g. time spent waiting in a queue."""
+    trace = trace or _current_trace.get()
+    if trace is None or not TRACE_FILE:
+        return
+    _write({
+        'trace_id': trace.trace_id,
+        'span_id': uuid.uuid4().hex[:8],
+        'parent_id': _current_span.get(),
+        'command': trace.command,
+        'name': name,
+        'start': round(start_wall, 6),
+        'duration_ms': round(duration * 1000, 3),
+        'error': None,
+        'pid': os.getpid(),
+        'attrs': attrs or None,
+    })
@@ -0,0 +1,477 @@
+"""
+Webcam preview pipeline for the terminal.
+
+Each stream has a reader thread that pulls JPEGs off the MJPEG stream
+itself. A small DecoderPool shared by all streams decodes each JPEG at the
+smallest libjpeg scale (1/2, 1/4 or 1/8) that still covers the tile, then
+resizes and converts it into one of three preallocated RGB buffers. The Tk
+thread pastes the newest complete buffer into a long-lived PhotoImage. A
+frame nobody had time for is overwritten, not queued, and counted as
+dropped.
+
+VideoGovernor trades preview frame rate and decode resolution against CPU
+load and SoC temperature, so the preview backs off before it starves the
+bot or a local LLM.
+
+OpenCV and numpy are imported on the capture path only, so the GUI does
+not pay for them until the webcam is switched on.
+"""
+import logging
+import os
+import threading
+import time
+import urllib.request
+
+from dotenv import load_dotenv
+from PIL import Image
+
+# Load environment variables
+load_dotenv()
+
+# Quality levels, best first: "max fps:resolution divisor"
+VIDEO_LEVELS = [tuple(int(value) for value in level.split(':'))
+                for level in os.getenv('VIDEO_LEVELS', '15:1,10:1,6:2,3:4').split(',')]
+GOVERNOR_CPU_HIGH = float(os.getenv('GOVERNOR_CPU_HIGH', 80))  # percent
+GOVERNOR_CPU_LOW = float(os.getenv('GOVERNOR_CPU_LOW', 50))
+GOVERNOR_TEMP_HIGH = float(os.getenv('GOVERNOR_TEMP_HIGH', 75))  # degrees C
+GOVERNOR_TEMP_LOW = float(os.getenv('GOVERNOR_TEMP_LOW', 65))
+GOVERNOR_RAISE_AFTER = int(os.getenv('GOVERNOR_RAISE_AFTER', 5))  # calm samples before stepping up
+VIDEO_RECONNECT_BASE = float(os.getenv('VIDEO_RECONNECT_BASE', 1))  # seconds
+VIDEO_RECONNECT_MAX = float(os.getenv('VIDEO_RECONNECT_MAX', 30))
+VIDEO_DECODE_WORKERS = int(os.getenv('VIDEO_DECODE_WORKERS', 2))
+# Decode seconds per wall-clock second across all streams, i.e. a share of one core
+VIDEO_DECODE_CPU = float(os.getenv('VIDEO_DECODE_CPU', 0.5))
+
+MJPEG_READ_SIZE = 16384
+JPEG_START = b'\xff\xd8'
+JPEG_END = b'\xff\xd9'
+
+
+def iter_mjpeg(url, stop_event, timeout=2):
+    """Yields the JPEG images of a multipart MJPEG HTTP stream."""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        buffer = bytearray()
+        while not stop_event.is_set():
+            chunk = response.read1(MJPEG_READ_SIZE)
+            if not chunk:
+                return
+            buffer += chunk
+            while True:
+                start = buffer.find(JPEG_START)
+                if start < 0:
+                    del buffer[:-1]  # keep a trailing 0xFF that may start a marker
+                    break
+                end = buffer.find(JPEG_END, start + 2)
+                if end < 0:
+                    del buffer[:start]
+                    break
+                yield bytes(buffer[start:end + 2])
+                del buffer[:end + 2]
+
+
+class VideoGovernor:
+    """
+    Steps down one quality level as soon as CPU or temperature is above its
+    high threshold, and back up one level after GOVERNOR_RAISE_AFTER
+    consecutive samples below both low thresholds.
+    """
+
+    def __init__(self, levels=VIDEO_LEVELS, cpu_high=GOVERNOR_CPU_HIGH, cpu_low=GOVERNOR_CPU_LOW,
+                 temp_high=GOVERNOR_TEMP_HIGH, temp_low=GOVERNOR_TEMP_LOW,
+                 raise_after=GOVERNOR_RAISE_AFTER):
+        self.levels = levels
+        self.cpu_high = cpu_high
+        self.cpu_low = cpu_low
+        self.temp_high = temp_high
+        self.temp_low = temp_low
+        self.raise_after = raise_after
+        self.level = 0
+        self.calm_samples = 0
+
+    @property
+    def max_fps(self):
+        return self.levels[self.level][0]
+
+    @property
+    def divisor(self):
+        return self.levels[self.level][1]
+
+    def update(self, cpu_percent, temperature=None):
+        """Feeds one sample; returns True if the level changed."""
+        hot = temperature is not None and temperature >= self.temp_high
+        cool = temperature is None or temperature <= self.temp_low
+        if cpu_percent >= self.cpu_high or hot:
+            self.calm_samples = 0
+            if self.level < len(self.levels) - 1:
+                self.level += 1
+                return True
+        elif cpu_percent <= self.cpu_low and cool:
+            self.calm_samples += 1
+            if self.calm_samples >= self.raise_after and self.level > 0:
+                self.calm_samples = 0
+                self.level -= 1
+                return True
+        else:
+            self.calm_samples = 0
+        return False
+
+
+class FrameBuffers:
+    """
+    Triple buffer: the capture thread fills `back`, `publish` swaps it with
+    `ready`, and `acquire` swaps `ready` with `front` for the Tk thread. No
+    buffer is ever written while it is being displayed.
+    """
+
+    def __init__(self, width, height):
+        import numpy as np
+
+        self.width = width
+        self.height = height
+        # Four channels: Pillow only maps 'RGBA'-style buffers in place, 'RGB' is copied once at creation
+        self.arrays = [np.zeros((height, width, 4), np.uint8) for _ in range(3)]
+        # Zero-copy PIL views over the arrays, for PhotoImage.paste
+        self.images = [Image.frombuffer('RGBA', (width, height), array, 'raw', 'RGBA', 0, 1)
+                       for array in self.arrays]
+        self.lock = threading.Lock()
+        self.back, self.ready, self.front = 0, 1, 2
+        self.fresh = False
+        self.sequence = 0
+
+    def back_buffer(self):
+        return self.arrays[self.back]
+
+    def publish(self):
+        """Returns True if the previous frame was never shown (dropped)."""
+        with self.lock:
+            dropped = self.fresh
+            self.back, self.ready = self.ready, self.back
+            self.fresh = True
+            self.sequence += 1
+            return dropped
+
+    def acquire(self):
+        """Returns the newest unseen frame as a PIL image, or None."""
+        with self.lock:
+            if not self.fresh:
+                return None
+            self.ready, self.front = self.front, self.ready
+            self.fresh = False
+            return self.images[self.front]
+
+
+class FrameDecoder:
+    """Decodes JPEG bytes (or BGR frames) into a caller-supplied RGBA array."""
+
+    def __init__(self, width, height):
+        import cv2
+        import numpy as np
+
+        self.cv2 = cv2
+        self.np = np
+        self.width = width
+        self.height = height
+        self.flag = None  # chosen from the first frame's size
+        self.source_size = None
+        self.divisor = 1  # decode at 1/divisor of the view size, then upscale
+        self.scaled = np.empty((height, width, 3), np.uint8)
+        self.rgb = np.empty((height, width, 3), np.uint8)  # packed copy for SharedFrame
+
+    def set_divisor(self, divisor):
+        self.divisor = divisor
+        if self.source_size is not None:
+            self.pick_scale(*self.source_size)
+
+    def pick_scale(self, source_width, source_height):
+        cv2 = self.cv2
+        self.source_size = (source_width, source_height)
+        target_width = self.width // self.divisor
+        target_height = self.height // self.divisor
+        self.flag = cv2.IMREAD_COLOR
+        for scale, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                            (2, cv2.IMREAD_REDUCED_COLOR_2)):
+            if source_width // scale >= target_width and source_height // scale >= target_height:
+                self.flag = flag
+                break
+
+    def decode_jpeg(self, jpeg, out):
+        image = self.cv2.imdecode(self.np.frombuffer(jpeg, self.np.uint8),
+                                  self.cv2.IMREAD_COLOR if self.flag is None else self.flag)
+        if image is None:
+            return False
+        if self.flag is None:
+            self.pick_scale(image.shape[1], image.shape[0])
+        return self.convert(image, out)
+
+    def convert(self, image, out):
+        cv2 = self.cv2
+        if image.shape[1] != self.width or image.shape[0] != self.height:
+            # Upscaling only happens at reduced quality; nearest is cheapest and suits the CRT look
+            shrinking = image.shape[1] > self.width
+            cv2.resize(image, (self.width, self.height), dst=self.scaled,
+                       interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_NEAREST)
+            image = self.scaled
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGBA, dst=out)
+        return True
+
+    def to_rgb(self, rgba):
+        return self.cv2.cvtColor(rgba, self.cv2.COLOR_RGBA2RGB, dst=self.rgb)
+
+
+class VideoStats:
+    """Frame counters; `report` returns rates since the previous report."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.captured = 0
+        self.displayed = 0
+        self.dropped = 0
+        self.skipped = 0  # received but not decoded, to honour the frame rate cap
+        self.decode_seconds = 0.0
+        self.draw_seconds = 0.0
+        self.last_report = time.monotonic()
+        self.last_counts = (0, 0, 0.0, 0.0)
+
+    def add_capture(self, seconds, dropped):
+        with self.lock:
+            self.captured += 1
+            self.dropped += dropped
+            self.decode_seconds += seconds
+
+    def add_drop(self):
+        with self.lock:
+            self.dropped += 1
+
+    def add_skip(self):
+        with self.lock:
+            self.skipped += 1
+
+    def add_draw(self, seconds):
+        with self.lock:
+            self.displayed += 1
+            self.draw_seconds += seconds
+
+    def report(self):
+        now = time.monotonic()
+        with self.lock:
+            counts = (self.captured, self.displayed, self.decode_seconds, self.draw_seconds)
+            dropped = self.dropped
+            skipped = self.skipped
+        captured, displayed, decode_seconds, draw_seconds = (
+            new - old for new, old in zip(counts, self.last_counts))
+        elapsed = max(now - self.last_report, 1e-6)
+        self.last_report = now
+        self.last_counts = counts
+        return {
+            'capture_fps': captured / elapsed,
+            'display_fps': displayed / elapsed,
+            'decode_ms': decode_seconds / captured * 1000 if captured else 0.0,
+            'draw_ms': draw_seconds / displayed * 1000 if displayed else 0.0,
+            'dropped': dropped,
+            'skipped': skipped,
+        }
+
+
+class DecoderPool:
+    """
+    A fixed set of decode threads shared by every stream. Each stream's
+    reader hands over its newest undecoded frame and replaces (drops) one
+    still waiting. Each stream may spend at most its share of
+    VIDEO_DECODE_CPU on decoding, paced by its measured per-frame cost. More
+    tiles therefore means fewer frames per tile, not more CPU.
+    """
+
+    def __init__(self, workers=VIDEO_DECODE_WORKERS, cpu_cap=VIDEO_DECODE_CPU):
+        self.workers = workers
+        self.cpu_cap = cpu_cap
+        self.cond = threading.Condition()
+        self.streams = []
+        self.threads = []
+        self.next_index = 0
+
+    def add(self, stream):
+        with self.cond:
+            if stream not in self.streams:
+                self.streams.append(stream)
+            while len(self.threads) < self.workers:
+                thread = threading.Thread(target=self._run, name='video-decode', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def remove(self, stream):
+        with self.cond:
+            if stream in self.streams:
+                self.streams.remove(stream)
+            stream.pending = None
+
+    def budget_interval(self, stream):
+        """Minimum seconds between two decodes of `stream`."""
+        share = self.cpu_cap / max(1, len(self.streams))
+        interval = stream.decode_cost / share
+        if stream.max_fps:
+            interval = max(interval, 1 / stream.max_fps)
+        return interval
+
+    def submit(self, stream, item):
+        with self.cond:
+            if stream.pending is not None:
+                stream.stats.add_drop()
+            stream.pending = item
+            self.cond.notify()
+
+    def _take(self):
+        with self.cond:
+            while True:
+                count = len(self.streams)
+                # Round robin so one busy stream cannot starve the others
+                for offset in range(count):
+                    stream = self.streams[(self.next_index + offset) % count]
+                    if stream.pending is not None and not stream.decoding:
+                        self.next_index = (self.next_index + offset + 1) % count
+                        item, stream.pending = stream.pending, None
+                        stream.decoding = True
+                        return stream, item
+                self.cond.wait()
+
+    def _run(self):
+        while True:
+            stream, item = self._take()
+            try:
+                stream.decode(item)
+            except Exception as e:
+                logging.error(f"Video decode error on {stream.url}: {e}")
+            finally:
+                with self.cond:
+                    stream.decoding = False
+                    self.cond.notify()
+
+
+class VideoStream:
+    """
+    One camera: a reader thread pulls frames off the network, the shared
+    DecoderPool decodes them into this stream's buffers.
+    """
+
+    def __init__(self, url, width, height, shared_frame=None, pool=None):
+        self.url = url
+        self.width = width
+        self.height = height
+        # shared_frame.SharedFrame the bot reads /snapshot from
+        self.shared_frame = shared_frame
+        self.pool = pool or DecoderPool(workers=1)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.frames = None
+        self.stats = VideoStats()
+        # Set from the Tk thread by the governor, read by the reader and decoder
+        self.max_fps = None
+        self.divisor = 1
+        self.reconnect_delay = VIDEO_RECONNECT_BASE
+        # Owned by the pool: newest undecoded frame, and whether a worker has this stream
+        self.pending = None
+        self.decoding = False
+        self.decoder = None
+        self.decode_cost = 0.0  # smoothed seconds per decode, drives the budget
+        self.next_due = 0.0
+
+    def set_quality(self, max_fps, divisor):
+        self.max_fps = max_fps
+        self.divisor = divisor
+
+    def start(self):
+        if self.frames is None:
+            self.frames = FrameBuffers(self.width, self.height)
+        self.pool.add(self)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._capture_frames, args=(self.stop_event,))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.pool.remove(self)
+        if self.thread:
+            # A thread stuck in a network read exits on its own after the timeout
+            self.thread.join(timeout=0.5)
+        self.thread = None
+
+    def _capture_frames(self, stop_event):
+        self.reconnect_delay = VIDEO_RECONNECT_BASE
+        while not stop_event.is_set():
+            try:
+                if self.url.startswith(('http://', 'https://')):
+                    self._read_mjpeg(stop_event)
+                else:
+                    self._read_capture(stop_event)
+                error = "stream ended"
+            except Exception as e:
+                error = e
+            if stop_event.is_set():
+                break
+            logging.error(f"Video stream {self.url} error: {error}, "
+                          f"reconnecting in {self.reconnect_delay:.0f}s")
+            stop_event.wait(self.reconnect_delay)
+            self.reconnect_delay = min(self.reconnect_delay * 2, VIDEO_RECONNECT_MAX)
+
+    def _due(self):
+        """False if this frame should be skipped to stay within the stream's budget."""
+        now = time.perf_counter()
+        if now < self.next_due:
+            self.stats.add_skip()
+            return False
+        self.next_due = now + self.pool.budget_interval(self)
+        return True
+
+    def _read_mjpeg(self, stop_event):
+        for jpeg in iter_mjpeg(self.url, stop_event):
+            if self._due():  # bytes are read either way, but skipped frames cost no decode
+                self.pool.submit(self, ('jpeg', jpeg))
+
+    def _read_capture(self, stop_event):
+        # Non-HTTP sources (device index, RTSP) go through OpenCV's reader at full size
+        import cv2
+
+        cap = cv2.VideoCapture(int(self.url) if self.url.isdigit() else self.url)
+        if not cap.isOpened():
+            cap.release()
+            raise OSError(f"cannot open {self.url}")
+        try:
+            while not stop_event.is_set():
+                if not cap.grab():
+                    return
+                if not self._due():
+                    continue  # grab without retrieve skips the decode
+                ret, frame = cap.retrieve()
+                if ret:
+                    self.pool.submit(self, ('bgr', frame))
+        finally:
+            cap.release()
+
+    def decode(self, item):
+        """Runs on a pool worker; the pool never runs two at once for one stream."""
+        if self.decoder is None:
+            self.decoder = FrameDecoder(self.width, self.height)
+        if self.decoder.divisor != self.divisor:
+            self.decoder.set_divisor(self.divisor)
+        start = time.perf_counter()
+        kind, payload = item
+        out = self.frames.back_buffer()
+        if kind == 'jpeg':
+            ok = self.decoder.decode_jpeg(payload, out)
+        else:
+            ok = self.decoder.convert(payload, out)
+        if not ok:
+            return
+        if self.shared_frame is not None and self.shared_frame.due():
+            self.shared_frame.publish(self.decoder.to_rgb(out), self.width, self.height)
+        dropped = self.frames.publish()
+        cost = time.perf_counter() - start
+        self.decode_cost = cost if not self.decode_cost else 0.8 * self.decode_cost + 0.2 * cost
+        self.stats.add_capture(cost, dropped)
+        self.reconnect_delay = VIDEO_RECONNECT_BASE
+
+    def get_frame(self):
+        """Newest frame not yet shown, as a PIL image backed by a reused buffer."""
+        if self.frames is None:
+            return None
+        return self.frames.acquire()
@@ -0,0 +1,294 @@
+"""
+Weighted word lists for the prompt generators, optionally loaded from files.
+
+Draws use Vose's alias method: after an O(n) build, each draw is two random
+numbers and two array lookups regardless of vocabulary size or weights.
+
+Files hold one entry per line, `word` or `word<TAB>weight`; blank lines and
+`#` comments are skipped and repeated words keep their first entry. Files
+of VOCAB_MMAP_BYTES or more are not read into Python lists: a binary index
+(word offsets plus the alias table) is written next to the file once and
+both are memory mapped afterwards, so a 100k-word vocabulary costs a few
+page faults at startup and its pages are shared between processes.
+"""
+import logging
+import mmap
+import os
+import struct
+from array import array
+from collections import deque
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+VOCAB_DIR = os.getenv('VOCAB_DIR', 'vocab')
+VOCAB_MMAP_BYTES = int(os.getenv('VOCAB_MMAP_BYTES', 256 * 1024))
+PROMPT_NO_REPEAT = int(os.getenv('PROMPT_NO_REPEAT', 0))  # recent draws avoided per list, 0 = off
+NO_REPEAT_TRIES = 8
+
+MAGIC = b'BRVVOCB1'
+_INDEX_HEADER = struct.Struct('<8sQQI')  # magic, source size, source mtime (ns), words
+INDEX_HEADER_SIZE = 64
+
+
+def build_alias_table(weights):
+    """Vose's alias method; returns (probability, alias) arrays."""
+    count = len(weights)
+    total = sum(weights)
+    probability = array('d', bytes(8 * count))
+    alias = array('I', bytes(4 * count))
+    scaled = [weight * count / total for weight in weights]
+    small = [index for index, value in enumerate(scaled) if value < 1.0]
+    large = [index for index, value in enumerate(scaled) if value >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        probability[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    for index in small + large:  # leftovers are 1.0 up to rounding
+        probability[index] = 1.0
+    return probability, alias
+
+
+def parse_entries(lines):
+    """(words, weights) from `word[<TAB>weight]` lines, first occurrence wins."""
+    seen = set()
+    words, weights = [], []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        word, _, weight = line.partition('\t')
+        word = word.strip()
+        if word in seen:
+            continue
+        try:
+            weight = float(weight) if weight.strip() else 1.0
+        except ValueError:
+            logging.warning(f"Bad vocabulary weight for {word!r}: {weight!r}")
+            continue
+        if weight <= 0:
+            continue
+        seen.add(word)
+        words.append(word)
+        weights.append(weight)
+    return words, weights
+
+
+class Vocabulary:
+    """An in-memory weighted word list; inline lists and small files."""
+
+    def __init__(self, words, weights=None, no_repeat=PROMPT_NO_REPEAT):
+        if weights is None:
+            # Inline lists carry no weights; duplicates are dropped like in files
+            words = list(dict.fromkeys(words))
+            weights = [1.0] * len(words)
+        self.words = words
+        self.lookup = words.__getitem__
+        self.total_weight = float(sum(weights))
+        # Equal weights (every inline list) need no alias table at all
+        self.uniform = len(set(weights)) <= 1
+        self.probability, self.alias = build_alias_table(weights) if words else (array('d'), array('I'))
+        self.set_no_repeat(no_repeat)
+
+    @classmethod
+    def load(cls, path, no_repeat=PROMPT_NO_REPEAT):
+        if os.path.getsize(path) >= VOCAB_MMAP_BYTES:
+            return MappedVocabulary(path, no_repeat)
+        with open(path, encoding='utf-8') as f:
+            words, weights = parse_entries(f)
+        return cls(words, weights, no_repeat)
+
+    def __len__(self):
+        return len(self.probability)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        return self.words[index]
+
+    def set_no_repeat(self, window):
+        # At most half the list, so a fresh word is always easy to find
+        self.no_repeat = max(0, min(window, len(self) // 2))
+        self.recent = deque()
+        self.recent_set = set()
+        # draw(random) -> word; `random` is a bound Random.random (or random.random)
+        self.draw = self.draw_fresh if self.no_repeat else self.draw_any
+
+    def draw_index(self, random):
+        index = int(random() * len(self.probability))
+        if self.uniform or random() < self.probability[index]:
+            return index
+        return self.alias[index]
+
+    def draw_any(self, random):
+        return self.lookup(self.draw_index(random))
+
+    def draw_fresh(self, random):
+        """Like draw_any, but skips the last `no_repeat` words drawn."""
+        recent_set = self.recent_set
+        index = self.draw_index(random)
+        tries = 0
+        while index in recent_set and tries < NO_REPEAT_TRIES:
+            index = self.draw_index(random)
+            tries += 1
+        while index in recent_set:
+            # Unlucky streak: take the next word not in the window
+            index = (index + 1) % len(self.probability)
+        self.recent.append(index)
+        recent_set.add(index)
+        if len(self.recent) > self.no_repeat:
+            recent_set.discard(self.recent.popleft())
+        return self.lookup(index)
+
+
+class MappedVocabulary(Vocabulary):
+    """
+    A large vocabulary file served from memory maps of the file and its
+    `.idx` alias-table index; words are decoded only when drawn.
+    """
+
+    def __init__(self, path, no_repeat=PROMPT_NO_REPEAT):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        index = self.open_index(path)
+        count = _INDEX_HEADER.unpack_from(index, 0)[3]
+        view = memoryview(index)
+        offset = INDEX_HEADER_SIZE
+        sections = []
+        for code, size in (('Q', 8), ('d', 8), ('I', 4), ('I', 4)):
+            sections.append(view[offset:offset + count * size].cast(code))
+            offset += count * size
+        self.index = index
+        self.starts, self.probability, self.lengths, self.alias = sections
+        self.total_weight = struct.unpack_from('<d', index, INDEX_HEADER_SIZE - 8)[0]
+        self.uniform = False
+        self.lookup = self.__getitem__
+        self.set_no_repeat(no_repeat)
+
+    @staticmethod
+    def open_index(path):
+        stat = os.stat(path)
+        index_path = path + '.idx'
+        try:
+            with open(index_path, 'rb') as f:
+                index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, size, mtime, _ = _INDEX_HEADER.unpack_from(index, 0)
+            if (magic, size, mtime) == (MAGIC, stat.st_size, stat.st_mtime_ns):
+                return index
+            index.close()
+        except (OSError, ValueError, struct.error):
+            pass
+        data = build_index(path, stat)
+        try:
+            with open(index_path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(index_path + '.tmp', index_path)
+            with open(index_path, 'rb') as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError as e:
+            # Read-only vocabulary directory: keep the index in memory this time
+            logging.warning(f"Could not write vocabulary index {index_path}: {e}")
+            return data
+
+    def __getitem__(self, index):
+        start = self.starts[index]
+        return self.text[start:start + self.lengths[index]].decode('utf-8')
+
+
+def build_index(path, stat):
+    """Parses a vocabulary file into the `.idx` layout MappedVocabulary maps."""
+    seen = set()
+    starts, lengths, weights = array('Q'), array('I'), []
+    with open(path, 'rb') as f:
+        position = 0
+        for raw in f:
+            line_start = position
+            position += len(raw)
+            line = raw.rstrip(b'\r\n')
+            word, _, weight = line.partition(b'\t')
+            stripped = word.strip()
+            if not stripped or stripped.startswith(b'#') or stripped in seen:
+                continue
+            try:
+                weight = float(weight) if weight.strip() else 1.0
+            except ValueError:
+                continue
+            if weight <= 0:
+                continue
+            seen.add(stripped)
+            starts.append(line_start + word.index(stripped))
+            lengths.append(len(stripped))
+            weights.append(weight)
+    probability, alias = build_alias_table(weights) if weights else (array('d'), array('I'))
+    header = bytearray(INDEX_HEADER_SIZE)
+    _INDEX_HEADER.pack_into(header, 0, MAGIC, stat.st_size, stat.st_mtime_ns, len(weights))
+    struct.pack_into('<d', header, INDEX_HEADER_SIZE - 8, float(sum(weights)))
+    return bytes(header) + starts.tobytes() + probability.tobytes() + lengths.tobytes() + alias.tobytes()
+
+
+class VocabularyMix:
+    """
+    Draws from several vocabularies in proportion to their total weight,
+    e.g. every subcategory of 'adj' for a bare {adj} tag, without merging
+    the lists.
+    """
+
+    def __init__(self, vocabularies):
+        self.vocabularies = [vocabulary for vocabulary in vocabularies if vocabulary]
+        self.total_weight = sum(vocabulary.total_weight for vocabulary in self.vocabularies)
+        if self.vocabularies:
+            self.probability, self.alias = build_alias_table(
+                [vocabulary.total_weight for vocabulary in self.vocabularies])
+
+    def __len__(self):
+        return sum(len(vocabulary) for vocabulary in self.vocabularies)
+
+    def __bool__(self):
+        return bool(self.vocabularies)
+
+    def draw(self, random):
+        index = int(random() * len(self.vocabularies))
+        if random() >= self.probability[index]:
+            index = self.alias[index]
+        return self.vocabularies[index].draw(random)
+
+
+def load_words(words, vocab_dir=None, no_repeat=PROMPT_NO_REPEAT):
+    """
+    Maps (category, subcategory) to a Vocabulary; (category, None) covers
+    the whole category. `words` is a generator's inline dict of lists. A
+    file `<category>.txt` or `<category>.<subcategory>.txt` in vocab_dir
+    replaces the matching inline list or adds a new one.
+    """
+    sources = {}
+    for category, entries in words.items():
+        if isinstance(entries, dict):
+            for subcategory, subwords in entries.items():
+                sources[(category, subcategory)] = subwords
+        else:
+            sources[(category, None)] = entries
+    if vocab_dir and os.path.isdir(vocab_dir):
+        for name in sorted(os.listdir(vocab_dir)):
+            if not name.endswith('.txt'):
+                continue
+            category, _, subcategory = name[:-len('.txt')].partition('.')
+            sources[(category, subcategory or None)] = os.path.join(vocab_dir, name)
+
+    pools = {}
+    for key, source in sources.items():
+        if isinstance(source, str):
+            pools[key] = Vocabulary.load(source, no_repeat)
+        else:
+            pools[key] = Vocabulary(source, no_repeat=no_repeat)
+    categories = {category for category, subcategory in pools if subcategory is not None}
+    for category in categories:
+        if (category, None) not in pools:
+            pools[(category, None)] = VocabularyMix(
+                [pool for (name, subcategory), pool in pools.items() if name == category and subcategory])
+    return pools
@@ -1,6 +1,10 @@
+import os
 import random
 from typing import Dict, List
 
+import prompt_template
+import vocabulary
+
 # Word lists (using the expanded lists from the previous version)
 o_adjectives = [
     'purple', 'fluffy', 'transparent', 'melodic', 'curious', 'ethereal', 'quantum', 'whimsical',
@@ -37,7 +41,9 @@ o_verbs = [
 
 
 class PromptGenerator:
-    def __init__(self):
+    def __init__(self, vocab_dir: str = None):
+        # Files here replace or extend the inline word lists below
+        self.vocab_dir = os.path.join(vocabulary.VOCAB_DIR, 'words') if vocab_dir is None else vocab_dir
         # Template categories for different types of scenes
         self.templates = {
             'landscape': [
@@ -99,7 +105,7 @@ class PromptGenerator:
             ],
             'abstract': [
                 'time', 'dreams', 'memory', 'consciousness', 'infinity',
-                'creation', 'harmony', 'chaos', 'evolution', 'transcendence'
+                'creation', 'harmony', 'chaos', 'evolution', 'transcendence',
                 'happiness', 'silence', 'dreams', 'time', 'nostalgia', 'serendipity',
                 'entropy', 'synchronicity', 'infinity', 'déjà vu', 'zeitgeist', 'catharsis',
                 'ambivalence', 'cognizance', 'duende', 'ephemera', 'frisson', 'gestalt', 'hiraeth', 'ineffable',
@@ -126,6 +132,16 @@ class PromptGenerator:
                 'frequencies', 'paradigms', 'phenomena', 'apparitions', 'metamorphoses'
             ]
         }
+        self.compile()
+
+    def compile(self):
+        """Pre-parses templates and flattens word pools; call again after editing either."""
+        self.pools = prompt_template.build_pools(self.words, self.vocab_dir)
+        self.compiled = {
+            style: [prompt_template.compile_template(template, self.pools) for template in templates]
+            for style, templates in self.templates.items()
+        }
+        self.styles = list(self.compiled)
 
     def _parse_template_tag(self, tag: str) -> tuple:
         """Parse template tags like {adj:mystical} or {noun}"""
@@ -134,41 +150,32 @@ class PromptGenerator:
 
     def _select_word(self, category: str, subcategory: str = None) -> str:
         """Select a word from the specified category and subcategory"""
-        if subcategory and category in self.words and subcategory in self.words[category]:
-            return random.choice(self.words[category][subcategory])
-        elif category in self.words:
-            if isinstance(self.words[category], dict):
-                # If it's a dict of subcategories, flatten and choose from all words
-                all_words = [word for subcat in self.words[category].values() 
-                           for word in subcat]
-                return random.choice(all_words)
-            return random.choice(self.words[category])
+        # Nested categories are flattened once in compile(), not on every call
+        pool = prompt_template.find_pool(self.pools, category, subcategory)
+        if pool:
+            return pool.draw(random.random)
         return f"<unknown-{category}>"
 
-    def generate_prompt(self, style: str = None) -> str:
+    def generate_prompt(self, style: str = None, rng: random.Random = None) -> str:
         """Generate a prompt with the specified style"""
+        rng = rng or random
         # If no style specified, choose random style
         if not style:
-            style = random.choice(list(self.templates.keys()))
-            
-        # Select template from specified style
-        template = random.choice(self.templates[style])
-        
-        # Fill in the template
-        result = template
-        while '{' in result:
-            start = result.find('{')
-            end = result.find('}', start)
-            if start == -1 or end == -1:
-                break
-                
-            tag = result[start+1:end]
-            category, subcategory = self._parse_template_tag(tag)
-            replacement = self._select_word(category, subcategory)
-            
-            result = result[:start] + replacement + result[end+1:]
-            
-        return result
+            style = rng.choice(self.styles)
+
+        # Select template from specified style and fill it in
+        return rng.choice(self.compiled[style]).expand(rng.random)
+
+    def generate_many(self, n: int, style: str = None, seed=None) -> List[str]:
+        """Generate n prompts in one call; the same seed gives the same prompts."""
+        rng = random.Random(seed)
+        draw = rng.random
+        compiled = [self.compiled[style]] if style else [self.compiled[name] for name in self.styles]
+        prompts = []
+        for _ in range(n):
+            templates = compiled[int(draw() * len(compiled))]
+            prompts.append(templates[int(draw() * len(templates))].expand(draw))
+        return prompts
 
 # Example usage
 #generator = PromptGenerator()
@@ -1,8 +1,19 @@
+import os
 import random
 from typing import Dict, List, Optional
 
+import prompt_template
+import vocabulary
+
+# Filled once per prompt rather than drawn per tag
+SLOTS = ('quality', 'style', 'composition')
+# Categories wrapped in ComfyUI-style weights when add_weights is set
+WEIGHTED = ('adj', 'noun', 'location')
+
 class FluxPromptGenerator:
-    def __init__(self):
+    def __init__(self, vocab_dir: str = None):
+        # Files here replace or extend the inline word lists below
+        self.vocab_dir = os.path.join(vocabulary.VOCAB_DIR, 'flux') if vocab_dir is None else vocab_dir
         self.quality_tags = [
             "masterpiece", "best quality", "highly detailed", "sharp focus",
             "intricate details", "professional", "8k uhd", "high resolution"
@@ -86,39 +97,62 @@ class FluxPromptGenerator:
                 'evolving', 'materializing', 'dissolving', 'emerging'
             ]
         }
+        self.compile()
+
+    def compile(self):
+        """Pre-parses templates and flattens word pools; call again after editing either."""
+        self.pools = prompt_template.build_pools(self.words, self.vocab_dir)
+        # compiled[add_weights][template_type] -> compiled templates
+        self.compiled = {
+            add_weights: {
+                template_type: [
+                    prompt_template.compile_template(template, self.pools, SLOTS,
+                                                     WEIGHTED if add_weights else ())
+                    for template in templates
+                ]
+                for template_type, templates in self.templates.items()
+            }
+            for add_weights in (False, True)
+        }
+        self.template_types = list(self.templates)
+        self.all_style_tags = [tag for sublist in self.style_tags.values() for tag in sublist]
 
-    def _get_quality_tags(self) -> str:
+    def _get_quality_tags(self, rng=random) -> str:
         """Get a random selection of quality tags"""
-        return ", ".join(random.sample(self.quality_tags, k=random.randint(2, 4)))
+        # 2 + int(random() * 3) is randint(2, 4) without its per-call overhead
+        return ", ".join(rng.sample(self.quality_tags, k=2 + int(rng.random() * 3)))
 
-    def _get_style_tags(self, style_type: Optional[str] = None) -> str:
+    def _get_style_tags(self, style_type: Optional[str] = None, rng=random) -> str:
         """Get style tags either from a specific category or random"""
         if style_type and style_type in self.style_tags:
             tags = self.style_tags[style_type]
         else:
             # Randomly select from all style tags
-            tags = [tag for sublist in self.style_tags.values() for tag in sublist]
-        return ", ".join(random.sample(tags, k=random.randint(2, 3)))
+            tags = self.all_style_tags
+        return ", ".join(rng.sample(tags, k=2 + int(rng.random() * 2)))
 
     def _parse_template_tag(self, tag: str) -> tuple:
         parts = tag.split(':')
         return (parts[0], parts[1]) if len(parts) > 1 else (parts[0], None)
 
     def _select_word(self, category: str, subcategory: str = None) -> str:
-        if subcategory and category in self.words and subcategory in self.words[category]:
-            return random.choice(self.words[category][subcategory])
-        elif category in self.words:
-            if isinstance(self.words[category], dict):
-                all_words = [word for subcat in self.words[category].values() 
-                           for word in subcat]
-                return random.choice(all_words)
-            return random.choice(self.words[category])
+        pool = prompt_template.find_pool(self.pools, category, subcategory)
+        if pool:
+            return pool.draw(random.random)
         return f"<unknown-{category}>"
 
+    def _slots(self, style_type, rng):
+        return {
+            'quality': self._get_quality_tags(rng),
+            'style': self._get_style_tags(style_type, rng),
+            'composition': self.pools[('composition', None)].draw(rng.random),
+        }
+
     def generate_prompt(self, 
                        template_type: str = None, 
                        style_type: str = None,
-                       add_weights: bool = True) -> str:
+                       add_weights: bool = True,
+                       rng: random.Random = None) -> str:
         """
         Generate a prompt with specified template and style type.
         
@@ -126,42 +160,31 @@ class FluxPromptGenerator:
             template_type: Type of template to use ('scene', 'portrait', 'abstract')
             style_type: Type of style to apply ('photorealistic', 'artistic', 'atmosphere')
             add_weights: Whether to add ComfyUI-style weights to key terms
+            rng: random.Random to draw from (default: the random module)
         """
+        rng = rng or random
         if not template_type:
-            template_type = random.choice(list(self.templates.keys()))
-            
-        template = random.choice(self.templates[template_type])
-        
-        # Prepare base substitutions
-        substitutions = {
-            'quality': self._get_quality_tags(),
-            'style': self._get_style_tags(style_type),
-            'composition': random.choice(self.words['composition'])
-        }
-        
-        # Fill in the template
-        result = template
-        while '{' in result:
-            start = result.find('{')
-            end = result.find('}', start)
-            if start == -1 or end == -1:
-                break
-                
-            tag = result[start+1:end]
-            category, subcategory = self._parse_template_tag(tag)
-            
-            if category in substitutions:
-                replacement = substitutions[category]
-            else:
-                replacement = self._select_word(category, subcategory)
-                
-            # Add weights to important terms if requested
-            if add_weights and category in ['adj', 'noun', 'location']:
-                replacement = f"({replacement}:1.2)"
-                
-            result = result[:start] + replacement + result[end+1:]
-            
-        return result
+            template_type = rng.choice(self.template_types)
+
+        template = rng.choice(self.compiled[bool(add_weights)][template_type])
+        return template.expand(rng.random, self._slots(style_type, rng))
+
+    def generate_many(self, n: int,
+                      template_type: str = None,
+                      style_type: str = None,
+                      add_weights: bool = True,
+                      seed=None) -> List[str]:
+        """Generate n prompts in one call; the same seed gives the same prompts."""
+        rng = random.Random(seed)
+        draw = rng.random
+        compiled = self.compiled[bool(add_weights)]
+        groups = [compiled[template_type]] if template_type else [compiled[name] for name in self.template_types]
+        prompts = []
+        for _ in range(n):
+            templates = groups[int(draw() * len(groups))]
+            template = templates[int(draw() * len(templates))]
+            prompts.append(template.expand(draw, self._slots(style_type, rng)))
+        return prompts
 
     def generate_negative_prompt(self) -> str:
         """Generate a standard negative prompt for FLUX"""